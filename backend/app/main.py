@@ -1,8 +1,10 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import siniestros
+from app.routers import siniestros, geo, estadisticas, trabajos_pdf
+import asyncio
 import logging
 import os
+import time
 from datetime import datetime
 
 # Configurar logging detallado
@@ -58,6 +60,10 @@ async def startup_event():
         Base.metadata.create_all(bind=engine)
         logger.info("✅ Todas las tablas creadas exitosamente")
 
+        # Índice espacial PostGIS (opcional, con geohash como alternativa)
+        from app.services.geo_service import asegurar_indice_espacial
+        asegurar_indice_espacial(engine)
+
         # 3. Verify database is ready
         from sqlalchemy.orm import sessionmaker
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -104,25 +110,140 @@ async def log_requests(request: Request, call_next):
     logger.info(f"📤 Response status: {response.status_code}")
     return response
 
+# Consultas SQL por request: header Server-Timing e histogramas por ruta (/debug/queries)
+from app.utils import query_stats
+
+if query_stats.QUERY_STATS_ENABLED:
+    from app.database import engine as _engine
+    query_stats.instrument_engine(_engine)
+
+    @app.middleware("http")
+    async def instrumentar_consultas(request: Request, call_next):
+        token, stats = query_stats.start_request()
+        inicio = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            query_stats.end_request(token)
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        response.headers["Server-Timing"] = stats.server_timing(duracion_ms)
+        route = request.scope.get("route")
+        query_stats.record_request(
+            f"{request.method} {route.path if route else '<sin ruta>'}", stats, duracion_ms
+        )
+        return response
+
+# Métricas Prometheus (/metrics): requests por plantilla de ruta, pool, PDF, S3 y event loop
+from app.utils import metrics
+
+if metrics.METRICS_ENABLED:
+    from app.database import engine as _engine
+    metrics.instrument_pool(_engine)
+
+    @app.middleware("http")
+    async def metricas_http(request: Request, call_next):
+        inicio = time.perf_counter()
+        status = 500
+        metrics.HTTP_IN_PROGRESS.inc()
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            metrics.HTTP_IN_PROGRESS.dec()
+            route = request.scope.get("route")
+            # Plantilla de la ruta: la URL concreta dispararía la cardinalidad
+            plantilla = route.path if route else "<sin ruta>"
+            metrics.HTTP_REQUESTS.labels(request.method, plantilla, str(status)).inc()
+            metrics.HTTP_DURATION.labels(request.method, plantilla).observe(time.perf_counter() - inicio)
+
+    @app.on_event("startup")
+    async def iniciar_monitor_event_loop():
+        app.state.monitor_event_loop = asyncio.create_task(metrics.monitor_loop_lag())
+
+    @app.on_event("shutdown")
+    async def detener_metricas():
+        app.state.monitor_event_loop.cancel()
+        metrics.mark_process_dead()
+
+@app.on_event("startup")
+async def iniciar_monitor_salud():
+    from app.services.health_service import monitor
+    monitor.iniciar()
+
+@app.on_event("shutdown")
+async def detener_monitor_salud():
+    from app.services.health_service import monitor
+    monitor.detener()
+
+@app.on_event("shutdown")
+async def detener_eventos():
+    from app.services.eventos_service import distribuidor
+    distribuidor.detener()
+
+# Diagnóstico de bloqueos del event loop y perfiles de CPU (/debug/profile, SIGUSR2)
+from app.utils import profiling
+
+@app.on_event("startup")
+async def iniciar_diagnostico_loop():
+    profiling.start_watchdog()
+    if profiling.PROFILE_SIGNAL:
+        profiling.install_signal_handler()
+
+@app.on_event("shutdown")
+async def detener_diagnostico_loop():
+    profiling.stop_watchdog()
+
 # Include routers
 app.include_router(siniestros.router, prefix="/api/v1/siniestros", tags=["siniestros"])
+app.include_router(geo.router, prefix="/api/v1/geo", tags=["geo"])
+app.include_router(estadisticas.router, prefix="/api/v1/estadisticas", tags=["estadisticas"])
+app.include_router(trabajos_pdf.router, prefix="/api/v1/trabajos-pdf", tags=["trabajos-pdf"])
 
 @app.get("/")
 async def root():
     return {"message": "API de Sistema de Informes de Siniestros"}
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Métricas en formato de exposición de Prometheus"""
+    from fastapi import HTTPException
+    from fastapi.responses import Response
+
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=501, detail="Métricas no disponibles (falta prometheus_client o METRICS_ENABLED=false)")
+    return Response(metrics.render_latest(), media_type=metrics.CONTENT_TYPE_LATEST)
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/live")
+async def health_live():
+    """Liveness: el proceso responde (no consulta dependencias)"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness: último resultado en caché de las verificaciones de BD, S3 y certificado"""
+    from fastapi.responses import JSONResponse
+    from app.services.health_service import estado_preparacion
+
+    listo, verificaciones = estado_preparacion()
+    return JSONResponse(
+        {"status": "ready" if listo else "not_ready", "checks": verificaciones},
+        status_code=200 if listo else 503,
+    )
+
 @app.get("/debug/db")
 async def debug_database():
     """Endpoint para debug de conexión a base de datos"""
     try:
         from app.database import SessionLocal
+        import sqlalchemy as sa
 
         db = SessionLocal()
-        db.execute("SELECT 1")
+        db.execute(sa.text("SELECT 1"))
         db.close()
         return {"database": "connected", "status": "healthy"}
     except Exception as e:
@@ -258,6 +379,8 @@ async def clear_database():
         logger.info(f"  - Dinámicas accidente: {dinamicas_count}")
 
         # Eliminar en orden correcto (foreign keys)
+        db.query(models.EstadisticaSiniestros).delete()
+        db.query(models.TrabajoPdf).delete()
         db.query(models.Testigo).delete()
         db.query(models.Inspeccion).delete()
         db.query(models.RelatoAsegurado).delete()
@@ -362,61 +485,85 @@ async def reset_database():
         }
 
 @app.post("/debug/create-test-data")
-async def create_test_data_endpoint():
-    """Crear datos de prueba manualmente - ejecuta el script create_test_data.py"""
-    import subprocess
-    import sys
-    import os
-
-    logger.info("🧪 EJECUTANDO CREACIÓN MANUAL DE DATOS DE PRUEBA")
+async def create_test_data_endpoint(siniestros: int = 1, semilla: int = 0):
+    """Crear siniestros de prueba sintéticos (para volúmenes grandes usar create_test_data.py)"""
+    from fastapi import HTTPException
+    from fastapi.concurrency import run_in_threadpool
+    from app.database import DATABASE_URL
+    from app.services.synthetic_data import generar_siniestros
 
-    try:
-        current_dir = os.getcwd()
-        logger.info(f"Directorio actual: {current_dir}")
+    if not 1 <= siniestros <= 100_000:
+        raise HTTPException(status_code=400, detail="siniestros debe estar entre 1 y 100000")
 
-        # Ejecutar el script create_test_data.py
-        result = subprocess.run([
-            sys.executable, "create_test_data.py"
-        ], capture_output=True, text=True, cwd=current_dir)
+    logger.info(f"🧪 CREANDO {siniestros} SINIESTROS DE PRUEBA (semilla {semilla})")
 
-        if result.returncode == 0:
-            logger.info("✅ Datos de prueba creados exitosamente")
-            logger.info(f"Output: {result.stdout}")
+    try:
+        # En el proceso de la API los lotes se escriben de forma secuencial
+        ids = await run_in_threadpool(generar_siniestros, DATABASE_URL, siniestros, semilla, 1)
 
-            # Verificar que se creó el siniestro
-            from app.database import SessionLocal
-            from app import models
+        from app.database import SessionLocal
+        from app import models
 
-            db = SessionLocal()
-            count = db.query(models.Siniestro).count()
-            db.close()
+        db = SessionLocal()
+        count = db.query(models.Siniestro).count()
+        db.close()
 
-            return {
-                "message": "✅ Datos de prueba creados exitosamente",
-                "output": result.stdout.strip(),
-                "error": result.stderr.strip(),
-                "siniestros_creados": count,
-                "status": "success"
-            }
-        else:
-            logger.error(f"❌ Error creando datos de prueba: {result.stderr}")
-            return {
-                "error": f"Error creando datos: {result.stderr.strip()}",
-                "output": result.stdout.strip(),
-                "status": "failed"
-            }
+        return {
+            "message": "✅ Datos de prueba creados exitosamente",
+            "primer_id": ids.start,
+            "ultimo_id": ids.stop - 1,
+            "siniestros_creados": count,
+            "status": "success"
+        }
 
     except Exception as e:
-        logger.error(f"❌ Error ejecutando script: {e}")
+        logger.error(f"❌ Error creando datos de prueba: {e}")
         import traceback
         error_details = traceback.format_exc()
         logger.error(f"Traceback: {error_details}")
         return {
-            "error": f"Error ejecutando script: {str(e)}",
+            "error": f"Error creando datos: {str(e)}",
             "traceback": error_details,
             "status": "failed"
         }
 
+@app.get("/debug/queries")
+async def debug_queries():
+    """Consultas SQL por ruta (este proceso): histogramas de cantidad, tiempo en BD y duración"""
+    return {
+        "habilitado": query_stats.QUERY_STATS_ENABLED,
+        "slow_query_ms": query_stats.SLOW_QUERY_MS,
+        "rutas": query_stats.route_summary(),
+    }
+
+@app.delete("/debug/queries")
+async def reset_debug_queries():
+    """Reiniciar los histogramas de consultas por ruta"""
+    query_stats.reset_routes()
+    return {"message": "✅ Estadísticas de consultas reiniciadas"}
+
+@app.post("/debug/profile")
+async def debug_profile(segundos: float = 10, modo: str = "muestreo"):
+    """
+    Perfil de CPU de este worker durante `segundos`, guardado en PROFILE_DIR.
+    modo=muestreo: pilas de todos los hilos (.folded); modo=cprofile: hilo del event loop (.prof)
+    """
+    from fastapi import HTTPException
+    from fastapi.concurrency import run_in_threadpool
+
+    if not 0 < segundos <= profiling.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"segundos debe estar entre 0 y {profiling.PROFILE_MAX_SECONDS:g}")
+    if modo not in ("muestreo", "cprofile"):
+        raise HTTPException(status_code=400, detail="modo debe ser 'muestreo' o 'cprofile'")
+
+    logger.info(f"📈 Perfil de CPU ({modo}) por {segundos:g}s en el proceso {os.getpid()}")
+    try:
+        if modo == "cprofile":
+            return await profiling.cprofile_loop(segundos)
+        return await run_in_threadpool(profiling.sample_profile, segundos)
+    except profiling.ProfileInProgress:
+        raise HTTPException(status_code=409, detail="Ya hay un perfil en curso en este proceso")
+
 @app.post("/debug/apply-migrations")
 async def apply_migrations():
     """Aplicar migraciones de base de datos pendientes"""
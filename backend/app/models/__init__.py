@@ -1,2 +1,3 @@
 # Models package
 from .siniestro import *
+from .archivo import *
@@ -0,0 +1,36 @@
+"""
+Tablas de archivo de siniestros
+
+Copias de las columnas de siniestros y de sus entidades relacionadas, sin
+claves foráneas, restricciones únicas ni los índices de las tablas activas
+(solo los de búsqueda por siniestro). El job de archivo
+(app/services/archive_service.py) mueve aquí los siniestros cerrados antiguos
+y los eliminados, para que las tablas activas contengan solo el conjunto de
+trabajo.
+"""
+from sqlalchemy import Column, DateTime, Index, Table, func
+
+from app.database import Base
+from .siniestro import Siniestro, _ENTIDADES_SINIESTRO
+
+
+def _tabla_archivo(origen: Table, *extra) -> Table:
+    columnas = [
+        Column(c.name, c.type, primary_key=c.primary_key, autoincrement=False, nullable=c.nullable)
+        for c in origen.columns
+    ]
+    return Table(f"{origen.name}_archivo", Base.metadata, *columnas, *extra)
+
+
+siniestros_archivo = _tabla_archivo(
+    Siniestro.__table__,
+    Column("archivado_en", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+Index("ix_siniestros_archivo_reclamo_num", siniestros_archivo.c.reclamo_num)
+
+# Tabla activa -> tabla de archivo de cada entidad relacionada
+TABLAS_ARCHIVO = {}
+for _modelo in _ENTIDADES_SINIESTRO:
+    _archivo = _tabla_archivo(_modelo.__table__)
+    Index(f"ix_{_archivo.name}_siniestro_id", _archivo.c.siniestro_id)
+    TABLAS_ARCHIVO[_modelo.__table__] = _archivo
@@ -1,6 +1,39 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, ForeignKey, func
-from sqlalchemy.orm import relationship
+import hashlib
+import re
+import unicodedata
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, ForeignKey, Index, UniqueConstraint, event, func, inspect, text, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session, object_session, relationship, with_loader_criteria
 from app.database import Base
+from app.utils import geohash
+
+# Palabras que no aportan a la comparación de direcciones
+_DIRECCION_STOPWORDS = {"y", "e", "de", "del", "la", "el", "los", "las", "av", "avenida", "calle", "and", "s", "n", "sn"}
+
+
+def clave_normalizada(column):
+    """Expresión SQL equivalente a normalizar_clave() para índices funcionales"""
+    return func.upper(func.regexp_replace(column, "[^A-Za-z0-9]", "", "g"))
+
+
+def normalizar_clave(valor):
+    """Normaliza placas, chasis, series de motor y cédulas: sin separadores y en mayúsculas"""
+    if not valor:
+        return None
+    return re.sub(r"[^A-Za-z0-9]", "", valor).upper() or None
+
+
+def clave_direccion(direccion):
+    """Hash de la dirección sin tildes, puntuación, palabras vacías ni orden de tokens"""
+    if not direccion:
+        return None
+    texto = unicodedata.normalize("NFKD", direccion).encode("ASCII", "ignore").decode("ASCII").lower()
+    tokens = sorted(set(re.findall(r"[a-z0-9]+", texto)) - _DIRECCION_STOPWORDS)
+    if not tokens:
+        return None
+    return hashlib.sha1(" ".join(tokens).encode()).hexdigest()
+
 
 class Siniestro(Base):
     __tablename__ = "siniestros"
@@ -10,11 +43,13 @@ class Siniestro(Base):
     ruc_compania = Column(String(20))  # RUC de la compañía de seguros
     tipo_reclamo = Column(String(50))  # Tipo de reclamo (ROBO, etc.)
     poliza = Column(String(50))  # Número de póliza
-    reclamo_num = Column(String(100), unique=True, nullable=False)
-    fecha_siniestro = Column(DateTime(timezone=True), nullable=False)
+    reclamo_num = Column(String(100), nullable=False)  # Único entre los activos (uq_siniestros_reclamo_num_activo)
+    fecha_siniestro = Column(DateTime(timezone=True), nullable=False, index=True)
     direccion_siniestro = Column(String(500), nullable=False)
+    direccion_clave = Column(String(40), index=True)  # Hash de la dirección normalizada (detección de duplicados)
     ubicacion_geo_lat = Column(Float)
     ubicacion_geo_lng = Column(Float)
+    ubicacion_geohash = Column(String(12, collation="C"))  # Geohash del punto (búsquedas por prefijo con B-tree)
     danos_terceros = Column(Boolean, default=False)
     ejecutivo_cargo = Column(String(255))
     fecha_designacion = Column(DateTime(timezone=True))
@@ -40,13 +75,17 @@ class Siniestro(Base):
     otras_diligencias_imagen_url = Column(String(500))  # URL de imagen para otras diligencias
     visita_taller_descripcion = Column(Text)  # Texto de visita al taller
     visita_taller_imagen_url = Column(String(500))  # URL de imagen para visita al taller
-    observaciones = Column(Text)  # JSON con lista numerada de observaciones
-    recomendacion_pago_cobertura = Column(Text)  # JSON con lista numerada de recomendaciones de pago
-    conclusiones = Column(Text)  # JSON con lista numerada de conclusiones
-    anexo = Column(Text)  # JSON con lista numerada de anexos
+    observaciones = Column(JSONB)  # Lista numerada de observaciones (arreglo JSON de textos)
+    recomendacion_pago_cobertura = Column(JSONB)  # Lista numerada de recomendaciones de pago
+    conclusiones = Column(JSONB)  # Lista numerada de conclusiones
+    anexo = Column(JSONB)  # Lista numerada de anexos
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Versión del grafo del siniestro: sube con cada escritura del siniestro o de sus entidades (ver bump_claim_versions)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Borrado lógico: NULL = activo. Las consultas ORM no ven los eliminados (ver _solo_activos)
+    eliminado_en = Column(DateTime(timezone=True))
 
     # Relationships
     asegurado = relationship("Asegurado", back_populates="siniestro", uselist=False, cascade="all, delete-orphan")
@@ -55,16 +94,16 @@ class Siniestro(Base):
     objeto_asegurado = relationship("ObjetoAsegurado", back_populates="siniestro", uselist=False, cascade="all, delete-orphan")
     visita_taller = relationship("VisitaTaller", back_populates="siniestro", uselist=False, cascade="all, delete-orphan")
     dinamica_accidente = relationship("DinamicaAccidente", back_populates="siniestro", uselist=False, cascade="all, delete-orphan")
-    antecedentes = relationship("Antecedente", back_populates="siniestro")
-    relatos_asegurado = relationship("RelatoAsegurado", back_populates="siniestro")
-    inspecciones = relationship("Inspeccion", back_populates="siniestro")
-    testigos = relationship("Testigo", back_populates="siniestro")
+    antecedentes = relationship("Antecedente", back_populates="siniestro", cascade="all, delete-orphan")
+    relatos_asegurado = relationship("RelatoAsegurado", back_populates="siniestro", cascade="all, delete-orphan")
+    inspecciones = relationship("Inspeccion", back_populates="siniestro", cascade="all, delete-orphan")
+    testigos = relationship("Testigo", back_populates="siniestro", cascade="all, delete-orphan")
 
 class Asegurado(Base):
     __tablename__ = "asegurados"
 
     id = Column(Integer, primary_key=True, index=True)
-    siniestro_id = Column(Integer, ForeignKey("siniestros.id"), unique=True)
+    siniestro_id = Column(Integer, ForeignKey("siniestros.id", ondelete="CASCADE"), unique=True)
     tipo = Column(String(50))  # Natural o Jurídica
     cedula = Column(String(20))
     nombre = Column(String(255))
@@ -84,7 +123,7 @@ class Beneficiario(Base):
     __tablename__ = "beneficiarios"
 
     id = Column(Integer, primary_key=True, index=True)
-    siniestro_id = Column(Integer, ForeignKey("siniestros.id"), unique=True)
+    siniestro_id = Column(Integer, ForeignKey("siniestros.id", ondelete="CASCADE"), unique=True)
     razon_social = Column(String(255))  # Razón social del beneficiario
     cedula_ruc = Column(String(20))  # Cédula o RUC del beneficiario
     domicilio = Column(String(500))  # Domicilio del beneficiario
@@ -95,7 +134,7 @@ class Conductor(Base):
     __tablename__ = "conductores"
 
     id = Column(Integer, primary_key=True, index=True)
-    siniestro_id = Column(Integer, ForeignKey("siniestros.id"), unique=True)
+    siniestro_id = Column(Integer, ForeignKey("siniestros.id", ondelete="CASCADE"), unique=True)
     nombre = Column(String(255), nullable=False)
     cedula = Column(String(20), nullable=False)
     celular = Column(String(20))
@@ -108,7 +147,7 @@ class ObjetoAsegurado(Base):
     __tablename__ = "objetos_asegurados"
 
     id = Column(Integer, primary_key=True, index=True)
-    siniestro_id = Column(Integer, ForeignKey("siniestros.id"), unique=True)
+    siniestro_id = Column(Integer, ForeignKey("siniestros.id", ondelete="CASCADE"), unique=True)
     placa = Column(String(20), nullable=False)
     marca = Column(String(100))
     modelo = Column(String(100))
@@ -124,7 +163,7 @@ class Antecedente(Base):
     __tablename__ = "antecedentes"
 
     id = Column(Integer, primary_key=True, index=True)
-    siniestro_id = Column(Integer, ForeignKey("siniestros.id"))
+    siniestro_id = Column(Integer, ForeignKey("siniestros.id", ondelete="CASCADE"))
     descripcion = Column(Text, nullable=False)
 
     siniestro = relationship("Siniestro", back_populates="antecedentes")
@@ -133,7 +172,7 @@ class RelatoAsegurado(Base):
     __tablename__ = "relatos_asegurado"
 
     id = Column(Integer, primary_key=True, index=True)
-    siniestro_id = Column(Integer, ForeignKey("siniestros.id"))
+    siniestro_id = Column(Integer, ForeignKey("siniestros.id", ondelete="CASCADE"))
     numero_relato = Column(Integer, nullable=False)
     texto = Column(Text, nullable=False)
     imagen_url = Column(String(500))  # URL de la imagen subida
@@ -144,7 +183,7 @@ class Inspeccion(Base):
     __tablename__ = "inspecciones"
 
     id = Column(Integer, primary_key=True, index=True)
-    siniestro_id = Column(Integer, ForeignKey("siniestros.id"))
+    siniestro_id = Column(Integer, ForeignKey("siniestros.id", ondelete="CASCADE"))
     numero_inspeccion = Column(Integer, nullable=False)
     descripcion = Column(Text, nullable=False)
     imagen_url = Column(String(500))
@@ -155,7 +194,7 @@ class Testigo(Base):
     __tablename__ = "testigos"
 
     id = Column(Integer, primary_key=True, index=True)
-    siniestro_id = Column(Integer, ForeignKey("siniestros.id"))
+    siniestro_id = Column(Integer, ForeignKey("siniestros.id", ondelete="CASCADE"))
     numero_relato = Column(Integer, nullable=False)
     texto = Column(Text, nullable=False)
     imagen_url = Column(String(500))
@@ -166,7 +205,7 @@ class VisitaTaller(Base):
     __tablename__ = "visitas_taller"
 
     id = Column(Integer, primary_key=True, index=True)
-    siniestro_id = Column(Integer, ForeignKey("siniestros.id"), unique=True)
+    siniestro_id = Column(Integer, ForeignKey("siniestros.id", ondelete="CASCADE"), unique=True)
     descripcion = Column(Text, nullable=False)
 
     siniestro = relationship("Siniestro", back_populates="visita_taller")
@@ -175,7 +214,235 @@ class DinamicaAccidente(Base):
     __tablename__ = "dinamicas_accidente"
 
     id = Column(Integer, primary_key=True, index=True)
-    siniestro_id = Column(Integer, ForeignKey("siniestros.id"), unique=True)
+    siniestro_id = Column(Integer, ForeignKey("siniestros.id", ondelete="CASCADE"), unique=True)
     descripcion = Column(Text, nullable=False)
 
     siniestro = relationship("Siniestro", back_populates="dinamica_accidente")
+
+class SenalFraude(Base):
+    __tablename__ = "senales_fraude"
+
+    id = Column(Integer, primary_key=True, index=True)
+    siniestro_id = Column(Integer, ForeignKey("siniestros.id", ondelete="CASCADE"), nullable=False, index=True)
+    siniestro_relacionado_id = Column(Integer, ForeignKey("siniestros.id", ondelete="CASCADE"), nullable=False, index=True)
+    tipo = Column(String(30), nullable=False)  # placa, chasis, serie_motor, conductor_cedula, asegurado_cedula, direccion, ubicacion
+    valor = Column(String(500))  # Valor normalizado compartido por ambos siniestros
+    dias_diferencia = Column(Float)  # Días entre las fechas de ambos siniestros
+    detectado_en = Column(DateTime(timezone=True), server_default=func.now())
+
+class EstadisticaSiniestros(Base):
+    """Resumen pre-agregado por dimensión, actualizado en cada escritura de siniestros"""
+    __tablename__ = "estadisticas_siniestros"
+    __table_args__ = (UniqueConstraint("dimension", "valor", name="uq_estadisticas_dimension_valor"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    dimension = Column(String(30), nullable=False)  # compania_seguros, tipo_reclamo, cobertura, mes
+    valor = Column(String(255), nullable=False, default="")  # '' cuando el campo no está especificado
+    total = Column(Integer, nullable=False, default=0)
+    dias_reporte_suma = Column(Float, nullable=False, default=0)  # fecha_reportado - fecha_siniestro
+    dias_reporte_n = Column(Integer, nullable=False, default=0)
+    dias_designacion_suma = Column(Float, nullable=False, default=0)  # fecha_designacion - fecha_siniestro
+    dias_designacion_n = Column(Integer, nullable=False, default=0)
+
+class SiniestroEliminado(Base):
+    """Lápida de un siniestro eliminado, para que la sincronización incremental propague el borrado"""
+    __tablename__ = "siniestros_eliminados"
+
+    id = Column(Integer, primary_key=True)
+    siniestro_id = Column(Integer, nullable=False)  # Sin FK: el siniestro ya no existe
+    eliminado_en = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+class TrabajoPdf(Base):
+    """Trabajo de generación de informe PDF procesado por pdf_worker.py"""
+    __tablename__ = "trabajos_pdf"
+    __table_args__ = (
+        # Cola: solo los pendientes, en orden de disponibilidad
+        Index("ix_trabajos_pdf_pendientes", "disponible_en", postgresql_where=text("estado = 'pendiente'")),
+        # A lo sumo un trabajo pendiente por siniestro y variante (encolar de nuevo lo reutiliza)
+        Index(
+            "uq_trabajos_pdf_pendiente", "siniestro_id", "variante",
+            unique=True, postgresql_where=text("estado = 'pendiente'"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    siniestro_id = Column(Integer, ForeignKey("siniestros.id", ondelete="CASCADE"), nullable=False, index=True)
+    variante = Column(String(20), nullable=False, default="firmado")  # firmado, sin_firma
+    estado = Column(String(20), nullable=False, default="pendiente")  # pendiente, procesando, completado, error
+    progreso = Column(Integer, nullable=False, default=0)  # 0-100
+    etapa = Column(String(100))  # Descripción de la etapa actual
+    huella = Column(String(40))  # Huella del contenido renderizado (clave en el almacén de informes)
+    error = Column(Text)
+    intentos = Column(Integer, nullable=False, default=0)
+    disponible_en = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # No procesar antes de
+    creado_en = Column(DateTime(timezone=True), server_default=func.now())
+    iniciado_en = Column(DateTime(timezone=True))
+    finalizado_en = Column(DateTime(timezone=True))
+
+
+# Índices funcionales usados por la detección de duplicados (app/services/fraud_detector.py)
+Index("ix_asegurados_cedula_norm", clave_normalizada(Asegurado.cedula))
+Index("ix_conductores_cedula_norm", clave_normalizada(Conductor.cedula))
+Index("ix_objetos_asegurados_placa_norm", clave_normalizada(ObjetoAsegurado.placa))
+Index("ix_objetos_asegurados_chasis_norm", clave_normalizada(ObjetoAsegurado.chasis))
+Index("ix_objetos_asegurados_serie_motor_norm", clave_normalizada(ObjetoAsegurado.serie_motor))
+
+
+# Índices geoespaciales: prefijo geohash (cubre lat/lng para index-only scans) y rango lat/lng
+Index(
+    "ix_siniestros_geohash",
+    Siniestro.ubicacion_geohash,
+    postgresql_include=["ubicacion_geo_lat", "ubicacion_geo_lng"],
+)
+Index("ix_siniestros_lat_lng", Siniestro.ubicacion_geo_lat, Siniestro.ubicacion_geo_lng)
+
+
+# Sincronización incremental (app/services/sync_service.py): recorrido por (updated_at, id) de los activos
+Index("ix_siniestros_updated_at_id", Siniestro.updated_at, Siniestro.id, postgresql_where=text("eliminado_en IS NULL"))
+
+
+# Borrado lógico: las consultas calientes recorren solo los activos; el número de
+# reclamo es único entre ellos (uno eliminado no impide volver a registrarlo) y el
+# job de archivo (app/services/archive_service.py) busca los eliminados por fecha
+Index("uq_siniestros_reclamo_num_activo", Siniestro.reclamo_num, unique=True, postgresql_where=text("eliminado_en IS NULL"))
+Index("ix_siniestros_activos", Siniestro.id, postgresql_where=text("eliminado_en IS NULL"))
+Index("ix_siniestros_eliminado_en", Siniestro.eliminado_en, postgresql_where=text("eliminado_en IS NOT NULL"))
+
+
+# Listas numeradas: búsquedas por contención (@>) de ítems
+CAMPOS_LISTA = ("observaciones", "recomendacion_pago_cobertura", "conclusiones", "anexo")
+for _campo in CAMPOS_LISTA:
+    Index(
+        f"ix_siniestros_{_campo}_gin", getattr(Siniestro, _campo),
+        postgresql_using="gin", postgresql_ops={_campo: "jsonb_path_ops"},
+    )
+
+
+@event.listens_for(Siniestro, "after_delete")
+def _registrar_lapida(mapper, connection, target):
+    connection.execute(SiniestroEliminado.__table__.insert().values(siniestro_id=target.id))
+
+
+def _es_borrado_logico(obj) -> bool:
+    """El flush marca el siniestro como eliminado (eliminado_en pasa de NULL a un valor)"""
+    historial = inspect(obj).attrs.eliminado_en.history
+    return (
+        any(valor is not None for valor in historial.added)
+        and not any(valor is not None for valor in historial.deleted)
+    )
+
+
+def borrado_logico_en_flush(target) -> bool:
+    """
+    Para los eventos del mapper (after_update): el flush en curso aplica el borrado
+    lógico de `target`. Se registra en before_flush porque, asignado con func.now(),
+    eliminado_en ya no tiene historial durante el UPDATE.
+    """
+    session = object_session(target)
+    return session is not None and target.id in session.info.get("siniestros_borrados", ())
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _solo_activos(estado):
+    """
+    Las consultas ORM no ven los siniestros eliminados (borrado lógico).
+    Para incluirlos: .execution_options(incluir_eliminados=True). Las sentencias
+    Core sobre Siniestro.__table__ (versiones, archivo) no se filtran.
+    """
+    if (
+        estado.is_select
+        and not estado.is_column_load
+        and not estado.is_relationship_load
+        and not estado.execution_options.get("incluir_eliminados", False)
+    ):
+        estado.statement = estado.statement.options(
+            with_loader_criteria(Siniestro, Siniestro.eliminado_en.is_(None), include_aliases=True)
+        )
+
+
+@event.listens_for(Siniestro, "before_insert")
+@event.listens_for(Siniestro, "before_update")
+def _actualizar_claves_derivadas(mapper, connection, target):
+    target.direccion_clave = clave_direccion(target.direccion_siniestro)
+    if target.ubicacion_geo_lat is not None and target.ubicacion_geo_lng is not None:
+        target.ubicacion_geohash = geohash.encode(float(target.ubicacion_geo_lat), float(target.ubicacion_geo_lng))
+    else:
+        target.ubicacion_geohash = None
+
+
+# Entidades cuyo cambio modifica el siniestro al que pertenecen
+_ENTIDADES_SINIESTRO = (
+    Asegurado, Beneficiario, Conductor, ObjetoAsegurado, Antecedente,
+    RelatoAsegurado, Inspeccion, Testigo, VisitaTaller, DinamicaAccidente,
+)
+
+
+def _siniestros_de(obj):
+    """IDs de siniestro afectados por un cambio en una entidad relacionada (actual y anterior)"""
+    estado = inspect(obj)
+    historial = estado.attrs.siniestro_id.history
+    ids = set(historial.added) | set(historial.deleted) | set(historial.unchanged)
+    padre = estado.attrs.siniestro.loaded_value
+    if isinstance(padre, Siniestro) and padre.id is not None:
+        ids.add(padre.id)
+    return {i for i in ids if i is not None}
+
+
+@event.listens_for(Session, "before_flush")
+def _registrar_siniestros_modificados(session, flush_context, instances):
+    modificados = session.info.setdefault("siniestros_modificados", set())
+    directos = session.info.setdefault("siniestros_actualizados", set())
+    borrados = session.info.setdefault("siniestros_borrados", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Siniestro):
+            if obj in session.dirty and obj.id is not None and session.is_modified(obj, include_collections=False):
+                # Va en el mismo UPDATE del siniestro (updated_at lo pone onupdate)
+                obj.version = Siniestro.version + 1
+                (borrados if _es_borrado_logico(obj) else directos).add(obj.id)
+        elif isinstance(obj, _ENTIDADES_SINIESTRO):
+            if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+                continue
+            modificados.update(_siniestros_de(obj))
+
+
+@event.listens_for(Session, "after_flush")
+def bump_claim_versions(session, flush_context):
+    """
+    Sube version y updated_at de los siniestros cuyas entidades relacionadas
+    cambiaron en este flush, en la misma transacción y con un solo UPDATE.
+    Los siniestros escritos directamente ya subieron su versión en su propio UPDATE.
+    Los eliminados con borrado lógico dejan su lápida, como los borrados físicos.
+    Luego publica los cambios con NOTIFY (se entregan al confirmar la transacción).
+    """
+    ids = session.info.pop("siniestros_modificados", set())
+    directos = session.info.pop("siniestros_actualizados", set())
+    borrados = session.info.pop("siniestros_borrados", set())
+    creados = {obj.id for obj in session.new if isinstance(obj, Siniestro)}
+    eliminados = {obj.id for obj in session.deleted if isinstance(obj, Siniestro)} | borrados
+    ids -= directos | creados | eliminados
+    if ids:
+        session.connection().execute(
+            update(Siniestro.__table__)
+            .where(Siniestro.__table__.c.id.in_(ids))
+            .values(version=Siniestro.__table__.c.version + 1, updated_at=func.now())
+        )
+        session.info.setdefault("siniestros_versionados", set()).update(ids)
+    if borrados:
+        session.connection().execute(
+            SiniestroEliminado.__table__.insert(), [{"siniestro_id": i} for i in sorted(borrados)]
+        )
+
+    if creados or directos or ids or eliminados:
+        from app.services.eventos_service import notificar_cambios
+        notificar_cambios(session.connection(), creados=creados, actualizados=directos | ids, eliminados=eliminados)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expirar_versiones(session, flush_context):
+    # Las instancias cargadas releen version y updated_at en el próximo acceso
+    ids = session.info.pop("siniestros_versionados", None)
+    if not ids:
+        return
+    for obj in session.identity_map.values():
+        if isinstance(obj, Siniestro) and obj.id in ids:
+            session.expire(obj, ["version", "updated_at"])
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app import schemas
+from app.database import get_db
+from app.services import statistics_service
+
+router = APIRouter()
+
+
+@router.get("/", response_model=schemas.EstadisticasResponse)
+async def get_estadisticas(db: Session = Depends(get_db)):
+    """Estadísticas del tablero desde el resumen pre-agregado (costo constante)"""
+    return statistics_service.obtener_estadisticas(db)
+
+
+@router.post("/reconstruir", response_model=schemas.EstadisticasResponse)
+async def reconstruir_estadisticas(db: Session = Depends(get_db)):
+    """Recalcular el resumen completo (tras cargas masivas fuera del ORM)"""
+    statistics_service.reconstruir_estadisticas(db)
+    return statistics_service.obtener_estadisticas(db)
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app import schemas
+from app.database import get_db
+from app.services import geo_service
+
+router = APIRouter()
+
+
+def _validar_rectangulo(min_lat: float, min_lng: float, max_lat: float, max_lng: float):
+    if min_lat > max_lat or min_lng > max_lng:
+        raise HTTPException(status_code=400, detail="Rectángulo inválido: los mínimos superan a los máximos")
+
+
+@router.get("/radio", response_model=List[schemas.SiniestroGeoResponse])
+async def siniestros_en_radio(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    metros: float = Query(500, gt=0, le=100_000),
+    limit: int = Query(500, gt=0, le=5000),
+    db: Session = Depends(get_db),
+):
+    """Siniestros a menos de `metros` del punto, del más cercano al más lejano"""
+    return geo_service.buscar_en_radio(db, lat, lng, metros, limit)
+
+
+@router.get("/bbox", response_model=List[schemas.SiniestroGeoResponse])
+async def siniestros_en_rectangulo(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    limit: int = Query(1000, gt=0, le=10000),
+    db: Session = Depends(get_db),
+):
+    """Siniestros dentro del rectángulo visible del mapa"""
+    _validar_rectangulo(min_lat, min_lng, max_lat, max_lng)
+    return geo_service.buscar_en_rectangulo(db, min_lat, min_lng, max_lat, max_lng, limit)
+
+
+@router.get("/clusters", response_model=List[schemas.ClusterGeoResponse])
+async def clusters_en_rectangulo(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    precision: Optional[int] = Query(None, ge=1, le=12),
+    db: Session = Depends(get_db),
+):
+    """Conteo de siniestros por celda geohash para el mapa de calor"""
+    _validar_rectangulo(min_lat, min_lng, max_lat, max_lng)
+    return geo_service.contar_clusters(db, min_lat, min_lng, max_lat, max_lng, precision)
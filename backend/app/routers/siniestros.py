@@ -1,14 +1,29 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query, Request, Response
+from sqlalchemy import Integer, Text, cast, func, update
+from sqlalchemy.dialects.postgresql import JSONB, array
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 from app import models, schemas
 from app.database import get_db
+from app.utils import fast_json, response_cache
 
 router = APIRouter()
 
 
+def _programar_prerender(db: Session, siniestro_id: int):
+    """Pre-render del informe si el siniestro quedó completo; nunca interrumpe la escritura"""
+    import logging
+    from app.services.pdf_jobs import programar_prerender
+
+    try:
+        programar_prerender(db, siniestro_id)
+    except Exception as e:
+        db.rollback()
+        logging.getLogger(__name__).warning(f"⚠️ No se pudo programar el pre-render del siniestro {siniestro_id}: {e}")
+
+
 @router.post("/", response_model=schemas.SiniestroResponse)
 async def create_siniestro(
     siniestro: schemas.SiniestroCreate, db: Session = Depends(get_db)
@@ -64,22 +79,152 @@ async def create_siniestro(
 
 @router.get("/", response_model=List[schemas.SiniestroResponse])
 async def get_siniestros(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+    request: Request, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+):
+    """Obtener todos los siniestros con paginación (ETag por página, 304 si no cambió)"""
+    versiones = (
+        db.query(models.Siniestro.id, models.Siniestro.version)
+        .order_by(models.Siniestro.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    etag = response_cache.list_etag(versiones, skip, limit)
+    if response_cache.etag_matches(request, etag):
+        return response_cache.not_modified(etag)
+    body = response_cache.cache.get(("lista", etag))
+    if body is None:
+        siniestros = (
+            db.query(models.Siniestro).order_by(models.Siniestro.id).offset(skip).limit(limit).all()
+        )
+        # ETag de lo que efectivamente se serializa (pudo cambiar entre ambas consultas)
+        etag = response_cache.list_etag([(s.id, s.version) for s in siniestros], skip, limit)
+        body = fast_json.dump_models(siniestros, schemas.SiniestroResponse)
+        response_cache.cache.put(("lista", etag), body)
+    return response_cache.json_response(body, etag)
+
+
+@router.get("/cambios", response_model=schemas.CambiosSiniestrosResponse)
+async def get_cambios_siniestros(
+    cursor: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    limite: int = 500,
+    db: Session = Depends(get_db),
 ):
-    """Obtener todos los siniestros con paginación"""
-    siniestros = db.query(models.Siniestro).offset(skip).limit(limit).all()
-    return siniestros
+    """
+    Sincronización incremental: siniestros creados, modificados y eliminados
+    después del cursor de la respuesta anterior (o de `desde`). Sin cursor
+    entrega la carga inicial completa, paginada con `hay_mas`.
+    """
+    from app.services.sync_service import obtener_cambios, CursorInvalido
+
+    if desde is not None and desde.tzinfo is None:
+        raise HTTPException(status_code=400, detail="desde debe incluir zona horaria")
+    try:
+        resultado = obtener_cambios(db, cursor=cursor, desde=desde, limite=limite)
+    except CursorInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not fast_json.enabled():
+        return resultado
+    resultado["cambios"] = [fast_json.to_dict(s, schemas.SiniestroResponse) for s in resultado["cambios"]]
+    return Response(fast_json.dumps(resultado), media_type="application/json")
+
+
+@router.get("/eventos")
+async def eventos_siniestros(request: Request, ids: Optional[str] = None):
+    """
+    Server-sent events con los cambios de siniestros (creado, actualizado,
+    eliminado, resincronizar). `ids=1,2,3` limita el stream a esos siniestros.
+    """
+    from fastapi.responses import StreamingResponse
+    from app.services.eventos_service import flujo_sse
+
+    filtro = None
+    if ids:
+        try:
+            filtro = {int(i) for i in ids.split(",") if i.strip()}
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids debe ser una lista de enteros separados por comas")
+
+    return StreamingResponse(
+        flujo_sse(request, filtro),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/listas/{campo}/buscar", response_model=List[schemas.SiniestroResponse])
+async def buscar_en_lista(campo: str, item: str, limit: int = 100, db: Session = Depends(get_db)):
+    """Siniestros cuya lista `campo` contiene exactamente el ítem (índice GIN, operador @>)"""
+    columna = _columna_lista(campo)
+    siniestros = (
+        db.query(models.Siniestro)
+        .filter(columna.contains([item.strip()]))
+        .order_by(models.Siniestro.id)
+        .limit(min(limit, 1000))
+        .all()
+    )
+    return Response(fast_json.dump_models(siniestros, schemas.SiniestroResponse), media_type="application/json")
+
+
+@router.get("/exportar")
+async def exportar_siniestros(
+    formato: str = "csv",
+    compania_seguros: Optional[str] = None,
+    fecha_desde: Optional[datetime] = None,
+    fecha_hasta: Optional[datetime] = None,
+):
+    """Exportar siniestros con sus entidades en el formato de la plantilla de precarga (CSV o XLSX)"""
+    from fastapi.responses import StreamingResponse
+    from app.database import SessionLocal
+    from app.services.export_service import exportar, XLSX_AVAILABLE
+
+    if formato not in ("csv", "xlsx"):
+        raise HTTPException(status_code=400, detail="Formato no soportado. Use csv o xlsx")
+    if formato == "xlsx" and not XLSX_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Exportación XLSX no disponible (falta openpyxl)")
+
+    media_types = {
+        "csv": "text/csv; charset=utf-8",
+        "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    }
+    filename = f"siniestros_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}"
+
+    return StreamingResponse(
+        exportar(
+            SessionLocal,
+            formato,
+            compania_seguros=compania_seguros,
+            fecha_desde=fecha_desde,
+            fecha_hasta=fecha_hasta,
+        ),
+        media_type=media_types[formato],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
 
 
 @router.get("/{siniestro_id}", response_model=schemas.SiniestroFullResponse)
-async def get_siniestro(siniestro_id: int, db: Session = Depends(get_db)):
-    """Obtener un siniestro completo por ID con todas sus relaciones"""
-    siniestro = (
-        db.query(models.Siniestro).filter(models.Siniestro.id == siniestro_id).first()
+async def get_siniestro(siniestro_id: int, request: Request, db: Session = Depends(get_db)):
+    """Obtener un siniestro completo por ID con todas sus relaciones (ETag, 304 si no cambió)"""
+    version = (
+        db.query(models.Siniestro.version).filter(models.Siniestro.id == siniestro_id).scalar()
     )
-    if not siniestro:
+    if version is None:
         raise HTTPException(status_code=404, detail="Siniestro no encontrado")
-    return siniestro
+    etag = response_cache.claim_etag(siniestro_id, version)
+    if response_cache.etag_matches(request, etag):
+        return response_cache.not_modified(etag)
+    body = response_cache.cache.get(("detalle", siniestro_id, version))
+    if body is None:
+        siniestro = (
+            db.query(models.Siniestro).filter(models.Siniestro.id == siniestro_id).first()
+        )
+        if not siniestro:
+            raise HTTPException(status_code=404, detail="Siniestro no encontrado")
+        etag = response_cache.claim_etag(siniestro_id, siniestro.version)
+        body = fast_json.dump_model(siniestro, schemas.SiniestroFullResponse)
+        response_cache.cache.put(("detalle", siniestro_id, siniestro.version), body)
+    return response_cache.json_response(body, etag)
 
 
 @router.put("/{siniestro_id}", response_model=schemas.SiniestroResponse)
@@ -156,33 +301,54 @@ async def update_siniestro(
             db.add(db_conductor)
 
     db.commit()
+    _programar_prerender(db, siniestro_id)
     db.refresh(db_siniestro)
     return db_siniestro
 
 
 @router.delete("/{siniestro_id}")
 async def delete_siniestro(siniestro_id: int, db: Session = Depends(get_db)):
-    """Eliminar un siniestro"""
+    """
+    Eliminar un siniestro (borrado lógico: deja de aparecer en las consultas y el
+    job de archivo lo mueve a las tablas de archivo pasado el plazo de retención)
+    """
     db_siniestro = (
         db.query(models.Siniestro).filter(models.Siniestro.id == siniestro_id).first()
     )
     if not db_siniestro:
         raise HTTPException(status_code=404, detail="Siniestro no encontrado")
 
-    db.delete(db_siniestro)
+    db_siniestro.eliminado_en = func.now()
     db.commit()
     return {"message": "Siniestro eliminado exitosamente"}
 
 
 # Additional endpoints for related entities
+def _verificar_siniestro_activo(db: Session, siniestro_id: int):
+    """
+    404 si el siniestro no existe o fue eliminado (borrado lógico: la fila sigue
+    y la FK no falla). FOR SHARE impide que se elimine antes del commit.
+    """
+    existe = (
+        db.query(models.Siniestro.id)
+        .filter(models.Siniestro.id == siniestro_id, models.Siniestro.eliminado_en.is_(None))
+        .with_for_update(read=True)
+        .scalar()
+    )
+    if existe is None:
+        raise HTTPException(status_code=404, detail="Siniestro no encontrado")
+
+
 @router.post("/{siniestro_id}/asegurado", response_model=schemas.AseguradoResponse)
 async def create_asegurado(
     siniestro_id: int, asegurado: schemas.AseguradoCreate, db: Session = Depends(get_db)
 ):
     """Crear asegurado para un siniestro"""
+    _verificar_siniestro_activo(db, siniestro_id)
     db_asegurado = models.Asegurado(siniestro_id=siniestro_id, **asegurado.model_dump())
     db.add(db_asegurado)
     db.commit()
+    _programar_prerender(db, siniestro_id)
     db.refresh(db_asegurado)
     return db_asegurado
 
@@ -192,9 +358,11 @@ async def create_beneficiario(
     siniestro_id: int, beneficiario: schemas.BeneficiarioCreate, db: Session = Depends(get_db)
 ):
     """Crear beneficiario para un siniestro"""
+    _verificar_siniestro_activo(db, siniestro_id)
     db_beneficiario = models.Beneficiario(siniestro_id=siniestro_id, **beneficiario.model_dump())
     db.add(db_beneficiario)
     db.commit()
+    _programar_prerender(db, siniestro_id)
     db.refresh(db_beneficiario)
     return db_beneficiario
 
@@ -204,9 +372,11 @@ async def create_objeto_asegurado(
     siniestro_id: int, objeto_asegurado: schemas.ObjetoAseguradoCreate, db: Session = Depends(get_db)
 ):
     """Crear objeto asegurado para un siniestro"""
+    _verificar_siniestro_activo(db, siniestro_id)
     db_objeto = models.ObjetoAsegurado(siniestro_id=siniestro_id, **objeto_asegurado.model_dump())
     db.add(db_objeto)
     db.commit()
+    _programar_prerender(db, siniestro_id)
     db.refresh(db_objeto)
     return db_objeto
 
@@ -220,6 +390,7 @@ async def create_relato_asegurado(
     db: Session = Depends(get_db),
 ):
     """Crear relato del asegurado"""
+    _verificar_siniestro_activo(db, siniestro_id)
     # Get the next numero_relato
     max_num = (
         db.query(models.RelatoAsegurado)
@@ -229,10 +400,12 @@ async def create_relato_asegurado(
     numero_relato = max_num + 1
 
     db_relato = models.RelatoAsegurado(
-        siniestro_id=siniestro_id, numero_relato=numero_relato, **relato.model_dump()
+        siniestro_id=siniestro_id, numero_relato=numero_relato,
+        **relato.model_dump(exclude={"numero_relato"})
     )
     db.add(db_relato)
     db.commit()
+    _programar_prerender(db, siniestro_id)
     db.refresh(db_relato)
     return db_relato
 
@@ -245,6 +418,7 @@ async def create_inspeccion(
     db: Session = Depends(get_db),
 ):
     """Crear inspección del lugar del siniestro"""
+    _verificar_siniestro_activo(db, siniestro_id)
     max_num = (
         db.query(models.Inspeccion)
         .filter(models.Inspeccion.siniestro_id == siniestro_id)
@@ -255,10 +429,11 @@ async def create_inspeccion(
     db_inspeccion = models.Inspeccion(
         siniestro_id=siniestro_id,
         numero_inspeccion=numero_inspeccion,
-        **inspeccion.model_dump(),
+        **inspeccion.model_dump(exclude={"numero_inspeccion"}),
     )
     db.add(db_inspeccion)
     db.commit()
+    _programar_prerender(db, siniestro_id)
     db.refresh(db_inspeccion)
     return db_inspeccion
 
@@ -268,6 +443,7 @@ async def create_testigo(
     siniestro_id: int, testigo: schemas.TestigoCreate, db: Session = Depends(get_db)
 ):
     """Crear testigo"""
+    _verificar_siniestro_activo(db, siniestro_id)
     max_num = (
         db.query(models.Testigo)
         .filter(models.Testigo.siniestro_id == siniestro_id)
@@ -276,14 +452,137 @@ async def create_testigo(
     numero_relato = max_num + 1
 
     db_testigo = models.Testigo(
-        siniestro_id=siniestro_id, numero_relato=numero_relato, **testigo.model_dump()
+        siniestro_id=siniestro_id, numero_relato=numero_relato,
+        **testigo.model_dump(exclude={"numero_relato"})
     )
     db.add(db_testigo)
     db.commit()
+    _programar_prerender(db, siniestro_id)
     db.refresh(db_testigo)
     return db_testigo
 
 
+# Listas numeradas (observaciones, recomendaciones, conclusiones, anexos): edición por ítem
+def _columna_lista(campo: str):
+    if campo not in models.CAMPOS_LISTA:
+        raise HTTPException(status_code=404, detail=f"Lista no soportada. Use: {', '.join(models.CAMPOS_LISTA)}")
+    return getattr(models.Siniestro, campo)
+
+
+def _modificar_lista(db: Session, siniestro_id: int, campo: str, nuevo_valor, condicion=None,
+                     version: Optional[int] = None, error_condicion=(404, "Ítem no encontrado")) -> dict:
+    """
+    Reescribe la lista en el servidor con un solo UPDATE (sin leer ni reenviar el
+    arreglo completo), subiendo la versión del siniestro. Con `version`, falla con
+    409 si el siniestro cambió desde que el cliente lo leyó.
+    """
+    from app.services.eventos_service import notificar_cambios
+
+    columna = _columna_lista(campo)
+    sentencia = (
+        update(models.Siniestro)
+        .where(models.Siniestro.id == siniestro_id, models.Siniestro.eliminado_en.is_(None))
+        .values({
+            columna: nuevo_valor,
+            models.Siniestro.version: models.Siniestro.version + 1,
+            models.Siniestro.updated_at: func.now(),
+        })
+        .returning(columna, models.Siniestro.version)
+        .execution_options(synchronize_session=False)
+    )
+    if condicion is not None:
+        sentencia = sentencia.where(condicion)
+    if version is not None:
+        sentencia = sentencia.where(models.Siniestro.version == version)
+
+    fila = db.execute(sentencia).first()
+    if fila is None:
+        db.rollback()
+        actual = db.query(models.Siniestro.version).filter(models.Siniestro.id == siniestro_id).scalar()
+        if actual is None:
+            raise HTTPException(status_code=404, detail="Siniestro no encontrado")
+        if version is not None and actual != version:
+            raise HTTPException(status_code=409, detail=f"El siniestro cambió (versión actual {actual})")
+        raise HTTPException(status_code=error_condicion[0], detail=error_condicion[1])
+
+    # El UPDATE directo no pasa por el flush de la sesión: se notifica aquí
+    notificar_cambios(db.connection(), actualizados={siniestro_id})
+    db.commit()
+    _programar_prerender(db, siniestro_id)
+    return {"siniestro_id": siniestro_id, "campo": campo, "items": fila[0] or [], "version": fila[1]}
+
+
+def _largo_lista(columna):
+    return func.jsonb_array_length(func.coalesce(columna, cast("[]", JSONB)))
+
+
+@router.post("/{siniestro_id}/listas/{campo}", response_model=schemas.ListaSiniestroResponse)
+async def agregar_item_lista(
+    siniestro_id: int, campo: str, item: schemas.ItemListaRequest,
+    version: Optional[int] = None, db: Session = Depends(get_db),
+):
+    """Agregar un ítem al final de una lista numerada"""
+    columna = _columna_lista(campo)
+    return _modificar_lista(
+        db, siniestro_id, campo,
+        func.coalesce(columna, cast("[]", JSONB)).op("||")(func.jsonb_build_array(cast(item.texto, Text))),
+        condicion=_largo_lista(columna) < schemas.LISTA_MAX_ITEMS,
+        version=version,
+        error_condicion=(400, f"La lista admite hasta {schemas.LISTA_MAX_ITEMS} ítems"),
+    )
+
+
+@router.put("/{siniestro_id}/listas/{campo}/{indice}", response_model=schemas.ListaSiniestroResponse)
+async def editar_item_lista(
+    siniestro_id: int, campo: str, indice: int, item: schemas.ItemListaRequest,
+    version: Optional[int] = None, db: Session = Depends(get_db),
+):
+    """Reemplazar el texto del ítem `indice` (desde 0) de una lista numerada"""
+    columna = _columna_lista(campo)
+    if indice < 0:
+        raise HTTPException(status_code=404, detail="Ítem no encontrado")
+    return _modificar_lista(
+        db, siniestro_id, campo,
+        func.jsonb_set(columna, array([str(indice)]), func.to_jsonb(cast(item.texto, Text))),
+        condicion=_largo_lista(columna) > indice,
+        version=version,
+    )
+
+
+@router.delete("/{siniestro_id}/listas/{campo}/{indice}", response_model=schemas.ListaSiniestroResponse)
+async def eliminar_item_lista(
+    siniestro_id: int, campo: str, indice: int,
+    version: Optional[int] = None, db: Session = Depends(get_db),
+):
+    """Eliminar el ítem `indice` (desde 0); los siguientes se renumeran"""
+    columna = _columna_lista(campo)
+    if indice < 0:
+        raise HTTPException(status_code=404, detail="Ítem no encontrado")
+    return _modificar_lista(
+        db, siniestro_id, campo,
+        columna.op("-")(cast(indice, Integer)),
+        condicion=_largo_lista(columna) > indice,
+        version=version,
+    )
+
+
+@router.get(
+    "/{siniestro_id}/senales-fraude", response_model=List[schemas.SenalFraudeResponse]
+)
+async def get_senales_fraude(
+    siniestro_id: int, ventana_dias: Optional[int] = Query(None, ge=1, le=3650), db: Session = Depends(get_db)
+):
+    """Siniestros que comparten vehículo, cédula, dirección o ubicación con este siniestro"""
+    from app.services.fraud_detector import detectar_para_siniestro, VENTANA_DIAS
+
+    if ventana_dias is None:
+        ventana_dias = VENTANA_DIAS
+    senales = detectar_para_siniestro(db, siniestro_id, ventana_dias)
+    if senales is None:
+        raise HTTPException(status_code=404, detail="Siniestro no encontrado")
+    return [senal._asdict() for senal in senales]
+
+
 # PDF generation endpoint
 @router.get("/{siniestro_id}/generar-pdf")
 async def generar_pdf(siniestro_id: int, db: Session = Depends(get_db)):
@@ -293,7 +592,10 @@ async def generar_pdf(siniestro_id: int, db: Session = Depends(get_db)):
 
     try:
         logger.info(f"🔍 INICIANDO GENERACIÓN PDF - Siniestro ID: {siniestro_id}")
-        from app.utils.pdf_generator import generate_simple_pdf
+        from fastapi.concurrency import run_in_threadpool
+        from fastapi.responses import Response, StreamingResponse
+        from app.services.pdf_store import iter_pdf
+        from app.utils.pdf_generator import open_report_pdf
 
         # Get siniestro data first
         siniestro = (
@@ -304,10 +606,9 @@ async def generar_pdf(siniestro_id: int, db: Session = Depends(get_db)):
         if not siniestro:
             raise HTTPException(status_code=404, detail="Siniestro no encontrado")
 
-        pdf_data = generate_simple_pdf(siniestro)
-        logger.info(f"✅ PDF generado exitosamente: {len(pdf_data)} bytes")
-
-        from fastapi.responses import Response
+        # Render y firma fuera del event loop; el PDF queda en un archivo temporal o en el almacén
+        pdf_file, pdf_size, firmado = await run_in_threadpool(open_report_pdf, siniestro)
+        logger.info(f"✅ PDF generado exitosamente: {pdf_size} bytes (firmado: {firmado})")
 
         # Generar nombre de archivo seguro con caracteres especiales
         import unicodedata
@@ -325,12 +626,12 @@ async def generar_pdf(siniestro_id: int, db: Session = Depends(get_db)):
         filename_base = re.sub(r'[^\w\-_\.]', '_', filename_base)
         filename_safe = f"{filename_base}.pdf"
 
-        return Response(
-            content=pdf_data,
+        return StreamingResponse(
+            iter_pdf(pdf_file),
             media_type="application/pdf",
             headers={
                 "Content-Disposition": f"attachment; filename*=UTF-8''{filename_safe}",
-                "Content-Length": str(len(pdf_data)),
+                "Content-Length": str(pdf_size),
             },
         )
     except Exception as e:
@@ -385,7 +686,8 @@ async def generar_pdf_sin_firma(siniestro_id: int, db: Session = Depends(get_db)
 
     try:
         logger.info(f"🔍 GENERANDO PDF SIN FIRMA - Siniestro ID: {siniestro_id}")
-        from app.utils.pdf_generator import generate_unsigned_pdf
+        from fastapi.concurrency import run_in_threadpool
+        from app.utils.pdf_generator import open_rendered_pdf
 
         # Get siniestro data first
         siniestro = (
@@ -396,10 +698,11 @@ async def generar_pdf_sin_firma(siniestro_id: int, db: Session = Depends(get_db)
         if not siniestro:
             raise HTTPException(status_code=404, detail="Siniestro no encontrado")
 
-        pdf_data = generate_unsigned_pdf(siniestro)
-        logger.info(f"✅ PDF sin firma generado exitosamente: {len(pdf_data)} bytes")
+        pdf_file, pdf_size = await run_in_threadpool(open_rendered_pdf, siniestro)
+        logger.info(f"✅ PDF sin firma generado exitosamente: {pdf_size} bytes")
 
-        from fastapi.responses import Response
+        from fastapi.responses import StreamingResponse
+        from app.services.pdf_store import iter_pdf
 
         # Generar nombre de archivo seguro con caracteres especiales
         import unicodedata
@@ -417,12 +720,12 @@ async def generar_pdf_sin_firma(siniestro_id: int, db: Session = Depends(get_db)
         filename_base = re.sub(r'[^\w\-_\.]', '_', filename_base)
         filename_safe = f"{filename_base}.pdf"
 
-        return Response(
-            content=pdf_data,
+        return StreamingResponse(
+            iter_pdf(pdf_file),
             media_type="application/pdf",
             headers={
                 "Content-Disposition": f"attachment; filename*=UTF-8''{filename_safe}",
-                "Content-Length": str(len(pdf_data)),
+                "Content-Length": str(pdf_size),
             },
         )
     except Exception as e:
@@ -435,6 +738,59 @@ async def generar_pdf_sin_firma(siniestro_id: int, db: Session = Depends(get_db)
         )
 
 
+@router.post("/{siniestro_id}/firmar-pdf")
+async def firmar_pdf(siniestro_id: int, db: Session = Depends(get_db)):
+    """
+    Firmar el informe ya renderizado (por generar-pdf-sin-firma) de la versión
+    actual del siniestro, agregando solo la firma incremental sin volver a renderizar
+    """
+    import logging
+    import re
+    import unicodedata
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.responses import StreamingResponse
+    from app.services.pdf_store import iter_pdf
+    from app.utils.pdf_generator import open_rendered_pdf, open_signed_pdf
+    from app.utils.report_engine import ClaimSnapshot
+
+    logger = logging.getLogger(__name__)
+
+    siniestro = db.query(models.Siniestro).filter(models.Siniestro.id == siniestro_id).first()
+    if not siniestro:
+        raise HTTPException(status_code=404, detail="Siniestro no encontrado")
+
+    snapshot = ClaimSnapshot.from_siniestro(siniestro)
+    rendered = open_rendered_pdf(siniestro, snapshot, render=False)
+    if rendered is None:
+        raise HTTPException(
+            status_code=409,
+            detail="No hay un informe renderizado para la versión actual del siniestro. "
+                   "Genere primero el PDF sin firma.",
+        )
+
+    rendered[0].close()
+
+    signed = await run_in_threadpool(open_signed_pdf, siniestro, snapshot, False)
+    if signed is None:
+        raise HTTPException(status_code=503, detail="Certificado digital no disponible o firma fallida")
+    signed_file, signed_size = signed
+    logger.info(f"✅ Informe del siniestro {siniestro_id} firmado: {signed_size} bytes")
+
+    filename_base = f"siniestro_{siniestro.reclamo_num or siniestro_id}_{siniestro.compania_seguros or 'sin_compania'}"
+    filename_base = unicodedata.normalize('NFKD', filename_base).encode('ASCII', 'ignore').decode('ASCII')
+    filename_base = re.sub(r'[^\w\-_\.]', '_', filename_base)
+    filename_safe = f"{filename_base}.pdf"
+
+    return StreamingResponse(
+        iter_pdf(signed_file),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename*=UTF-8''{filename_safe}",
+            "Content-Length": str(signed_size),
+        },
+    )
+
+
 @router.post("/upload-image")
 async def upload_image(file: UploadFile = File(...)):
     """Subir imagen a AWS S3 y devolver URL presigned"""
@@ -504,20 +860,22 @@ async def diagnostico_pdf(db: Session = Depends(get_db)):
         logger.error(f"❌ Error PDF básico: {e}")
 
     try:
-        # 3. Verificar carga de certificado desde S3
-        logger.info("🔐 Verificando carga de certificado desde S3...")
-        from app.utils.pdf_generator import load_certificate_from_s3
-
-        cert_data = load_certificate_from_s3()
-        if cert_data:
-            diagnostico["checks"]["certificate_loading"] = f"✅ Certificado cargado - {len(cert_data)} bytes"
-            logger.info(f"✅ Certificado OK: {len(cert_data)} bytes")
+        # 3. Verificar certificado de firma (resultado en caché del monitor de salud)
+        logger.info("🔐 Verificando certificado de firma...")
+        from app.services.health_service import monitor
+
+        certificado = monitor.estado()["certificado"]
+        if certificado["ok"]:
+            diagnostico["checks"]["certificate_loading"] = f"✅ Certificado válido - vence en {certificado['dias_para_vencer']} días"
+            logger.info("✅ Certificado OK")
+            if certificado.get("advertencia"):
+                diagnostico["warnings"].append(f"⚠️ {certificado['advertencia']}")
         else:
-            diagnostico["warnings"].append("⚠️ Certificado no encontrado en S3 - PDFs sin firma")
-            logger.warning("⚠️ Certificado no encontrado en S3")
+            diagnostico["warnings"].append(f"⚠️ Certificado no disponible ({certificado['error']}) - PDFs sin firma")
+            logger.warning(f"⚠️ Certificado no disponible: {certificado['error']}")
 
     except Exception as e:
-        diagnostico["errors"].append(f"❌ Error cargando certificado: {str(e)}")
+        diagnostico["errors"].append(f"❌ Error verificando certificado: {str(e)}")
         logger.error(f"❌ Error certificado: {e}")
 
     try:
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.database import get_db
+from app.services import pdf_jobs, pdf_store
+
+router = APIRouter()
+
+
+def _respuesta(trabajo: models.TrabajoPdf) -> schemas.TrabajoPdfResponse:
+    respuesta = schemas.TrabajoPdfResponse.model_validate(trabajo)
+    if trabajo.estado == pdf_jobs.COMPLETADO:
+        respuesta.descarga_url = f"/api/v1/trabajos-pdf/{trabajo.id}/descargar"
+    return respuesta
+
+
+@router.post("/", response_model=schemas.TrabajoPdfResponse, status_code=202)
+async def crear_trabajo(datos: schemas.TrabajoPdfCreate, db: Session = Depends(get_db)):
+    """Encolar la generación del informe PDF; responde de inmediato con el trabajo"""
+    siniestro = db.query(models.Siniestro.id).filter(models.Siniestro.id == datos.siniestro_id).first()
+    if not siniestro:
+        raise HTTPException(status_code=404, detail="Siniestro no encontrado")
+    return _respuesta(pdf_jobs.encolar_trabajo(db, datos.siniestro_id, datos.variante))
+
+
+@router.get("/{trabajo_id}", response_model=schemas.TrabajoPdfResponse)
+async def get_trabajo(trabajo_id: int, db: Session = Depends(get_db)):
+    """Estado y progreso del trabajo"""
+    trabajo = db.get(models.TrabajoPdf, trabajo_id)
+    if not trabajo:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return _respuesta(trabajo)
+
+
+@router.get("/{trabajo_id}/descargar")
+async def descargar_trabajo(trabajo_id: int, db: Session = Depends(get_db)):
+    """Descargar el PDF de un trabajo completado desde el almacén de informes"""
+    trabajo = db.get(models.TrabajoPdf, trabajo_id)
+    if not trabajo:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    if trabajo.estado != pdf_jobs.COMPLETADO:
+        raise HTTPException(status_code=409, detail=f"El trabajo no está completado (estado: {trabajo.estado})")
+
+    stored = pdf_store.open_pdf(trabajo.siniestro_id, trabajo.huella, trabajo.variante)
+    if stored is None:
+        raise HTTPException(status_code=410, detail="El informe ya no está en el almacén; encole un nuevo trabajo")
+
+    sufijo = "_sin_firma" if trabajo.variante == pdf_store.VARIANT_UNSIGNED else ""
+    pdf_file, pdf_size = stored
+    return StreamingResponse(
+        pdf_store.iter_pdf(pdf_file),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename=siniestro_{trabajo.siniestro_id}{sufijo}.pdf",
+            "Content-Length": str(pdf_size),
+        },
+    )
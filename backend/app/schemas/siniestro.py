@@ -1,6 +1,30 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, BeforeValidator, Field, StringConstraints
+from typing import Annotated, Optional, List
 from datetime import datetime
+import json
+
+LISTA_MAX_ITEMS = 200
+
+
+def _normalizar_lista(valor):
+    """Acepta la lista o el formato anterior (texto JSON o una entrada por línea); descarta ítems vacíos"""
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        try:
+            valor = json.loads(valor) if valor.strip() else []
+        except ValueError:
+            valor = valor.splitlines()
+        if not isinstance(valor, list):
+            raise ValueError("Se esperaba una lista de textos")
+    if isinstance(valor, list):
+        return [item for item in valor if not (isinstance(item, str) and not item.strip())]
+    return valor
+
+
+# Ítem de una lista numerada (observaciones, recomendaciones, conclusiones, anexos)
+ItemLista = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=5000)]
+ListaNumerada = Annotated[List[ItemLista], Field(max_length=LISTA_MAX_ITEMS), BeforeValidator(_normalizar_lista)]
 
 # Base schemas
 class SiniestroBase(BaseModel):
@@ -115,6 +139,7 @@ class SiniestroResponse(SiniestroBase):
     id: int
     created_at: datetime
     updated_at: datetime
+    version: int
 
     class Config:
         from_attributes = True
@@ -204,6 +229,91 @@ class SiniestroFullResponse(SiniestroResponse):
     testigos: List[TestigoResponse] = []
     visita_taller: Optional[VisitaTallerResponse] = None
     dinamica_accidente: Optional[DinamicaAccidenteResponse] = None
+    observaciones: Optional[List[str]] = None
+    recomendacion_pago_cobertura: Optional[List[str]] = None
+    conclusiones: Optional[List[str]] = None
+    anexo: Optional[List[str]] = None
+
+# Edición por ítem de las listas numeradas
+class ItemListaRequest(BaseModel):
+    texto: ItemLista
+
+class ListaSiniestroResponse(BaseModel):
+    siniestro_id: int
+    campo: str
+    items: List[str]
+    version: int  # Versión del siniestro después del cambio
+
+# Sincronización incremental: cambios desde un cursor
+class CambiosSiniestrosResponse(BaseModel):
+    cambios: List[SiniestroResponse]  # Creados o modificados, en orden de (updated_at, id)
+    eliminados: List[int]  # IDs de siniestros eliminados
+    cursor: str  # Cursor para la próxima consulta
+    hay_mas: bool  # True si quedaron cambios por traer: consultar de nuevo con el cursor
+
+# Señales de fraude / duplicados
+class SenalFraudeResponse(BaseModel):
+    siniestro_id: int
+    siniestro_relacionado_id: int
+    tipo: str
+    valor: Optional[str] = None
+    dias_diferencia: float
+
+# Consultas geoespaciales
+class SiniestroGeoResponse(BaseModel):
+    id: int
+    reclamo_num: str
+    compania_seguros: str
+    tipo_reclamo: Optional[str] = None
+    fecha_siniestro: datetime
+    ubicacion_geo_lat: float
+    ubicacion_geo_lng: float
+    distancia_metros: Optional[float] = None
+
+class ClusterGeoResponse(BaseModel):
+    geohash: str
+    total: int
+    lat: float
+    lng: float
+
+# Estadísticas del tablero
+class EstadisticaGrupo(BaseModel):
+    valor: Optional[str] = None  # None = no especificado
+    total: int
+    promedio_dias_reporte: Optional[float] = None
+    promedio_dias_designacion: Optional[float] = None
+
+class EstadisticasResponse(BaseModel):
+    total: int
+    promedio_dias_reporte: Optional[float] = None
+    promedio_dias_designacion: Optional[float] = None
+    por_compania_seguros: List[EstadisticaGrupo] = []
+    por_tipo_reclamo: List[EstadisticaGrupo] = []
+    por_cobertura: List[EstadisticaGrupo] = []
+    por_mes: List[EstadisticaGrupo] = []
+
+# Trabajos de generación de PDF
+class TrabajoPdfCreate(BaseModel):
+    siniestro_id: int
+    variante: str = Field("firmado", pattern="^(firmado|sin_firma)$")
+
+class TrabajoPdfResponse(BaseModel):
+    id: int
+    siniestro_id: int
+    variante: str
+    estado: str
+    progreso: int
+    etapa: Optional[str] = None
+    error: Optional[str] = None
+    intentos: int
+    disponible_en: datetime
+    creado_en: Optional[datetime] = None
+    iniciado_en: Optional[datetime] = None
+    finalizado_en: Optional[datetime] = None
+    descarga_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
 
 # Update schemas
 class SiniestroUpdate(BaseModel):
@@ -241,10 +351,10 @@ class SiniestroUpdate(BaseModel):
     otras_diligencias_imagen_url: Optional[str] = None
     visita_taller_descripcion: Optional[str] = None
     visita_taller_imagen_url: Optional[str] = None
-    observaciones: Optional[str] = None
-    recomendacion_pago_cobertura: Optional[str] = None
-    conclusiones: Optional[str] = None
-    anexo: Optional[str] = None
+    observaciones: Optional[ListaNumerada] = None
+    recomendacion_pago_cobertura: Optional[ListaNumerada] = None
+    conclusiones: Optional[ListaNumerada] = None
+    anexo: Optional[ListaNumerada] = None
 
     # Relaciones anidadas para actualización
     objeto_asegurado: Optional[ObjetoAseguradoCreate] = None
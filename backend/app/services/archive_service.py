@@ -0,0 +1,124 @@
+"""
+Archivo de siniestros antiguos
+
+Mueve a las tablas *_archivo (app/models/archivo.py), con todas sus entidades
+relacionadas:
+- los siniestros cerrados (con informe firmado) sin cambios en los últimos
+  ARCHIVO_MESES meses
+- los eliminados (borrado lógico) hace más de ARCHIVO_MESES meses
+
+Cada lote es una transacción corta: copia al archivo, borrado de las tablas
+activas y, para los que seguían activos, lápida y NOTIFY "eliminado" para que
+la sincronización incremental y los paneles en vivo los quiten. Las filas se
+toman con FOR UPDATE SKIP LOCKED: un siniestro que se está editando no bloquea
+el job y queda para la siguiente ejecución.
+
+Las señales de fraude y los trabajos PDF del siniestro se borran en cascada;
+las estadísticas no cambian (cuentan también los archivados).
+"""
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+# Configuración desde variables de entorno
+ARCHIVO_MESES = int(os.getenv('ARCHIVO_MESES', '24'))
+ARCHIVO_TAMANO_LOTE = int(os.getenv('ARCHIVO_TAMANO_LOTE', '200'))
+# Pausa entre lotes para no saturar la base (replicación, autovacuum)
+ARCHIVO_PAUSA_SEGUNDOS = float(os.getenv('ARCHIVO_PAUSA_SEGUNDOS', '0.2'))
+
+_S = models.Siniestro.__table__
+
+
+def fecha_corte(db: Session, meses: int = ARCHIVO_MESES) -> datetime:
+    return db.scalar(select(func.now() - func.make_interval(0, meses)))
+
+
+def _archivables(corte: datetime):
+    cerrado = and_(_S.c.eliminado_en.is_(None), _S.c.pdf_firmado_url.isnot(None), _S.c.updated_at < corte)
+    return or_(cerrado, _S.c.eliminado_en < corte)
+
+
+def contar_archivables(db: Session, corte: datetime) -> int:
+    return db.scalar(select(func.count()).select_from(_S).where(_archivables(corte)))
+
+
+def archivar_lote(db: Session, corte: datetime, tamano_lote: int = ARCHIVO_TAMANO_LOTE) -> int:
+    """Archiva hasta `tamano_lote` siniestros en una transacción; retorna cuántos movió"""
+    from app.services.eventos_service import notificar_cambios
+
+    filas = db.execute(
+        select(_S.c.id, _S.c.eliminado_en)
+        .where(_archivables(corte))
+        .order_by(_S.c.id)
+        .limit(tamano_lote)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not filas:
+        db.rollback()
+        return 0
+    ids = [fila.id for fila in filas]
+    activos = [fila.id for fila in filas if fila.eliminado_en is None]
+
+    columnas = [c.name for c in _S.columns]
+    db.execute(models.siniestros_archivo.insert().from_select(columnas, select(*_S.columns).where(_S.c.id.in_(ids))))
+    for origen, archivo in models.TABLAS_ARCHIVO.items():
+        db.execute(archivo.insert().from_select(
+            [c.name for c in origen.columns], select(*origen.columns).where(origen.c.siniestro_id.in_(ids))
+        ))
+        db.execute(delete(origen).where(origen.c.siniestro_id.in_(ids)))
+    db.execute(delete(_S).where(_S.c.id.in_(ids)))
+
+    if activos:
+        # Los eliminados ya dejaron su lápida al borrarse
+        db.execute(models.SiniestroEliminado.__table__.insert(), [{"siniestro_id": i} for i in activos])
+        notificar_cambios(db.connection(), eliminados=activos)
+    db.commit()
+    return len(ids)
+
+
+def archivar_siniestros(session_factory, meses: int = ARCHIVO_MESES, tamano_lote: int = ARCHIVO_TAMANO_LOTE,
+                        max_lotes: Optional[int] = None, pausa: float = ARCHIVO_PAUSA_SEGUNDOS) -> int:
+    """
+    Archiva lote por lote hasta que no queden siniestros archivables (o `max_lotes`).
+
+    Args:
+        session_factory: Fábrica de sesiones (SessionLocal)
+        meses: Antigüedad mínima (sin cambios, o desde el borrado lógico)
+        tamano_lote: Siniestros por transacción
+        max_lotes: Límite de lotes de esta ejecución (None = sin límite)
+        pausa: Segundos de espera entre lotes
+
+    Returns:
+        int: Número de siniestros archivados
+    """
+    db = session_factory()
+    total = lotes = 0
+    try:
+        corte = fecha_corte(db, meses)
+        db.commit()
+        logger.info(f"🗄️ Archivando siniestros cerrados o eliminados antes del {corte:%Y-%m-%d}")
+        while max_lotes is None or lotes < max_lotes:
+            archivados = archivar_lote(db, corte, tamano_lote)
+            if not archivados:
+                break
+            total += archivados
+            lotes += 1
+            logger.info(f"  📦 {total} siniestros archivados ({lotes} lotes)")
+            if pausa:
+                time.sleep(pausa)
+        logger.info(f"✅ Archivo completado: {total} siniestros")
+        return total
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
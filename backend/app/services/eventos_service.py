@@ -0,0 +1,182 @@
+"""
+Notificaciones de cambios de siniestros en vivo (Postgres LISTEN/NOTIFY + SSE)
+
+Escritura: el hook de flush de los modelos (bump_claim_versions) llama a
+notificar_cambios() en la misma transacción; Postgres entrega los NOTIFY solo
+al confirmar, así que un rollback no publica nada.
+
+Lectura: cada worker mantiene UNA conexión dedicada con LISTEN en un hilo y
+reparte cada notificación a las colas asyncio de sus suscriptores (los
+clientes del endpoint SSE /api/v1/siniestros/eventos). Miles de paneles
+abiertos no consultan la API ni la base: solo esperan en su cola.
+
+Si un suscriptor no consume a tiempo (cola llena) o la conexión LISTEN se
+cae, se le envía un evento "resincronizar": las notificaciones perdidas no se
+pueden recuperar y el cliente debe volver a consultar (p. ej. /cambios).
+"""
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+import time
+from typing import Iterable, Optional, Set
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Configuración desde variables de entorno
+CANAL_CAMBIOS = os.getenv('EVENTOS_CANAL', 'siniestros_cambios')
+EVENTOS_COLA_MAX = int(os.getenv('EVENTOS_COLA_MAX', '256'))
+EVENTOS_REINTENTO_SEGUNDOS = float(os.getenv('EVENTOS_REINTENTO_SEGUNDOS', '2'))
+# Comentario periódico para que proxies y balanceadores no corten el stream
+EVENTOS_PING_SEGUNDOS = float(os.getenv('EVENTOS_PING_SEGUNDOS', '15'))
+# Duración máxima de un stream: el navegador (EventSource) reconecta solo, lo que
+# reparte los clientes entre workers y no retiene el apagado del servidor
+EVENTOS_DURACION_MAX_SEGUNDOS = float(os.getenv('EVENTOS_DURACION_MAX_SEGUNDOS', '300'))
+
+_NOTIFY = text("SELECT pg_notify(:canal, payload) FROM unnest(CAST(:payloads AS text[])) AS payload")
+
+
+def notificar_cambios(connection, creados: Iterable[int] = (), actualizados: Iterable[int] = (),
+                      eliminados: Iterable[int] = ()):
+    """Un NOTIFY por siniestro afectado, todos en una sola sentencia"""
+    payloads = [
+        json.dumps({"id": siniestro_id, "op": op})
+        for op, ids in (("creado", creados), ("actualizado", actualizados), ("eliminado", eliminados))
+        for siniestro_id in sorted(ids)
+    ]
+    if payloads:
+        connection.execute(_NOTIFY, {"canal": CANAL_CAMBIOS, "payloads": payloads})
+
+
+class Suscripcion:
+    """Cola de eventos de un cliente SSE, opcionalmente filtrada por IDs de siniestro"""
+
+    def __init__(self, ids: Optional[Set[int]] = None):
+        self.ids = ids
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=EVENTOS_COLA_MAX)
+
+    def entregar(self, evento: dict):
+        if self.ids is not None and evento.get("id") not in self.ids and evento["op"] != "resincronizar":
+            return
+        try:
+            self.cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            # Cliente lento: se descarta lo pendiente y se le pide resincronizar
+            while not self.cola.empty():
+                self.cola.get_nowait()
+            self.cola.put_nowait({"op": "resincronizar", "motivo": "cola_llena"})
+
+
+class DistribuidorEventos:
+    """Conexión LISTEN única por proceso que reparte las notificaciones a los suscriptores"""
+
+    def __init__(self):
+        self._suscripciones: Set[Suscripcion] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+
+    def suscribir(self, ids: Optional[Set[int]] = None) -> Suscripcion:
+        suscripcion = Suscripcion(ids)
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+            self._loop = asyncio.get_running_loop()
+            if self._hilo is None or not self._hilo.is_alive():
+                self._detener.clear()
+                self._hilo = threading.Thread(target=self._escuchar, name="listen-siniestros", daemon=True)
+                self._hilo.start()
+        return suscripcion
+
+    def desuscribir(self, suscripcion: Suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    @property
+    def suscriptores(self) -> int:
+        return len(self._suscripciones)
+
+    def detener(self):
+        self._detener.set()
+
+    def _repartir(self, evento: dict):
+        # Corre en el event loop: las colas asyncio no son seguras entre hilos
+        for suscripcion in list(self._suscripciones):
+            suscripcion.entregar(evento)
+
+    def _publicar(self, evento: dict):
+        try:
+            self._loop.call_soon_threadsafe(self._repartir, evento)
+        except RuntimeError:
+            pass  # Loop cerrado (apagado del proceso)
+
+    def _escuchar(self):
+        from app.database import engine
+
+        reconexion = False
+        while not self._detener.is_set():
+            conexion = None
+            try:
+                # Conexión fuera del pool: queda ocupada mientras el proceso escuche
+                conexion = engine.raw_connection()
+                conexion.detach()
+                dbapi = conexion.dbapi_connection
+                dbapi.autocommit = True
+                with dbapi.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{CANAL_CAMBIOS}"')
+                logger.info(f"📡 Escuchando cambios de siniestros en el canal '{CANAL_CAMBIOS}'")
+                if reconexion:
+                    # Lo notificado mientras no había conexión se perdió
+                    self._publicar({"op": "resincronizar", "motivo": "reconexion"})
+
+                while not self._detener.is_set():
+                    if select.select([dbapi], [], [], 1.0) == ([], [], []):
+                        continue
+                    dbapi.poll()
+                    while dbapi.notifies:
+                        notificacion = dbapi.notifies.pop(0)
+                        try:
+                            self._publicar(json.loads(notificacion.payload))
+                        except ValueError:
+                            logger.warning(f"⚠️ Notificación inválida: {notificacion.payload!r}")
+            except Exception as e:
+                logger.warning(f"⚠️ Conexión LISTEN perdida ({e}); reintentando en {EVENTOS_REINTENTO_SEGUNDOS:g}s")
+                reconexion = True
+                time.sleep(EVENTOS_REINTENTO_SEGUNDOS)
+            finally:
+                if conexion is not None:
+                    try:
+                        conexion.close()
+                    except Exception:
+                        pass
+
+
+distribuidor = DistribuidorEventos()
+
+
+def _formato_sse(evento: dict) -> str:
+    return f"event: {evento['op']}\ndata: {json.dumps(evento)}\n\n"
+
+
+async def flujo_sse(request, ids: Optional[Set[int]] = None):
+    """Stream text/event-stream de un cliente: eventos de su suscripción y pings periódicos"""
+    loop = asyncio.get_running_loop()
+    suscripcion = distribuidor.suscribir(ids)
+    fin = loop.time() + EVENTOS_DURACION_MAX_SEGUNDOS
+    try:
+        yield f"retry: {int(EVENTOS_REINTENTO_SEGUNDOS * 1000)}\n\n"
+        while (restante := fin - loop.time()) > 0:
+            try:
+                evento = await asyncio.wait_for(suscripcion.cola.get(), timeout=min(EVENTOS_PING_SEGUNDOS, restante))
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            yield _formato_sse(evento)
+    finally:
+        distribuidor.desuscribir(suscripcion)
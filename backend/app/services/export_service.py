@@ -0,0 +1,214 @@
+"""
+Servicio de exportación masiva de siniestros (CSV / XLSX)
+
+Las filas siguen el mismo formato plano que plantilla_precarga_siniestros.csv.
+Se obtienen con una sola consulta (JOIN de las relaciones uno a uno y los
+antecedentes agregados) leída con un cursor del servidor (yield_per), y se
+escriben con generadores, de modo que la memoria se mantiene constante sin
+importar cuántos siniestros se exporten.
+"""
+import csv
+import io
+import logging
+import os
+import tempfile
+from datetime import datetime
+from typing import Iterator, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+try:
+    from openpyxl import Workbook
+    XLSX_AVAILABLE = True
+except ImportError:
+    XLSX_AVAILABLE = False
+
+EXPORT_YIELD_PER = int(os.getenv('EXPORT_YIELD_PER', '1000'))
+# Filas por fragmento enviado al cliente
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '500'))
+
+_S = models.Siniestro
+_A = models.Asegurado
+_B = models.Beneficiario
+_C = models.Conductor
+_O = models.ObjetoAsegurado
+
+_antecedentes = (
+    sa.select(
+        sa.func.string_agg(
+            models.Antecedente.descripcion,
+            aggregate_order_by(sa.literal_column("E'\\n'"), models.Antecedente.id),
+        )
+    )
+    .where(models.Antecedente.siniestro_id == _S.id)
+    .correlate(_S)
+    .scalar_subquery()
+)
+
+# Mismo orden de columnas que plantilla_precarga_siniestros.csv.
+# None = columna de la plantilla sin equivalente en el modelo (se exporta vacía).
+COLUMNAS_EXPORTACION = [
+    ("compania_seguros", _S.compania_seguros),
+    ("ruc_compania", _S.ruc_compania),
+    ("tipo_reclamo", _S.tipo_reclamo),
+    ("poliza", _S.poliza),
+    ("reclamo_num", _S.reclamo_num),
+    ("fecha_siniestro", _S.fecha_siniestro),
+    ("fecha_reportado", _S.fecha_reportado),
+    ("fecha_designacion", _S.fecha_designacion),
+    ("direccion_siniestro", _S.direccion_siniestro),
+    ("ubicacion_geo_lat", _S.ubicacion_geo_lat),
+    ("ubicacion_geo_lng", _S.ubicacion_geo_lng),
+    ("ejecutivo_cargo", _S.ejecutivo_cargo),
+    ("tipo_siniestro", _S.tipo_siniestro),
+    ("cobertura", _S.cobertura),
+    ("danos_terceros", _S.danos_terceros),
+    ("misiva_investigacion", _S.misiva_investigacion),
+    ("persona_declara_tipo", _S.persona_declara_tipo),
+    ("persona_declara_cedula", _S.persona_declara_cedula),
+    ("persona_declara_nombre", _S.persona_declara_nombre),
+    ("persona_declara_relacion", _S.persona_declara_relacion),
+    ("asegurado_tipo", _A.tipo),
+    ("asegurado_cedula", _A.cedula),
+    ("asegurado_nombre", _A.nombre),
+    ("asegurado_celular", _A.celular),
+    ("asegurado_correo", _A.correo),
+    ("asegurado_direccion", _A.direccion),
+    ("asegurado_ruc", _A.ruc),
+    ("asegurado_razon_social", _A.empresa),
+    ("asegurado_representante_legal", _A.representante_legal),
+    ("asegurado_cedula_representante", None),
+    ("asegurado_telefono_empresa", _A.telefono),
+    ("asegurado_correo_empresa", None),
+    ("asegurado_direccion_empresa", None),
+    ("beneficiario_razon_social", _B.razon_social),
+    ("beneficiario_cedula_ruc", _B.cedula_ruc),
+    ("beneficiario_domicilio", _B.domicilio),
+    ("conductor_nombre", _C.nombre),
+    ("conductor_cedula", _C.cedula),
+    ("conductor_celular", _C.celular),
+    ("conductor_direccion", _C.direccion),
+    ("conductor_parentesco", _C.parentesco),
+    ("objeto_placa", _O.placa),
+    ("objeto_marca", _O.marca),
+    ("objeto_modelo", _O.modelo),
+    ("objeto_tipo", _O.tipo),
+    ("objeto_color", _O.color),
+    ("objeto_ano", _O.ano),
+    ("objeto_serie_motor", _O.serie_motor),
+    ("objeto_chasis", _O.chasis),
+    ("antecedentes_descripcion", _antecedentes),
+]
+
+ENCABEZADOS = [nombre for nombre, _ in COLUMNAS_EXPORTACION]
+
+
+def consulta_exportacion(compania_seguros: Optional[str] = None, fecha_desde: Optional[datetime] = None,
+                         fecha_hasta: Optional[datetime] = None):
+    """SELECT único con las relaciones uno a uno; solo las columnas exportadas"""
+    columnas = [
+        (expresion if expresion is not None else sa.null()).label(nombre)
+        for nombre, expresion in COLUMNAS_EXPORTACION
+    ]
+    consulta = (
+        sa.select(*columnas)
+        .select_from(_S)
+        .outerjoin(_A, _A.siniestro_id == _S.id)
+        .outerjoin(_B, _B.siniestro_id == _S.id)
+        .outerjoin(_C, _C.siniestro_id == _S.id)
+        .outerjoin(_O, _O.siniestro_id == _S.id)
+        .order_by(_S.id)
+    )
+    if compania_seguros:
+        consulta = consulta.where(_S.compania_seguros == compania_seguros)
+    if fecha_desde:
+        consulta = consulta.where(_S.fecha_siniestro >= fecha_desde)
+    if fecha_hasta:
+        consulta = consulta.where(_S.fecha_siniestro <= fecha_hasta)
+    return consulta
+
+
+def _formatear(valor):
+    """Valores con el mismo formato que la plantilla de precarga"""
+    if valor is None:
+        return ""
+    if isinstance(valor, bool):
+        return "VERDADERO" if valor else "FALSO"
+    if isinstance(valor, datetime):
+        if (valor.hour, valor.minute, valor.second) == (0, 0, 0):
+            return valor.strftime("%Y-%m-%d")
+        return valor.strftime("%Y-%m-%d %H:%M")
+    return valor
+
+
+def iterar_filas(db: Session, consulta) -> Iterator[tuple]:
+    """Filas ya formateadas, leídas por lotes con un cursor del servidor"""
+    resultado = db.execute(consulta.execution_options(yield_per=EXPORT_YIELD_PER))
+    for fila in resultado:
+        yield tuple(_formatear(valor) for valor in fila)
+
+
+def generar_csv(filas: Iterator[tuple]) -> Iterator[bytes]:
+    """CSV en fragmentos de EXPORT_CHUNK_ROWS filas, reutilizando un único buffer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ENCABEZADOS)
+
+    pendientes = 0
+    for fila in filas:
+        writer.writerow(fila)
+        pendientes += 1
+        if pendientes >= EXPORT_CHUNK_ROWS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+            pendientes = 0
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+def generar_xlsx(filas: Iterator[tuple], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    XLSX en modo write-only (openpyxl serializa cada fila a disco al agregarla).
+    El ZIP solo queda completo al cerrar el libro, así que se construye en un
+    archivo temporal y luego se transmite por fragmentos.
+    """
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("siniestros")
+    hoja.append(ENCABEZADOS)
+    for fila in filas:
+        hoja.append(list(fila))
+
+    with tempfile.TemporaryFile() as archivo:
+        libro.save(archivo)
+        archivo.seek(0)
+        while True:
+            fragmento = archivo.read(chunk_size)
+            if not fragmento:
+                break
+            yield fragmento
+
+
+def exportar(session_factory, formato: str, **filtros) -> Iterator[bytes]:
+    """
+    Generador de la exportación completa con su propia sesión: la sesión de la
+    dependencia get_db se cierra antes de que termine de enviarse la respuesta.
+    """
+    db = session_factory()
+    try:
+        filas = iterar_filas(db, consulta_exportacion(**filtros))
+        if formato == "xlsx":
+            yield from generar_xlsx(filas)
+        else:
+            yield from generar_csv(filas)
+    except Exception as e:
+        logger.error(f"❌ Error exportando siniestros: {e}")
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,310 @@
+"""
+Servicio de detección de siniestros duplicados y señales de fraude
+
+Agrupa siniestros que comparten vehículo (placa, chasis, serie de motor), cédula
+de conductor o asegurado, dirección normalizada o un punto geográfico cercano
+dentro de una ventana de tiempo. En lugar de comparar todos contra todos, los
+registros se recorren en orden cronológico y se indexan en tablas hash que solo
+conservan los siniestros vigentes en la ventana, por lo que cada lote se
+procesa en O(n).
+"""
+import logging
+import math
+import os
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import insert, select, union
+from sqlalchemy.orm import Session
+
+from app import models
+from app.models import clave_normalizada, normalizar_clave
+
+logger = logging.getLogger(__name__)
+
+# Configuración desde variables de entorno
+VENTANA_DIAS = int(os.getenv('FRAUDE_VENTANA_DIAS', '180'))
+RADIO_METROS = float(os.getenv('FRAUDE_RADIO_METROS', '150'))
+TAMANO_LOTE = int(os.getenv('FRAUDE_TAMANO_LOTE', '5000'))
+# Máximo de siniestros recientes que se conservan por clave: acota el costo
+# cuando un valor se repite masivamente (p. ej. una placa genérica mal digitada)
+MAX_POR_CLAVE = int(os.getenv('FRAUDE_MAX_POR_CLAVE', '50'))
+
+# Longitud mínima para que un valor se considere identificador confiable
+_LONGITUD_MINIMA = {
+    "placa": 5,
+    "chasis": 8,
+    "serie_motor": 6,
+    "conductor_cedula": 10,
+    "asegurado_cedula": 10,
+}
+
+_METROS_POR_GRADO = 111_320.0
+
+
+class RegistroSiniestro(NamedTuple):
+    id: int
+    fecha: datetime
+    claves: Tuple[Tuple[str, str], ...]
+    lat: Optional[float]
+    lng: Optional[float]
+
+
+class Senal(NamedTuple):
+    siniestro_id: int
+    siniestro_relacionado_id: int
+    tipo: str
+    valor: Optional[str]
+    dias_diferencia: float
+
+
+def _distancia_metros(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Distancia haversine en metros"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * 6_371_000 * math.asin(math.sqrt(a))
+
+
+def _como_datetime(valor) -> Optional[datetime]:
+    if valor is None or isinstance(valor, datetime):
+        return valor
+    return datetime.fromisoformat(str(valor))
+
+
+class DetectorDuplicados:
+    """Índice hash deslizante sobre siniestros ordenados por fecha"""
+
+    def __init__(self, ventana_dias: int = VENTANA_DIAS, radio_metros: float = RADIO_METROS):
+        self.ventana = timedelta(days=ventana_dias)
+        self.radio_metros = radio_metros
+        # Celdas de un radio de alto en latitud; su ancho en longitud depende de la fila (ver _ancho_lng)
+        self.tamano_celda = radio_metros / _METROS_POR_GRADO
+        self.indice = defaultdict(lambda: deque(maxlen=MAX_POR_CLAVE))
+        self.celdas = defaultdict(lambda: deque(maxlen=MAX_POR_CLAVE))
+        self.vigentes = deque()
+
+    def _grados_lng(self, lat: float) -> float:
+        """Un radio expresado en grados de longitud a esa latitud (misma corrección que detectar_para_siniestro)"""
+        return self.tamano_celda / max(math.cos(math.radians(min(lat, 90.0))), 0.01)
+
+    def _ancho_lng(self, fila: int) -> float:
+        """Ancho en longitud de las celdas de una fila: un radio medido en su borde más cercano al polo"""
+        return self._grados_lng(max(abs(fila), abs(fila + 1)) * self.tamano_celda)
+
+    def _celda(self, registro: RegistroSiniestro) -> Tuple[int, int]:
+        fila = math.floor(registro.lat / self.tamano_celda)
+        return (fila, math.floor(registro.lng / self._ancho_lng(fila)))
+
+    def _celdas_vecinas(self, registro: RegistroSiniestro):
+        """
+        Celdas que pueden contener siniestros a menos de un radio: las filas
+        adyacentes y, en cada una, las columnas que cubren ±un radio en longitud
+        a la latitud alcanzable más cercana al polo
+        """
+        fila = math.floor(registro.lat / self.tamano_celda)
+        delta_lng = self._grados_lng(abs(registro.lat) + self.tamano_celda)
+        for f in (fila - 1, fila, fila + 1):
+            ancho = self._ancho_lng(f)
+            for columna in range(math.floor((registro.lng - delta_lng) / ancho),
+                                 math.floor((registro.lng + delta_lng) / ancho) + 1):
+                yield f, columna
+
+    def _expirar(self, fecha: datetime):
+        """Retira del índice los siniestros que quedaron fuera de la ventana"""
+        limite = fecha - self.ventana
+        while self.vigentes and self.vigentes[0].fecha < limite:
+            viejo = self.vigentes.popleft()
+            for clave in viejo.claves:
+                self._retirar(self.indice, clave, viejo)
+            if viejo.lat is not None and viejo.lng is not None:
+                self._retirar(self.celdas, self._celda(viejo), viejo)
+
+    @staticmethod
+    def _retirar(tabla, clave, registro):
+        bucket = tabla.get(clave)
+        # El registro puede haber sido desplazado antes por maxlen
+        if bucket and bucket[0] is registro:
+            bucket.popleft()
+        if bucket is not None and not bucket:
+            del tabla[clave]
+
+    def agregar(self, registro: RegistroSiniestro) -> List[Senal]:
+        """Agrega un siniestro (en orden cronológico) y retorna sus coincidencias"""
+        self._expirar(registro.fecha)
+        senales = []
+
+        for clave in registro.claves:
+            bucket = self.indice[clave]
+            for otro in bucket:
+                if otro.id != registro.id:
+                    senales.append(self._senal(registro, otro, clave[0], clave[1]))
+            bucket.append(registro)
+
+        if registro.lat is not None and registro.lng is not None:
+            for celda in self._celdas_vecinas(registro):
+                for otro in self.celdas.get(celda, ()):
+                    if otro.id == registro.id:
+                        continue
+                    distancia = _distancia_metros(registro.lat, registro.lng, otro.lat, otro.lng)
+                    if distancia <= self.radio_metros:
+                        senales.append(self._senal(registro, otro, "ubicacion", f"{distancia:.0f} m"))
+            self.celdas[self._celda(registro)].append(registro)
+
+        self.vigentes.append(registro)
+        return senales
+
+    @staticmethod
+    def _senal(registro: RegistroSiniestro, otro: RegistroSiniestro, tipo: str, valor: Optional[str]) -> Senal:
+        dias = (registro.fecha - otro.fecha).total_seconds() / 86400
+        return Senal(registro.id, otro.id, tipo, valor, round(dias, 2))
+
+
+def _consulta_registros(db: Session):
+    """Una sola consulta con las relaciones uno a uno necesarias para el análisis"""
+    return (
+        db.query(
+            models.Siniestro.id,
+            models.Siniestro.fecha_siniestro,
+            models.Siniestro.direccion_clave,
+            models.Siniestro.ubicacion_geo_lat,
+            models.Siniestro.ubicacion_geo_lng,
+            models.ObjetoAsegurado.placa,
+            models.ObjetoAsegurado.chasis,
+            models.ObjetoAsegurado.serie_motor,
+            models.Conductor.cedula.label("conductor_cedula"),
+            models.Asegurado.cedula.label("asegurado_cedula"),
+        )
+        .outerjoin(models.ObjetoAsegurado, models.ObjetoAsegurado.siniestro_id == models.Siniestro.id)
+        .outerjoin(models.Conductor, models.Conductor.siniestro_id == models.Siniestro.id)
+        .outerjoin(models.Asegurado, models.Asegurado.siniestro_id == models.Siniestro.id)
+    )
+
+
+def _a_registro(fila) -> RegistroSiniestro:
+    claves = []
+    for tipo in ("placa", "chasis", "serie_motor", "conductor_cedula", "asegurado_cedula"):
+        valor = normalizar_clave(getattr(fila, tipo))
+        if valor and len(valor) >= _LONGITUD_MINIMA[tipo]:
+            claves.append((tipo, valor))
+    if fila.direccion_clave:
+        claves.append(("direccion", fila.direccion_clave))
+    return RegistroSiniestro(
+        id=fila.id,
+        fecha=_como_datetime(fila.fecha_siniestro),
+        claves=tuple(claves),
+        lat=fila.ubicacion_geo_lat,
+        lng=fila.ubicacion_geo_lng,
+    )
+
+
+def detectar(registros: Iterable[RegistroSiniestro], ventana_dias: int = VENTANA_DIAS,
+             radio_metros: float = RADIO_METROS) -> Iterable[Senal]:
+    """Genera las señales de un flujo de registros ordenado por fecha"""
+    detector = DetectorDuplicados(ventana_dias, radio_metros)
+    for registro in registros:
+        yield from detector.agregar(registro)
+
+
+def detectar_para_siniestro(db: Session, siniestro_id: int, ventana_dias: int = VENTANA_DIAS) -> Optional[List[Senal]]:
+    """Señales de un siniestro contra el historial, usando solo índices para hallar candidatos"""
+    fila = _consulta_registros(db).filter(models.Siniestro.id == siniestro_id).first()
+    if fila is None:
+        return None
+
+    objetivo = _a_registro(fila)
+    columnas = {
+        "placa": models.ObjetoAsegurado.placa,
+        "chasis": models.ObjetoAsegurado.chasis,
+        "serie_motor": models.ObjetoAsegurado.serie_motor,
+        "conductor_cedula": models.Conductor.cedula,
+        "asegurado_cedula": models.Asegurado.cedula,
+    }
+
+    # Candidatos: una subconsulta indexada por cada clave del siniestro
+    subconsultas = []
+    for tipo, valor in objetivo.claves:
+        if tipo == "direccion":
+            subconsultas.append(select(models.Siniestro.id).where(models.Siniestro.direccion_clave == valor))
+        else:
+            columna = columnas[tipo]
+            subconsultas.append(
+                select(columna.class_.siniestro_id).where(clave_normalizada(columna) == valor)
+            )
+    if objetivo.lat is not None and objetivo.lng is not None:
+        delta_lat = RADIO_METROS / _METROS_POR_GRADO
+        delta_lng = delta_lat / max(math.cos(math.radians(objetivo.lat)), 0.01)
+        subconsultas.append(
+            select(models.Siniestro.id).where(
+                models.Siniestro.ubicacion_geo_lat.between(objetivo.lat - delta_lat, objetivo.lat + delta_lat),
+                models.Siniestro.ubicacion_geo_lng.between(objetivo.lng - delta_lng, objetivo.lng + delta_lng),
+            )
+        )
+    if not subconsultas:
+        return []
+
+    ventana = timedelta(days=ventana_dias)
+    filas = (
+        _consulta_registros(db)
+        .filter(models.Siniestro.id.in_(union(*subconsultas)))
+        .filter(models.Siniestro.fecha_siniestro.between(objetivo.fecha - ventana, objetivo.fecha + ventana))
+        .order_by(models.Siniestro.fecha_siniestro, models.Siniestro.id)
+        .all()
+    )
+
+    return [
+        senal
+        for senal in detectar((_a_registro(f) for f in filas), ventana_dias)
+        if siniestro_id in (senal.siniestro_id, senal.siniestro_relacionado_id)
+    ]
+
+
+def ejecutar_analisis_completo(session_factory, ventana_dias: int = VENTANA_DIAS, tamano_lote: int = TAMANO_LOTE) -> int:
+    """
+    Recorre todo el historial con un cursor del servidor y reemplaza la tabla
+    senales_fraude en una sola transacción.
+
+    Args:
+        session_factory: Fábrica de sesiones (SessionLocal); se usan dos sesiones
+            para que la escritura no cierre el cursor de lectura
+        ventana_dias: Ventana de tiempo entre siniestros relacionados
+        tamano_lote: Filas por lote de lectura y de inserción
+
+    Returns:
+        int: Número de señales registradas
+    """
+    lectura = session_factory()
+    escritura = session_factory()
+    total = 0
+    pendientes = []
+
+    try:
+        escritura.query(models.SenalFraude).delete(synchronize_session=False)
+
+        filas = (
+            _consulta_registros(lectura)
+            .order_by(models.Siniestro.fecha_siniestro, models.Siniestro.id)
+            .yield_per(tamano_lote)
+        )
+        for senal in detectar((_a_registro(f) for f in filas), ventana_dias):
+            pendientes.append(senal._asdict())
+            if len(pendientes) >= tamano_lote:
+                escritura.execute(insert(models.SenalFraude), pendientes)
+                total += len(pendientes)
+                pendientes = []
+        if pendientes:
+            escritura.execute(insert(models.SenalFraude), pendientes)
+            total += len(pendientes)
+
+        escritura.commit()
+        logger.info(f"✅ Análisis de duplicados completado: {total} señales")
+        return total
+
+    except Exception:
+        escritura.rollback()
+        raise
+    finally:
+        lectura.close()
+        escritura.close()
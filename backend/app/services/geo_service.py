@@ -0,0 +1,190 @@
+"""
+Servicio de consultas geoespaciales sobre la ubicación de los siniestros
+
+Si la base de datos tiene PostGIS se crea un índice GiST sobre la expresión
+geography del punto y las consultas usan ST_DWithin / &&. Sin PostGIS se usa
+la columna ubicacion_geohash (B-tree, collation "C") para acotar por prefijo y
+el índice compuesto lat/lng para los rectángulos.
+"""
+import logging
+import math
+from typing import List, Optional
+
+import sqlalchemy as sa
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils import geohash
+
+logger = logging.getLogger(__name__)
+
+_RADIO_TIERRA_METROS = 6_371_000
+
+# None = aún no verificado
+_postgis_disponible: Optional[bool] = None
+
+_COLUMNAS_RESULTADO = (
+    models.Siniestro.id,
+    models.Siniestro.reclamo_num,
+    models.Siniestro.compania_seguros,
+    models.Siniestro.tipo_reclamo,
+    models.Siniestro.fecha_siniestro,
+    models.Siniestro.ubicacion_geo_lat,
+    models.Siniestro.ubicacion_geo_lng,
+)
+
+
+_INDICE_POSTGIS_SQL = """
+    CREATE INDEX IF NOT EXISTS ix_siniestros_geography ON siniestros
+    USING gist ((ST_SetSRID(ST_MakePoint(ubicacion_geo_lng, ubicacion_geo_lat), 4326)::geography))
+    WHERE eliminado_en IS NULL
+"""
+
+# Misma expresión que el índice, como texto para que el planificador lo reconozca
+_PUNTO_SQL = "(ST_SetSRID(ST_MakePoint(siniestros.ubicacion_geo_lng, siniestros.ubicacion_geo_lat), 4326)::geography)"
+
+
+def asegurar_indice_espacial(engine) -> bool:
+    """Intenta habilitar PostGIS y crear el índice GiST; retorna si quedó disponible"""
+    global _postgis_disponible
+    try:
+        with engine.begin() as conn:
+            conn.execute(sa.text("CREATE EXTENSION IF NOT EXISTS postgis"))
+            conn.execute(sa.text(_INDICE_POSTGIS_SQL))
+        _postgis_disponible = True
+        logger.info("✅ Índice espacial PostGIS disponible")
+    except Exception as e:
+        _postgis_disponible = False
+        logger.info(f"ℹ️ PostGIS no disponible, se usa índice geohash: {e.__class__.__name__}")
+    return _postgis_disponible
+
+
+def postgis_disponible(db: Session) -> bool:
+    global _postgis_disponible
+    if _postgis_disponible is None:
+        _postgis_disponible = bool(
+            db.execute(sa.text("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")).first()
+        )
+    return _postgis_disponible
+
+
+def _distancia_sql(lat: float, lng: float):
+    """Distancia haversine en metros calculada por PostgreSQL"""
+    lat_r = func.radians(models.Siniestro.ubicacion_geo_lat)
+    dlat = func.radians(models.Siniestro.ubicacion_geo_lat - lat)
+    dlng = func.radians(models.Siniestro.ubicacion_geo_lng - lng)
+    a = func.power(func.sin(dlat / 2), 2) + math.cos(math.radians(lat)) * func.cos(lat_r) * func.power(
+        func.sin(dlng / 2), 2
+    )
+    return 2 * _RADIO_TIERRA_METROS * func.asin(func.sqrt(func.least(a, 1.0)))
+
+
+def _rango_prefijo(columna, prefijo: str):
+    """Condición de prefijo que el B-tree resuelve como rango ('{' sigue a 'z' en ASCII)"""
+    return sa.and_(columna >= prefijo, columna < prefijo + "{")
+
+
+def buscar_en_radio(db: Session, lat: float, lng: float, metros: float, limite: int = 500) -> List[dict]:
+    """Siniestros a menos de `metros` del punto, ordenados por distancia"""
+    if postgis_disponible(db):
+        punto = "ST_SetSRID(ST_MakePoint(:lng, :lat), 4326)::geography"
+        filas = db.execute(
+            sa.text(
+                f"""
+                SELECT id, reclamo_num, compania_seguros, tipo_reclamo, fecha_siniestro,
+                       ubicacion_geo_lat, ubicacion_geo_lng,
+                       ST_Distance({_PUNTO_SQL}, {punto}) AS distancia_metros
+                FROM siniestros
+                WHERE ST_DWithin({_PUNTO_SQL}, {punto}, :metros) AND eliminado_en IS NULL
+                ORDER BY distancia_metros
+                LIMIT :limite
+                """
+            ),
+            {"lat": lat, "lng": lng, "metros": metros, "limite": limite},
+        )
+        return [dict(fila._mapping) for fila in filas]
+
+    # Celda que cubre el radio y sus 8 vecinas: cada una es un rango del índice geohash
+    precision = geohash.precision_para_radio(metros, lat)
+    celdas = geohash.vecinos(geohash.encode(lat, lng, precision))
+    distancia = _distancia_sql(lat, lng).label("distancia_metros")
+
+    filas = (
+        db.query(*_COLUMNAS_RESULTADO, distancia)
+        .filter(or_(*[_rango_prefijo(models.Siniestro.ubicacion_geohash, celda) for celda in celdas]))
+        .filter(_distancia_sql(lat, lng) <= metros)
+        .order_by(distancia)
+        .limit(limite)
+        .all()
+    )
+    return [dict(fila._mapping) for fila in filas]
+
+
+def buscar_en_rectangulo(db: Session, min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+                         limite: int = 1000) -> List[dict]:
+    """Siniestros dentro del rectángulo"""
+    if postgis_disponible(db):
+        filas = db.execute(
+            sa.text(
+                f"""
+                SELECT id, reclamo_num, compania_seguros, tipo_reclamo, fecha_siniestro,
+                       ubicacion_geo_lat, ubicacion_geo_lng
+                FROM siniestros
+                WHERE {_PUNTO_SQL} && ST_MakeEnvelope(:min_lng, :min_lat, :max_lng, :max_lat, 4326)::geography
+                  AND eliminado_en IS NULL
+                LIMIT :limite
+                """
+            ),
+            {"min_lat": min_lat, "min_lng": min_lng, "max_lat": max_lat, "max_lng": max_lng, "limite": limite},
+        )
+        return [dict(fila._mapping) for fila in filas]
+
+    filas = (
+        db.query(*_COLUMNAS_RESULTADO)
+        .filter(models.Siniestro.ubicacion_geo_lat.between(min_lat, max_lat))
+        .filter(models.Siniestro.ubicacion_geo_lng.between(min_lng, max_lng))
+        .limit(limite)
+        .all()
+    )
+    return [dict(fila._mapping) for fila in filas]
+
+
+def precision_para_rectangulo(min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+                              celdas_objetivo: int = 64) -> int:
+    """Precisión geohash que divide el rectángulo en aproximadamente `celdas_objetivo` celdas"""
+    area = max(max_lat - min_lat, 1e-9) * max(max_lng - min_lng, 1e-9)
+    for precision in range(1, geohash.PRECISION_MAXIMA + 1):
+        alto, ancho = geohash.dimensiones_celda(precision)
+        if area / (alto * ancho) >= celdas_objetivo:
+            return precision
+    return geohash.PRECISION_MAXIMA
+
+
+def contar_clusters(db: Session, min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+                    precision: Optional[int] = None) -> List[dict]:
+    """
+    Conteo de siniestros por celda geohash dentro del rectángulo (mapa de calor).
+
+    El agrupamiento usa solo columnas del índice ix_siniestros_geohash, por lo
+    que PostgreSQL puede resolverlo con un index-only scan.
+    """
+    if precision is None:
+        precision = precision_para_rectangulo(min_lat, min_lng, max_lat, max_lng)
+    precision = max(1, min(precision, geohash.PRECISION_MAXIMA))
+
+    celda = func.substr(models.Siniestro.ubicacion_geohash, 1, precision).label("geohash")
+    filas = (
+        db.query(
+            celda,
+            func.count().label("total"),
+            func.avg(models.Siniestro.ubicacion_geo_lat).label("lat"),
+            func.avg(models.Siniestro.ubicacion_geo_lng).label("lng"),
+        )
+        .filter(models.Siniestro.ubicacion_geohash.isnot(None))
+        .filter(models.Siniestro.ubicacion_geo_lat.between(min_lat, max_lat))
+        .filter(models.Siniestro.ubicacion_geo_lng.between(min_lng, max_lng))
+        .group_by(celda)
+        .all()
+    )
+    return [dict(fila._mapping) for fila in filas]
@@ -0,0 +1,188 @@
+"""
+Verificaciones de salud con resultados en caché
+
+Un hilo de fondo ejecuta cada verificación (base de datos, S3, certificado de
+firma) con su propio intervalo y guarda el último resultado. Los endpoints
+/health/live y /health/ready solo leen ese estado, así que los sondeos del
+orquestador no tocan las dependencias. Cada verificación corre con un tiempo
+máximo; si una dependencia no responde, su verificación sigue en curso y no se
+lanza otra encima (no se acumulan), y el resultado se marca como fallido al
+superar el tiempo máximo o al quedar desactualizado.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuración desde variables de entorno
+HEALTH_DB_INTERVAL_SECONDS = float(os.getenv('HEALTH_DB_INTERVAL_SECONDS', '5'))
+HEALTH_S3_INTERVAL_SECONDS = float(os.getenv('HEALTH_S3_INTERVAL_SECONDS', '15'))
+HEALTH_CERT_INTERVAL_SECONDS = float(os.getenv('HEALTH_CERT_INTERVAL_SECONDS', '300'))
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv('HEALTH_CHECK_TIMEOUT_SECONDS', '3'))
+# Verificaciones que deben estar bien para aceptar tráfico (las demás solo se informan)
+HEALTH_REQUIRED_CHECKS = [
+    c.strip() for c in os.getenv('HEALTH_REQUIRED_CHECKS', 'base_datos,s3').split(',') if c.strip()
+]
+# Días antes del vencimiento del certificado en que se reporta como degradado
+HEALTH_CERT_WARNING_DAYS = int(os.getenv('HEALTH_CERT_WARNING_DAYS', '30'))
+
+
+class ErrorVerificacion(Exception):
+    """Verificación fallida con un mensaje para el reporte"""
+
+
+def verificar_base_datos() -> dict:
+    import sqlalchemy as sa
+    from app.database import engine
+
+    with engine.connect() as conn:
+        conn.execute(sa.text("SELECT 1"))
+    return {}
+
+
+def verificar_s3() -> dict:
+    from app.services.s3_service import get_s3_client, S3_BUCKET_NAME
+
+    if not (os.getenv('AWS_ACCESS_KEY_ID') and os.getenv('AWS_SECRET_ACCESS_KEY')):
+        raise ErrorVerificacion("Credenciales AWS S3 no configuradas")
+    get_s3_client().head_bucket(Bucket=S3_BUCKET_NAME)
+    return {"bucket": S3_BUCKET_NAME}
+
+
+def verificar_certificado() -> dict:
+    """Certificado de firma cargable (caché de pdf_generator), descifrable y vigente"""
+    from cryptography.hazmat.primitives.serialization import pkcs12
+    from app.utils.pdf_generator import load_certificate
+
+    cert_data, password = load_certificate()
+    if not cert_data:
+        raise ErrorVerificacion("Certificado de firma no disponible")
+    _, certificado, _ = pkcs12.load_key_and_certificates(cert_data, password.encode() if password else None)
+    vence = certificado.not_valid_after_utc
+    dias = (vence - datetime.now(timezone.utc)).days
+    if dias < 0:
+        raise ErrorVerificacion(f"Certificado vencido el {vence.date().isoformat()}")
+    detalle = {"sujeto": certificado.subject.rfc4514_string(), "vence": vence.isoformat(), "dias_para_vencer": dias}
+    if dias <= HEALTH_CERT_WARNING_DAYS:
+        detalle["advertencia"] = f"El certificado vence en {dias} días"
+    return detalle
+
+
+class _Verificacion:
+    def __init__(self, nombre: str, funcion: Callable[[], dict], intervalo: float):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.intervalo = intervalo
+        self.futuro = None
+        self.iniciada_en = 0.0
+        self.resultado: Optional[dict] = None
+
+    def vigencia(self) -> float:
+        """Edad máxima de un resultado antes de considerarlo desactualizado"""
+        return self.intervalo * 2 + HEALTH_CHECK_TIMEOUT_SECONDS
+
+
+class MonitorSalud:
+    """Ejecuta las verificaciones en segundo plano y conserva el último resultado de cada una"""
+
+    def __init__(self):
+        self._verificaciones: Dict[str, _Verificacion] = {}
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        # Un hilo por verificación como máximo: una dependencia colgada no bloquea las demás
+        self._pool = None
+
+    def registrar(self, nombre: str, funcion: Callable[[], dict], intervalo: float):
+        self._verificaciones[nombre] = _Verificacion(nombre, funcion, intervalo)
+
+    def iniciar(self):
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._pool = ThreadPoolExecutor(max_workers=len(self._verificaciones), thread_name_prefix="salud")
+        self._hilo = threading.Thread(target=self._ejecutar, name="monitor-salud", daemon=True)
+        self._hilo.start()
+        logger.info(f"🩺 Monitor de salud iniciado: {', '.join(self._verificaciones)}")
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _ejecutar(self):
+        while not self._detener.is_set():
+            ahora = time.monotonic()
+            for v in self._verificaciones.values():
+                if v.futuro is not None:
+                    if v.futuro.done():
+                        self._guardar(v, v.futuro)
+                        v.futuro = None
+                    elif ahora - v.iniciada_en > HEALTH_CHECK_TIMEOUT_SECONDS and not (v.resultado or {}).get("timeout"):
+                        # Sigue colgada: se reporta como fallida y no se lanza otra hasta que termine
+                        self._guardar_resultado(v, False, f"Sin respuesta en {HEALTH_CHECK_TIMEOUT_SECONDS:g}s",
+                                                ahora - v.iniciada_en, timeout=True)
+                if v.futuro is None and (v.resultado is None or ahora - v.resultado["_monotonic"] >= v.intervalo):
+                    v.iniciada_en = time.monotonic()
+                    v.futuro = self._pool.submit(v.funcion)
+            self._detener.wait(0.2)
+
+    def _guardar(self, v: _Verificacion, futuro):
+        duracion = time.monotonic() - v.iniciada_en
+        try:
+            detalle = futuro.result() or {}
+            self._guardar_resultado(v, True, None, duracion, **detalle)
+        except Exception as e:
+            mensaje = str(e) if isinstance(e, ErrorVerificacion) else f"{type(e).__name__}: {e}"
+            if (v.resultado or {}).get("ok", True):
+                logger.warning(f"⚠️ Verificación de salud '{v.nombre}' fallida: {mensaje}")
+            self._guardar_resultado(v, False, mensaje, duracion)
+
+    def _guardar_resultado(self, v: _Verificacion, ok: bool, error: Optional[str], duracion: float, **detalle):
+        resultado = {
+            "ok": ok,
+            "latencia_ms": round(duracion * 1000, 1),
+            "verificado_en": datetime.now(timezone.utc).isoformat(),
+            "_monotonic": time.monotonic(),
+            **detalle,
+        }
+        if error:
+            resultado["error"] = error
+        with self._lock:
+            v.resultado = resultado
+
+    def estado(self) -> dict:
+        """Último resultado de cada verificación; los desactualizados cuentan como fallidos"""
+        ahora = time.monotonic()
+        estado = {}
+        with self._lock:
+            for nombre, v in self._verificaciones.items():
+                if v.resultado is None:
+                    estado[nombre] = {"ok": False, "error": "Verificación pendiente"}
+                    continue
+                resultado = {k: val for k, val in v.resultado.items() if not k.startswith("_")}
+                if ahora - v.resultado["_monotonic"] > v.vigencia():
+                    resultado.update(ok=False, error="Resultado desactualizado")
+                resultado["requerida"] = nombre in HEALTH_REQUIRED_CHECKS
+                estado[nombre] = resultado
+        return estado
+
+
+monitor = MonitorSalud()
+monitor.registrar("base_datos", verificar_base_datos, HEALTH_DB_INTERVAL_SECONDS)
+monitor.registrar("s3", verificar_s3, HEALTH_S3_INTERVAL_SECONDS)
+monitor.registrar("certificado", verificar_certificado, HEALTH_CERT_INTERVAL_SECONDS)
+
+
+def estado_preparacion() -> tuple:
+    """(listo, verificaciones): listo si todas las verificaciones requeridas están bien"""
+    verificaciones = monitor.estado()
+    listo = all(verificaciones.get(nombre, {}).get("ok") for nombre in HEALTH_REQUIRED_CHECKS)
+    return listo, verificaciones
@@ -0,0 +1,200 @@
+"""
+Etapa previa al render: descarga y preparación de las imágenes de evidencia
+
+Las imágenes de relatos, inspecciones, testigos y diligencias se guardan en S3
+a resolución de cámara. Antes de renderizar el informe se descargan todas en
+paralelo (pool acotado), se reducen a resolución de impresión con Pillow y se
+guardan como JPEG en una caché local en disco indexada por la clave del
+objeto, de modo que ReportLab solo incrusta imágenes pequeñas ya preparadas y
+los informes siguientes del mismo siniestro no vuelven a descargarlas.
+
+Las URLs de imagen las escribe el usuario: solo se descargan objetos del bucket
+configurado o, por HTTPS, de los hosts de PDF_IMAGE_ALLOWED_HOSTS (sin seguir
+redirecciones y con tamaño máximo). Cualquier otra URL se trata como imagen
+faltante, para que el render no pueda usarse para consultar direcciones
+internas (metadatos de la instancia, servicios en localhost).
+"""
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+from urllib.parse import unquote, urlparse
+
+from PIL import Image, ImageOps
+
+from app.utils.static_map import DiskLRUCache
+
+logger = logging.getLogger(__name__)
+
+# Configuración desde variables de entorno
+PDF_IMAGE_WORKERS = int(os.getenv('PDF_IMAGE_WORKERS', '8'))
+PDF_IMAGE_DPI = int(os.getenv('PDF_IMAGE_DPI', '150'))
+PDF_IMAGE_JPEG_QUALITY = int(os.getenv('PDF_IMAGE_JPEG_QUALITY', '80'))
+PDF_IMAGE_TIMEOUT = float(os.getenv('PDF_IMAGE_TIMEOUT', '10'))
+PDF_IMAGE_CACHE_DIR = os.getenv('PDF_IMAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'siniestros_imagenes'))
+PDF_IMAGE_CACHE_MAX_MB = int(os.getenv('PDF_IMAGE_CACHE_MAX_MB', '500'))
+PDF_IMAGE_MAX_MB = int(os.getenv('PDF_IMAGE_MAX_MB', '25'))
+# Hosts externos (además del bucket) de los que se aceptan imágenes por HTTPS, separados por comas
+PDF_IMAGE_ALLOWED_HOSTS = {h.strip().lower() for h in os.getenv('PDF_IMAGE_ALLOWED_HOSTS', '').split(',') if h.strip()}
+
+# Área máxima de la imagen en el informe (pulgadas), igual que en el motor de informes
+_MAX_WIDTH_IN = 6.5
+_MAX_HEIGHT_IN = 4.0
+
+image_cache = DiskLRUCache(PDF_IMAGE_CACHE_DIR, PDF_IMAGE_CACHE_MAX_MB * 1024 * 1024)
+
+
+def object_key_from_url(url: str) -> Optional[str]:
+    """
+    Clave del objeto S3 a partir de la URL presigned (las URLs expiran, la clave no).
+    Retorna None si la URL no apunta al bucket configurado.
+    """
+    from app.services.s3_service import S3_BUCKET_NAME, S3_ENDPOINT_URL
+
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    path = unquote(parsed.path).lstrip('/')
+    if not path:
+        return None
+    # Endpoint compatible con S3 (MinIO): siempre estilo path
+    if S3_ENDPOINT_URL and host == urlparse(S3_ENDPOINT_URL).netloc.lower():
+        if path.startswith(f"{S3_BUCKET_NAME}/"):
+            return path[len(S3_BUCKET_NAME) + 1:]
+        return None
+    if not host.endswith('.amazonaws.com'):
+        return None
+    # Estilo virtual-host: bucket.s3.region.amazonaws.com/clave
+    if host.startswith(f"{S3_BUCKET_NAME.lower()}.s3"):
+        return path
+    # Estilo path: s3.region.amazonaws.com/bucket/clave
+    if path.startswith(f"{S3_BUCKET_NAME}/"):
+        return path[len(S3_BUCKET_NAME) + 1:]
+    return None
+
+
+def _cache_key(url: str, object_key: Optional[str]) -> str:
+    origen = object_key or urlparse(url)._replace(query='').geturl()
+    clave = f"{origen}|{PDF_IMAGE_DPI}|{PDF_IMAGE_JPEG_QUALITY}"
+    return hashlib.sha1(clave.encode()).hexdigest() + ".jpg"
+
+
+class ImagenNoPermitida(ValueError):
+    """La URL no apunta al bucket ni a un host permitido"""
+
+
+def _url_descargable(url: str, object_key: Optional[str]) -> bool:
+    """URL del bucket configurado (presigned) o HTTPS a un host de PDF_IMAGE_ALLOWED_HOSTS"""
+    from app.services.s3_service import S3_ENDPOINT_URL
+
+    parsed = urlparse(url)
+    if object_key:
+        # El endpoint S3 configurado (MinIO) puede ser http; AWS siempre https
+        return parsed.scheme == 'https' or (
+            bool(S3_ENDPOINT_URL) and parsed.netloc.lower() == urlparse(S3_ENDPOINT_URL).netloc.lower()
+        )
+    return parsed.scheme == 'https' and (parsed.hostname or '').lower() in PDF_IMAGE_ALLOWED_HOSTS
+
+
+def _leer_acotado(chunks: Iterable[bytes], limite: int) -> bytes:
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) > limite:
+            raise ValueError(f"imagen de más de {PDF_IMAGE_MAX_MB} MB")
+    return bytes(buffer)
+
+
+def _download(url: str, object_key: Optional[str], s3_client) -> bytes:
+    limite = PDF_IMAGE_MAX_MB * 1024 * 1024
+    if object_key and s3_client is not None:
+        from app.services.s3_service import S3_BUCKET_NAME
+
+        response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=object_key)
+        if response.get('ContentLength', 0) > limite:
+            raise ValueError(f"imagen de más de {PDF_IMAGE_MAX_MB} MB")
+        return _leer_acotado(iter(lambda: response['Body'].read(64 * 1024), b''), limite)
+
+    if not _url_descargable(url, object_key):
+        raise ImagenNoPermitida("URL fuera del bucket y de los hosts permitidos")
+
+    import requests
+
+    # Sin redirecciones: un host permitido no puede reenviar a una dirección interna
+    with requests.get(url, timeout=PDF_IMAGE_TIMEOUT, stream=True, allow_redirects=False) as response:
+        response.raise_for_status()
+        if response.is_redirect:
+            raise ImagenNoPermitida(f"redirección no permitida ({response.status_code})")
+        if int(response.headers.get('Content-Length') or 0) > limite:
+            raise ValueError(f"imagen de más de {PDF_IMAGE_MAX_MB} MB")
+        return _leer_acotado(response.iter_content(64 * 1024), limite)
+
+
+def prepare_image(data: bytes) -> bytes:
+    """Reduce la imagen a resolución de impresión y la recodifica como JPEG"""
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        max_size = (int(_MAX_WIDTH_IN * PDF_IMAGE_DPI), int(_MAX_HEIGHT_IN * PDF_IMAGE_DPI))
+        image.thumbnail(max_size, Image.LANCZOS)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=PDF_IMAGE_JPEG_QUALITY, optimize=True)
+        return buffer.getvalue()
+
+
+def _fetch_prepared(url: str, s3_client) -> Optional[str]:
+    object_key = object_key_from_url(url)
+    key = _cache_key(url, object_key)
+    ruta = image_cache.get(key)
+    if ruta:
+        return ruta
+    try:
+        return image_cache.put(key, prepare_image(_download(url, object_key, s3_client)))
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo preparar la imagen {object_key or url[:80]}: {e}")
+        return None
+
+
+def _s3_client_or_none():
+    try:
+        from app.services.s3_service import get_s3_client
+
+        return get_s3_client()
+    except Exception as e:
+        logger.info(f"ℹ️ Cliente S3 no disponible, se usan las URLs directamente: {e}")
+        return None
+
+
+def prefetch_images(urls: Iterable[str]) -> Dict[str, str]:
+    """
+    Descarga y prepara en paralelo las imágenes del informe.
+
+    Returns:
+        dict: URL -> ruta local de la imagen preparada (las que fallan se omiten)
+    """
+    urls = [url for url in dict.fromkeys(urls) if url]
+    if not urls:
+        return {}
+
+    # Las que ya están en caché no necesitan cliente S3 ni hilos
+    resultado = {}
+    pendientes = []
+    for url in urls:
+        ruta = image_cache.get(_cache_key(url, object_key_from_url(url)))
+        if ruta:
+            resultado[url] = ruta
+        else:
+            pendientes.append(url)
+
+    if pendientes:
+        s3_client = _s3_client_or_none()  # los clientes boto3 son seguros entre hilos
+        with ThreadPoolExecutor(max_workers=min(PDF_IMAGE_WORKERS, len(pendientes))) as pool:
+            for url, ruta in zip(pendientes, pool.map(lambda u: _fetch_prepared(u, s3_client), pendientes)):
+                if ruta:
+                    resultado[url] = ruta
+
+    logger.info(f"🖼️ Imágenes preparadas para el informe: {len(resultado)}/{len(urls)}")
+    return resultado
@@ -0,0 +1,290 @@
+"""
+Cola de trabajos de generación de informes PDF
+
+Los trabajos viven en la tabla trabajos_pdf. La API solo inserta el trabajo y
+responde de inmediato; uno o varios procesos pdf_worker.py los toman con
+SELECT ... FOR UPDATE SKIP LOCKED (cada trabajo lo procesa un único worker,
+sin bloquear a los demás), renderizan/firman el informe y lo dejan en el
+almacén de informes (app/services/pdf_store.py), desde donde se descarga.
+
+Un índice único parcial garantiza a lo sumo un trabajo pendiente por
+siniestro y variante: encolar de nuevo reutiliza el pendiente.
+"""
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.pdf_store import VARIANT_SIGNED, VARIANT_UNSIGNED
+
+logger = logging.getLogger(__name__)
+
+# Configuración desde variables de entorno
+PDF_JOB_MAX_INTENTOS = int(os.getenv('PDF_JOB_MAX_INTENTOS', '3'))
+PDF_JOB_TIMEOUT_SECONDS = int(os.getenv('PDF_JOB_TIMEOUT_SECONDS', '600'))
+PDF_JOB_REINTENTO_SEGUNDOS = int(os.getenv('PDF_JOB_REINTENTO_SEGUNDOS', '30'))
+PDF_WORKER_POLL_SECONDS = float(os.getenv('PDF_WORKER_POLL_SECONDS', '1'))
+# Pre-render del informe firmado al completar el siniestro
+PDF_PRERENDER_ENABLED = os.getenv('PDF_PRERENDER_ENABLED', 'true').lower() == 'true'
+PDF_PRERENDER_DEBOUNCE_SECONDS = float(os.getenv('PDF_PRERENDER_DEBOUNCE_SECONDS', '60'))
+
+VARIANTES = (VARIANT_SIGNED, VARIANT_UNSIGNED)
+
+PENDIENTE = "pendiente"
+PROCESANDO = "procesando"
+COMPLETADO = "completado"
+ERROR = "error"
+
+_T = models.TrabajoPdf
+
+
+def _ahora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def encolar_trabajo(db: Session, siniestro_id: int, variante: str = VARIANT_SIGNED,
+                    retraso_segundos: float = 0, posponer: bool = False) -> models.TrabajoPdf:
+    """
+    Inserta un trabajo pendiente, o reutiliza el pendiente del mismo siniestro
+    y variante. Por defecto adelanta su disponibilidad si el nuevo es más
+    urgente; con posponer=True la retrasa al nuevo momento (debounce).
+    """
+    disponible_en = _ahora() + timedelta(seconds=retraso_segundos)
+    stmt = pg_insert(_T.__table__).values(
+        siniestro_id=siniestro_id,
+        variante=variante,
+        estado=PENDIENTE,
+        progreso=0,
+        intentos=0,
+        disponible_en=disponible_en,
+    )
+    if posponer:
+        nuevo_disponible_en = stmt.excluded.disponible_en
+    else:
+        nuevo_disponible_en = sa.func.least(_T.__table__.c.disponible_en, stmt.excluded.disponible_en)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_T.siniestro_id, _T.variante],
+        index_where=(_T.estado == PENDIENTE),
+        set_={"disponible_en": nuevo_disponible_en},
+    ).returning(_T.__table__.c.id)
+    trabajo_id = db.execute(stmt).scalar_one()
+    db.commit()
+    logger.info(f"📥 Trabajo PDF {trabajo_id} encolado (siniestro {siniestro_id}, {variante})")
+    return db.get(_T, trabajo_id, populate_existing=True)
+
+
+def siniestro_completo(conclusiones, recomendacion_pago_cobertura) -> bool:
+    """El investigador terminó el siniestro: tiene conclusiones y recomendación de pago"""
+    from app.utils.report_engine import parse_list
+
+    return bool(parse_list(conclusiones)) and bool(parse_list(recomendacion_pago_cobertura))
+
+
+def programar_prerender(db: Session, siniestro_id: int) -> Optional[models.TrabajoPdf]:
+    """
+    Si el siniestro está completo, programa el render y la firma de su informe
+    dentro de PDF_PRERENDER_DEBOUNCE_SECONDS. Cada edición posterior vuelve a
+    posponer el mismo trabajo pendiente, de modo que una ráfaga de cambios
+    produce un solo render, con los datos finales.
+    """
+    if not PDF_PRERENDER_ENABLED:
+        return None
+    fila = (
+        db.query(models.Siniestro.conclusiones, models.Siniestro.recomendacion_pago_cobertura)
+        .filter(models.Siniestro.id == siniestro_id)
+        .first()
+    )
+    if fila is None or not siniestro_completo(*fila):
+        return None
+    return encolar_trabajo(
+        db, siniestro_id, VARIANT_SIGNED, retraso_segundos=PDF_PRERENDER_DEBOUNCE_SECONDS, posponer=True
+    )
+
+
+def tomar_trabajo(db: Session) -> Optional[int]:
+    """Reserva el siguiente trabajo disponible; los bloqueados por otro worker se saltan"""
+    trabajo = (
+        db.query(_T)
+        .filter(_T.estado == PENDIENTE, _T.disponible_en <= sa.func.now())
+        .order_by(_T.disponible_en, _T.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if trabajo is None:
+        db.rollback()
+        return None
+
+    trabajo.estado = PROCESANDO
+    trabajo.iniciado_en = sa.func.now()
+    trabajo.intentos += 1
+    trabajo.progreso = 0
+    trabajo.etapa = "Iniciando"
+    trabajo.error = None
+    trabajo_id = trabajo.id
+    db.commit()  # Libera el bloqueo: el estado 'procesando' ya lo excluye de la cola
+    return trabajo_id
+
+
+def _actualizar(session_factory, trabajo_id: int, **valores):
+    """Actualiza el trabajo en una transacción corta e independiente"""
+    db = session_factory()
+    try:
+        db.query(_T).filter(_T.id == trabajo_id).update(valores, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _hay_otro_pendiente(db: Session, trabajo: models.TrabajoPdf) -> bool:
+    return db.query(
+        db.query(_T)
+        .filter(_T.siniestro_id == trabajo.siniestro_id, _T.variante == trabajo.variante, _T.estado == PENDIENTE)
+        .exists()
+    ).scalar()
+
+
+def _registrar_fallo(db: Session, trabajo: models.TrabajoPdf, mensaje: str, commit: bool = True):
+    """
+    Reprograma el trabajo con espera creciente, o lo marca como error definitivo.
+    Con commit=False solo hace flush (lo ven los siguientes _hay_otro_pendiente) y
+    el llamador confirma, conservando sus bloqueos hasta entonces.
+    """
+    if trabajo.intentos < PDF_JOB_MAX_INTENTOS and not _hay_otro_pendiente(db, trabajo):
+        trabajo.estado = PENDIENTE
+        trabajo.disponible_en = _ahora() + timedelta(seconds=PDF_JOB_REINTENTO_SEGUNDOS * trabajo.intentos)
+        trabajo.etapa = "Reintento programado"
+    else:
+        trabajo.estado = ERROR
+        trabajo.finalizado_en = sa.func.now()
+        trabajo.etapa = None
+    trabajo.error = mensaje[:2000]
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+
+
+def ejecutar_trabajo(session_factory, trabajo_id: int):
+    """Renderiza (y firma, según la variante) el informe del trabajo reservado"""
+    from app.utils.pdf_generator import open_rendered_pdf, open_signed_pdf
+    from app.utils.report_engine import ClaimSnapshot
+
+    def progreso(porcentaje: int, etapa: str):
+        _actualizar(session_factory, trabajo_id, progreso=porcentaje, etapa=etapa)
+
+    db = session_factory()
+    try:
+        trabajo = db.get(_T, trabajo_id)
+        # Identifica esta ejecución: si el trabajo se reprogramó por vencido o lo tomó
+        # otro worker, su estado o iniciado_en ya no coinciden y no se toca
+        esta_ejecucion = (_T.id == trabajo_id, _T.estado == PROCESANDO, _T.iniciado_en == trabajo.iniciado_en)
+        try:
+            siniestro = db.get(models.Siniestro, trabajo.siniestro_id)
+            if siniestro is None:
+                raise ValueError("Siniestro no encontrado")
+
+            progreso(5, "Cargando datos del siniestro")
+            snapshot = ClaimSnapshot.from_siniestro(siniestro)
+            huella = snapshot.fingerprint()
+            variante = trabajo.variante
+            # El render y la firma solo usan el snapshot: se cierra la transacción de
+            # lectura para no dejar la conexión "idle in transaction" (frena el vacuum)
+            db.expunge_all()
+            db.rollback()
+
+            if variante == VARIANT_SIGNED:
+                resultado = open_signed_pdf(siniestro, snapshot, progress=progreso)
+                if resultado is None:
+                    raise RuntimeError("Certificado digital no disponible o firma fallida")
+            else:
+                # Un render incompleto falla el trabajo y se reintenta
+                resultado = open_rendered_pdf(siniestro, snapshot, progress=progreso, require_complete=True)
+            resultado[0].close()  # El informe ya quedó en el almacén
+
+            completado = db.execute(
+                sa.update(_T).where(*esta_ejecucion).values(
+                    estado=COMPLETADO, progreso=100, etapa="Completado", huella=huella,
+                    finalizado_en=sa.func.now(),
+                )
+            ).rowcount
+            db.commit()
+            if completado:
+                logger.info(f"✅ Trabajo PDF {trabajo_id} completado (siniestro {siniestro.id})")
+            else:
+                logger.warning(f"⚠️ Trabajo PDF {trabajo_id} terminó después de ser reprogramado; no se marca")
+        except Exception as e:
+            logger.error(f"❌ Error en trabajo PDF {trabajo_id}: {e}")
+            db.rollback()
+            trabajo = db.query(_T).filter(*esta_ejecucion).with_for_update().first()
+            if trabajo is None:
+                db.rollback()
+                logger.warning(f"⚠️ Trabajo PDF {trabajo_id} ya fue reprogramado; no se registra el fallo")
+            else:
+                _registrar_fallo(db, trabajo, str(e))
+    finally:
+        db.close()
+
+
+def recuperar_trabajos_vencidos(db: Session) -> int:
+    """Devuelve a la cola los trabajos 'procesando' cuyo worker murió o se colgó"""
+    limite = _ahora() - timedelta(seconds=PDF_JOB_TIMEOUT_SECONDS)
+    vencidos = (
+        db.query(_T)
+        .filter(_T.estado == PROCESANDO, _T.iniciado_en < limite)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for trabajo in vencidos:
+        logger.warning(f"⚠️ Trabajo PDF {trabajo.id} excedió {PDF_JOB_TIMEOUT_SECONDS}s, se reprograma")
+        # Sin commit por trabajo: confirmar liberaría los bloqueos SKIP LOCKED del resto
+        # de la lista y otro worker podría reprogramarlos (y contar el fallo) otra vez
+        _registrar_fallo(db, trabajo, "Tiempo de procesamiento agotado", commit=False)
+    db.commit()
+    return len(vencidos)
+
+
+def procesar_siguiente(session_factory) -> bool:
+    """Procesa un trabajo si hay alguno disponible; retorna si procesó"""
+    db = session_factory()
+    try:
+        trabajo_id = tomar_trabajo(db)
+    finally:
+        db.close()
+    if trabajo_id is None:
+        return False
+    ejecutar_trabajo(session_factory, trabajo_id)
+    return True
+
+
+def ejecutar_worker(session_factory, detener: threading.Event, una_vez: bool = False):
+    """Bucle del worker: procesa mientras haya trabajos y espera PDF_WORKER_POLL_SECONDS si no"""
+    logger.info("🛠️ Worker de informes PDF iniciado")
+    ultima_recuperacion = 0.0
+    while not detener.is_set():
+        ahora = _ahora().timestamp()
+        if ahora - ultima_recuperacion > PDF_JOB_TIMEOUT_SECONDS / 2:
+            db = session_factory()
+            try:
+                recuperar_trabajos_vencidos(db)
+            finally:
+                db.close()
+            ultima_recuperacion = ahora
+
+        try:
+            proceso = procesar_siguiente(session_factory)
+        except Exception as e:
+            # Base de datos caída, etc.: el worker sigue vivo y reintenta
+            logger.error(f"❌ Error en el worker de informes PDF: {e}")
+            proceso = False
+
+        if not proceso:
+            if una_vez:
+                break
+            detener.wait(PDF_WORKER_POLL_SECONDS)
+    logger.info("🛑 Worker de informes PDF detenido")
@@ -0,0 +1,127 @@
+"""
+Almacén de informes PDF ya renderizados
+
+Cada informe se guarda por siniestro, huella del contenido (ClaimSnapshot.
+fingerprint) y variante, de modo que:
+  - generar-pdf-sin-firma y generar-pdf comparten una sola renderización
+  - firmar solo agrega la firma incremental sobre el PDF guardado
+  - cualquier cambio en los datos impresos produce una clave nueva
+
+PDF_STORE_BACKEND=local guarda en disco con desalojo LRU (compartido por los
+workers y el pdf_worker de la misma máquina; el límite PDF_STORE_MAX_MB se
+aplica por proceso sobre el índice que cada uno relee del disco, ver
+DiskLRUCache); PDF_STORE_BACKEND=s3 guarda bajo PDF_STORE_S3_PREFIX en el
+bucket de la aplicación (compartido entre máquinas).
+"""
+import logging
+import os
+import tempfile
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from app.utils.static_map import DiskLRUCache
+
+logger = logging.getLogger(__name__)
+
+# Configuración desde variables de entorno
+PDF_STORE_BACKEND = os.getenv('PDF_STORE_BACKEND', 'local')  # local | s3
+PDF_STORE_DIR = os.getenv('PDF_STORE_DIR', os.path.join(tempfile.gettempdir(), 'siniestros_informes'))
+PDF_STORE_MAX_MB = int(os.getenv('PDF_STORE_MAX_MB', '500'))
+PDF_STORE_S3_PREFIX = os.getenv('PDF_STORE_S3_PREFIX', 'informes')
+# Tamaño máximo del PDF en memoria durante el render; por encima se usa un archivo temporal
+PDF_SPOOL_MAX_MB = int(os.getenv('PDF_SPOOL_MAX_MB', '8'))
+
+VARIANT_UNSIGNED = "sin_firma"
+VARIANT_SIGNED = "firmado"
+
+_local_cache = DiskLRUCache(PDF_STORE_DIR, PDF_STORE_MAX_MB * 1024 * 1024)
+
+
+def store_key(siniestro_id: int, fingerprint: str, variant: str) -> str:
+    return f"siniestro_{siniestro_id}/{fingerprint}_{variant}.pdf"
+
+
+def new_spool_file():
+    """Archivo temporal en memoria hasta PDF_SPOOL_MAX_MB y en disco a partir de ahí"""
+    return tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_MB * 1024 * 1024, mode='w+b')
+
+
+def file_size(fileobj) -> int:
+    """Tamaño de un archivo abierto (deja la posición al inicio)"""
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    return size
+
+
+def open_pdf(siniestro_id: int, fingerprint: str, variant: str) -> Optional[Tuple[BinaryIO, int]]:
+    """
+    PDF guardado como (archivo abierto, tamaño), o None si no existe para esa
+    versión y variante. El llamador debe cerrar el archivo.
+    """
+    key = store_key(siniestro_id, fingerprint, variant)
+    try:
+        if PDF_STORE_BACKEND == 's3':
+            from app.services.s3_service import get_s3_client, S3_BUCKET_NAME
+
+            response = get_s3_client().get_object(Bucket=S3_BUCKET_NAME, Key=f"{PDF_STORE_S3_PREFIX}/{key}")
+            return response['Body'], response['ContentLength']
+
+        ruta = _local_cache.get(key)
+        if ruta is None:
+            return None
+        fileobj = open(ruta, 'rb')
+        return fileobj, os.fstat(fileobj.fileno()).st_size
+    except Exception as e:
+        # NoSuchKey en S3 o archivo desalojado entre get() y open()
+        logger.debug(f"Informe no encontrado en el almacén ({key}): {e}")
+        return None
+
+
+def get_pdf(siniestro_id: int, fingerprint: str, variant: str) -> Optional[bytes]:
+    """PDF guardado como bytes (para la firma, que necesita el documento completo)"""
+    stored = open_pdf(siniestro_id, fingerprint, variant)
+    if stored is None:
+        return None
+    fileobj, _ = stored
+    try:
+        return fileobj.read()
+    finally:
+        fileobj.close()
+
+
+def put_pdf(siniestro_id: int, fingerprint: str, variant: str, pdf_file: BinaryIO):
+    """
+    Guarda el PDF copiándolo por bloques desde un archivo abierto (queda de
+    nuevo al inicio). Un fallo del almacén no debe impedir entregar el informe.
+    """
+    key = store_key(siniestro_id, fingerprint, variant)
+    try:
+        pdf_file.seek(0)
+        if PDF_STORE_BACKEND == 's3':
+            from app.services.s3_service import get_s3_client, S3_BUCKET_NAME
+
+            get_s3_client().upload_fileobj(
+                pdf_file,
+                S3_BUCKET_NAME,
+                f"{PDF_STORE_S3_PREFIX}/{key}",
+                ExtraArgs={'ContentType': 'application/pdf', 'ACL': 'private'},
+            )
+        else:
+            _local_cache.put_stream(key, pdf_file)
+        logger.info(f"💾 Informe guardado en el almacén: {key} ({pdf_file.tell()} bytes)")
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo guardar el informe {key}: {e}")
+    finally:
+        pdf_file.seek(0)
+
+
+def iter_pdf(pdf_file: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Contenido del archivo por fragmentos para StreamingResponse; lo cierra al terminar"""
+    try:
+        while True:
+            chunk = pdf_file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        pdf_file.close()
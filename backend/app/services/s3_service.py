@@ -14,6 +14,8 @@ logger = logging.getLogger(__name__)
 MAX_FILE_SIZE_MB = int(os.getenv('MAX_FILE_SIZE_MB', '10'))
 ALLOWED_FILE_TYPES = os.getenv('ALLOWED_FILE_TYPES', 'image/jpeg,image/png,image/jpg,image/webp').split(',')
 S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME', 'siniestrossusiespinosa')
+# Endpoint alternativo compatible con S3 (MinIO en pruebas de carga); vacío = AWS
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL', '')
 
 
 def get_s3_client():
@@ -27,12 +29,15 @@ def get_s3_client():
             detail="Credenciales AWS S3 no configuradas"
         )
 
-    return boto3.client(
+    from app.utils.metrics import instrument_s3_client
+
+    return instrument_s3_client(boto3.client(
         's3',
         aws_access_key_id=aws_access_key,
         aws_secret_access_key=aws_secret_key,
-        region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-2')
-    )
+        region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-2'),
+        endpoint_url=S3_ENDPOINT_URL or None,
+    ))
 
 
 async def validate_file(file: UploadFile) -> bytes:
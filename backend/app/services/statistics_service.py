@@ -0,0 +1,232 @@
+"""
+Servicio de estadísticas pre-agregadas de siniestros
+
+La tabla estadisticas_siniestros guarda, por cada dimensión y valor, el
+número de siniestros y las sumas necesarias para los promedios de días entre
+fecha_siniestro y fecha_reportado / fecha_designacion. Los eventos del ORM
+aplican en la misma transacción el delta de cada alta, cambio o baja, de modo
+que la consulta del tablero solo lee unas pocas filas, sin importar cuántos
+siniestros existan.
+
+No hay fila del total general: todas las escrituras de siniestros la
+actualizarían y quedarían serializadas en su bloqueo. El total se suma al leer
+desde las filas por compañía (cada siniestro cuenta en exactamente una).
+
+Los siniestros eliminados (borrado lógico) dejan de contar; los archivados
+siguen contando, porque el archivo solo los mueve de tabla.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+import sqlalchemy as sa
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.base import NO_VALUE
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONES = ("compania_seguros", "tipo_reclamo", "cobertura", "mes")
+
+# Campos del siniestro que afectan al resumen
+_CAMPOS = ("compania_seguros", "tipo_reclamo", "cobertura", "fecha_siniestro", "fecha_reportado", "fecha_designacion")
+
+_tabla = models.EstadisticaSiniestros.__table__
+_METRICAS = ("total", "dias_reporte_suma", "dias_reporte_n", "dias_designacion_suma", "dias_designacion_n")
+
+
+def _como_datetime(valor) -> Optional[datetime]:
+    """Fechas del modelo en UTC (pueden llegar como texto ISO antes del refresh)"""
+    if valor is None:
+        return None
+    if not isinstance(valor, datetime):
+        valor = datetime.fromisoformat(str(valor))
+    if valor.tzinfo is None:
+        valor = valor.replace(tzinfo=timezone.utc)
+    return valor.astimezone(timezone.utc)
+
+
+def _dias(desde: Optional[datetime], hasta: Optional[datetime]) -> Optional[float]:
+    if desde is None or hasta is None:
+        return None
+    return (hasta - desde).total_seconds() / 86400
+
+
+def _contribucion(valores: dict, signo: int) -> list:
+    """Filas (dimension, valor, deltas) que aporta un siniestro al resumen"""
+    fecha_siniestro = _como_datetime(valores["fecha_siniestro"])
+    dias_reporte = _dias(fecha_siniestro, _como_datetime(valores["fecha_reportado"]))
+    dias_designacion = _dias(fecha_siniestro, _como_datetime(valores["fecha_designacion"]))
+
+    deltas = {
+        "total": signo,
+        "dias_reporte_suma": signo * (dias_reporte or 0.0),
+        "dias_reporte_n": signo * (dias_reporte is not None),
+        "dias_designacion_suma": signo * (dias_designacion or 0.0),
+        "dias_designacion_n": signo * (dias_designacion is not None),
+    }
+    claves = [
+        ("compania_seguros", valores["compania_seguros"] or ""),
+        ("tipo_reclamo", valores["tipo_reclamo"] or ""),
+        ("cobertura", valores["cobertura"] or ""),
+        ("mes", fecha_siniestro.strftime("%Y-%m") if fecha_siniestro else ""),
+    ]
+    return [{"dimension": dimension, "valor": valor, **deltas} for dimension, valor in claves]
+
+
+def _aplicar(connection, filas: list):
+    """Suma los deltas con un upsert; cada fila queda bloqueada solo hasta el commit"""
+    # Un mismo upsert no puede tocar dos veces la misma fila: se combinan los deltas por clave
+    combinadas = {}
+    for fila in filas:
+        clave = (fila["dimension"], fila["valor"])
+        if clave in combinadas:
+            for metrica in _METRICAS:
+                combinadas[clave][metrica] += fila[metrica]
+        else:
+            combinadas[clave] = dict(fila)
+    # Orden fijo de claves: dos transacciones que tocan las mismas filas las bloquean
+    # en el mismo orden y no pueden interbloquearse (p. ej. X→Y y Y→X a la vez)
+    filas = [
+        combinadas[clave] for clave in sorted(combinadas)
+        if any(abs(combinadas[clave][m]) > 1e-9 for m in _METRICAS)
+    ]
+    if not filas:
+        return
+
+    stmt = pg_insert(_tabla).values(filas)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_estadisticas_dimension_valor",
+        set_={metrica: getattr(_tabla.c, metrica) + getattr(stmt.excluded, metrica) for metrica in _METRICAS},
+    )
+    connection.execute(stmt)
+
+
+def _valores_actuales(target) -> dict:
+    return {campo: getattr(target, campo) for campo in _CAMPOS}
+
+
+def _valores_anteriores(target) -> Optional[dict]:
+    """Valores previos al flush, o None si ningún campo relevante cambió"""
+    estado = inspect(target)
+    anteriores = {}
+    cambio = False
+    for campo in _CAMPOS:
+        if estado.attrs[campo].history.has_changes():
+            cambio = True
+            # committed_state distingue "era None" de "no estaba cargado"
+            anteriores[campo] = estado.committed_state.get(campo, NO_VALUE)
+            if anteriores[campo] is NO_VALUE:
+                raise RuntimeError(f"Valor anterior de {campo} no cargado: no se puede aplicar el delta")
+        else:
+            anteriores[campo] = getattr(target, campo)
+    return anteriores if cambio else None
+
+
+# Con active_history, asignar un campo expirado o no cargado carga antes su valor
+# de la base, de modo que el delta se resta del grupo correcto
+for _campo in _CAMPOS:
+    event.listen(getattr(models.Siniestro, _campo), "set", lambda *args: None, active_history=True)
+
+
+@event.listens_for(models.Siniestro, "after_insert")
+def _al_insertar(mapper, connection, target):
+    _aplicar(connection, _contribucion(_valores_actuales(target), +1))
+
+
+@event.listens_for(models.Siniestro, "after_update")
+def _al_actualizar(mapper, connection, target):
+    if models.borrado_logico_en_flush(target):
+        _aplicar(connection, _contribucion(_valores_anteriores(target) or _valores_actuales(target), -1))
+        return
+    anteriores = _valores_anteriores(target)
+    if anteriores is None:
+        return
+    _aplicar(connection, _contribucion(anteriores, -1) + _contribucion(_valores_actuales(target), +1))
+
+
+@event.listens_for(models.Siniestro, "after_delete")
+def _al_eliminar(mapper, connection, target):
+    _aplicar(connection, _contribucion(_valores_actuales(target), -1))
+
+
+def reconstruir_estadisticas(db: Session):
+    """
+    Recalcula todo el resumen con una agregación en SQL.
+    Necesario tras cargas masivas que no pasan por el ORM (COPY, bulk deletes).
+    Cuenta los siniestros no eliminados de la tabla activa y del archivo.
+    """
+    s = sa.union_all(*(
+        sa.select(*(tabla.c[c] for c in _CAMPOS)).where(tabla.c.eliminado_en.is_(None))
+        for tabla in (models.Siniestro.__table__, models.siniestros_archivo)
+    )).subquery()
+    dias_reporte = sa.extract("epoch", s.c.fecha_reportado - s.c.fecha_siniestro) / 86400
+    dias_designacion = sa.extract("epoch", s.c.fecha_designacion - s.c.fecha_siniestro) / 86400
+    mes = sa.func.to_char(sa.func.timezone("UTC", s.c.fecha_siniestro), "YYYY-MM")
+
+    db.execute(sa.delete(_tabla))
+    for dimension, expresion in (
+        ("compania_seguros", s.c.compania_seguros),
+        ("tipo_reclamo", s.c.tipo_reclamo),
+        ("cobertura", s.c.cobertura),
+        ("mes", mes),
+    ):
+        valor = sa.func.coalesce(expresion, "")
+        consulta = sa.select(
+            sa.literal(dimension),
+            valor,
+            sa.func.count(),
+            sa.func.coalesce(sa.func.sum(dias_reporte), 0),
+            sa.func.count(s.c.fecha_reportado),
+            sa.func.coalesce(sa.func.sum(dias_designacion), 0),
+            sa.func.count(s.c.fecha_designacion),
+        ).select_from(s).group_by(valor)
+        db.execute(
+            _tabla.insert().from_select(
+                ["dimension", "valor", "total", "dias_reporte_suma", "dias_reporte_n",
+                 "dias_designacion_suma", "dias_designacion_n"],
+                consulta,
+            )
+        )
+    db.commit()
+    logger.info("✅ Estadísticas de siniestros reconstruidas")
+
+
+def _promedio(suma: float, n: int) -> Optional[float]:
+    return round(suma / n, 2) if n else None
+
+
+def obtener_estadisticas(db: Session) -> dict:
+    """Lee el resumen (una fila por dimensión y valor)"""
+    resultado = {
+        "total": 0,
+        "promedio_dias_reporte": None,
+        "promedio_dias_designacion": None,
+        **{f"por_{dimension}": [] for dimension in DIMENSIONES},
+    }
+
+    general = dict.fromkeys(_METRICAS, 0)
+    for fila in db.query(models.EstadisticaSiniestros).filter(models.EstadisticaSiniestros.total > 0):
+        grupo = {
+            "valor": fila.valor or None,
+            "total": fila.total,
+            "promedio_dias_reporte": _promedio(fila.dias_reporte_suma, fila.dias_reporte_n),
+            "promedio_dias_designacion": _promedio(fila.dias_designacion_suma, fila.dias_designacion_n),
+        }
+        if fila.dimension == "compania_seguros":
+            for metrica in _METRICAS:
+                general[metrica] += getattr(fila, metrica)
+        if fila.dimension in DIMENSIONES:
+            resultado[f"por_{fila.dimension}"].append(grupo)
+
+    resultado["total"] = general["total"]
+    resultado["promedio_dias_reporte"] = _promedio(general["dias_reporte_suma"], general["dias_reporte_n"])
+    resultado["promedio_dias_designacion"] = _promedio(general["dias_designacion_suma"], general["dias_designacion_n"])
+
+    resultado["por_mes"].sort(key=lambda g: g["valor"] or "")
+    for dimension in ("compania_seguros", "tipo_reclamo", "cobertura"):
+        resultado[f"por_{dimension}"].sort(key=lambda g: -g["total"])
+    return resultado
@@ -0,0 +1,102 @@
+"""
+Sincronización incremental de siniestros ("cambios desde el cursor X")
+
+El cliente guarda el cursor de la última respuesta y pide solo lo que cambió
+después: siniestros creados o modificados (recorridos por el índice
+(updated_at, id)) y los IDs eliminados o archivados (tabla
+siniestros_eliminados). El tamaño de la respuesta depende del volumen de
+cambios, no del de la tabla.
+
+updated_at toma la hora de inicio de la transacción, así que una transacción
+larga puede confirmar filas con un updated_at anterior a otras ya entregadas.
+Por eso solo se entregan cambios hasta "ahora - SYNC_SAFETY_LAG_SECONDS": las
+escrituras que tardan menos que ese margen nunca se pierden.
+"""
+import base64
+import os
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+
+from app import models
+
+# Configuración desde variables de entorno
+SYNC_SAFETY_LAG_SECONDS = float(os.getenv('SYNC_SAFETY_LAG_SECONDS', '2'))
+SYNC_MAX_LIMIT = int(os.getenv('SYNC_MAX_LIMIT', '1000'))
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(momento: datetime, ultimo_id: Optional[int]) -> str:
+    """
+    Cursor opaco: momento hasta el que se entregó y, si la página quedó cortada
+    en medio de ese momento, el último ID entregado con ese updated_at.
+    """
+    valor = momento.isoformat() if ultimo_id is None else f"{momento.isoformat()}|{ultimo_id}"
+    return base64.urlsafe_b64encode(valor.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, Optional[int]]:
+    try:
+        valor = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        momento, _, ultimo_id = valor.partition("|")
+        momento = datetime.fromisoformat(momento)
+        if momento.tzinfo is None:
+            raise ValueError("sin zona horaria")
+        return momento, int(ultimo_id) if ultimo_id else None
+    except ValueError as e:
+        raise CursorInvalido(f"Cursor inválido: {e}") from e
+
+
+def obtener_cambios(db: Session, cursor: Optional[str] = None, desde: Optional[datetime] = None,
+                    limite: int = 500) -> dict:
+    """
+    Siniestros creados/modificados y eliminados después del cursor (o de `desde`).
+    Sin cursor ni `desde` entrega todo, paginado: es la carga inicial del cliente.
+    """
+    limite = max(1, min(limite, SYNC_MAX_LIMIT))
+    if cursor:
+        momento, ultimo_id = decodificar_cursor(cursor)
+    elif desde:
+        momento, ultimo_id = desde, None
+    else:
+        momento, ultimo_id = None, None
+
+    hasta = db.scalar(select(func.clock_timestamp())) - timedelta(seconds=SYNC_SAFETY_LAG_SECONDS)
+
+    Siniestro = models.Siniestro
+    consulta = db.query(Siniestro).filter(Siniestro.updated_at <= hasta)
+    if momento is not None and ultimo_id is not None:
+        consulta = consulta.filter(tuple_(Siniestro.updated_at, Siniestro.id) > tuple_(momento, ultimo_id))
+    elif momento is not None:
+        consulta = consulta.filter(Siniestro.updated_at > momento)
+    siniestros = consulta.order_by(Siniestro.updated_at, Siniestro.id).limit(limite + 1).all()
+
+    hay_mas = len(siniestros) > limite
+    if hay_mas:
+        siniestros = siniestros[:limite]
+        # La página terminó a mitad del recorrido: el próximo cursor sigue desde la última fila
+        hasta = siniestros[-1].updated_at
+        siguiente = codificar_cursor(hasta, siniestros[-1].id)
+    else:
+        siguiente = codificar_cursor(hasta, None)
+
+    # En la carga inicial no hay nada local que borrar
+    ids_eliminados = []
+    if momento is not None:
+        Eliminado = models.SiniestroEliminado
+        eliminados = db.query(Eliminado.siniestro_id).filter(
+            Eliminado.eliminado_en > momento, Eliminado.eliminado_en <= hasta
+        )
+        ids_eliminados = sorted({fila.siniestro_id for fila in eliminados})
+
+    return {
+        "cambios": siniestros,
+        "eliminados": ids_eliminados,
+        "cursor": siguiente,
+        "hay_mas": hay_mas,
+    }
@@ -0,0 +1,496 @@
+"""
+Generador de siniestros sintéticos a gran escala
+
+Produce siniestros realistas (placas ecuatorianas, cédulas y RUC con dígito
+verificador válido, direcciones y coordenadas alrededor de Quito y Guayaquil)
+con todas sus entidades relacionadas, y los escribe con COPY en lotes
+independientes que se procesan en paralelo (un proceso y una transacción por
+lote). Cada lote usa su propio generador aleatorio derivado de la semilla y del
+número de lote: con la misma semilla y el mismo tamaño de lote el resultado es
+idéntico sin importar cuántos procesos se usen.
+
+Las claves derivadas que en el ORM asigna un listener (direccion_clave y
+ubicacion_geohash) se calculan aquí, y al final se reconstruyen las
+estadísticas pre-agregadas y se actualizan las estadísticas del planificador.
+Una fracción configurable de siniestros reutiliza placa, cédula, dirección o
+ubicación de un siniestro reciente para que la detección de fraude tenga
+coincidencias que encontrar.
+"""
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.models.siniestro import clave_direccion
+from app.utils import geohash
+
+logger = logging.getLogger(__name__)
+
+# Configuración desde variables de entorno
+SYNTHETIC_BATCH_SIZE = int(os.getenv('SYNTHETIC_BATCH_SIZE', '5000'))
+SYNTHETIC_DUPLICATE_RATE = float(os.getenv('SYNTHETIC_DUPLICATE_RATE', '0.02'))
+
+_ECUADOR = timezone(timedelta(hours=-5))
+_FECHA_INICIO = datetime(2023, 1, 1, tzinfo=_ECUADOR)
+_RANGO_SEGUNDOS = 3 * 365 * 24 * 3600
+# Fecha de corte por defecto de los datos (tope de updated_at); fija para que la
+# misma semilla produzca siempre las mismas filas
+_FECHA_REFERENCIA = _FECHA_INICIO + timedelta(seconds=_RANGO_SEGUNDOS)
+
+# Columnas escritas por tabla, en orden de inserción (los hijos después del siniestro).
+# Las columnas omitidas (id de las tablas hijas, created_at...) toman su valor por defecto.
+COLUMNAS = {
+    "siniestros": (
+        "id", "compania_seguros", "ruc_compania", "tipo_reclamo", "poliza", "reclamo_num",
+        "fecha_siniestro", "direccion_siniestro", "direccion_clave", "ubicacion_geo_lat",
+        "ubicacion_geo_lng", "ubicacion_geohash", "danos_terceros", "ejecutivo_cargo",
+        "fecha_designacion", "tipo_siniestro", "fecha_reportado", "cobertura", "fecha_declaracion",
+        "persona_declara_tipo", "persona_declara_cedula", "persona_declara_nombre",
+        "persona_declara_relacion", "misiva_investigacion", "evidencias_complementarias",
+        "otras_diligencias", "observaciones", "recomendacion_pago_cobertura", "conclusiones",
+        "anexo", "created_at", "updated_at",
+    ),
+    "asegurados": (
+        "siniestro_id", "tipo", "cedula", "nombre", "celular", "direccion", "correo", "ruc",
+        "empresa", "representante_legal", "telefono",
+    ),
+    "beneficiarios": ("siniestro_id", "razon_social", "cedula_ruc", "domicilio"),
+    "conductores": ("siniestro_id", "nombre", "cedula", "celular", "direccion", "parentesco"),
+    "objetos_asegurados": (
+        "siniestro_id", "placa", "marca", "modelo", "tipo", "color", "ano", "serie_motor", "chasis",
+    ),
+    "antecedentes": ("siniestro_id", "descripcion"),
+    "relatos_asegurado": ("siniestro_id", "numero_relato", "texto"),
+    "inspecciones": ("siniestro_id", "numero_inspeccion", "descripcion"),
+    "testigos": ("siniestro_id", "numero_relato", "texto"),
+    "visitas_taller": ("siniestro_id", "descripcion"),
+    "dinamicas_accidente": ("siniestro_id", "descripcion"),
+}
+
+_NOMBRES = (
+    "MARÍA JOSÉ ANA LUCÍA CARLOS ANDRÉS JUAN PABLO LUIS MIGUEL DIEGO SANTIAGO DANIELA GABRIELA "
+    "FERNANDA PATRICIA VERÓNICA JORGE EDUARDO FRANCISCO XAVIER CRISTINA PAOLA ANDREA SEBASTIÁN "
+    "MATEO VALENTINA CAMILA ESTEBAN RICARDO MÓNICA SILVIA ROBERTO MANUEL ANTONIO"
+).split()
+_APELLIDOS = (
+    "ANDRADE BENÍTEZ CEVALLOS CHÁVEZ DÁVILA ESPINOSA FLORES GARCÍA GUERRERO HERRERA JARAMILLO "
+    "LEÓN LÓPEZ MENDOZA MORA NARANJO ORTIZ PAREDES PÉREZ PROAÑO QUINTERO REYES RODRÍGUEZ "
+    "SALAZAR SÁNCHEZ TORRES VACA VALENCIA VILLACÍS YÉPEZ ZAMBRANO CARRIÓN LANDÁZURI MIRANDA"
+).split()
+_DOMINIOS = ("gmail.com", "hotmail.com", "yahoo.com", "outlook.com")
+
+# Nombre, peso relativo (participación de mercado aproximada)
+_COMPANIAS = (
+    ("ZURICH SEGUROS ECUADOR S.A.", 5),
+    ("SEGUROS EQUINOCCIAL S.A.", 4),
+    ("SEGUROS SUCRE S.A.", 3),
+    ("AIG METROPOLITANA CÍA. DE SEGUROS Y REASEGUROS S.A.", 3),
+    ("SEGUROS DEL PICHINCHA S.A.", 3),
+    ("GENERALI ECUADOR COMPAÑÍA DE SEGUROS S.A.", 2),
+    ("MAPFRE ATLAS COMPAÑÍA DE SEGUROS S.A.", 2),
+    ("LIBERTY SEGUROS S.A.", 2),
+    ("ASEGURADORA DEL SUR C.A.", 2),
+    ("SEGUROS ORIENTE S.A.", 1),
+)
+_BENEFICIARIOS = (
+    "BANCO PICHINCHA C.A.", "BANCO GUAYAQUIL S.A.", "BANCO DEL PACÍFICO S.A.", "PRODUBANCO S.A.",
+    "NOVACREDIT S.A.", "ORIGINARSA S.A.", "CFC S.A.", "BANCO BOLIVARIANO C.A.",
+)
+
+_VEHICULOS = (
+    ("CHEVROLET", ("SAIL", "AVEO EMOTION", "D-MAX", "SPARK GT", "TRACKER", "ONIX")),
+    ("KIA", ("RIO", "SPORTAGE", "PICANTO", "SOLUTO", "SELTOS")),
+    ("HYUNDAI", ("ACCENT", "TUCSON", "GRAND I10", "CRETA", "SANTA FE")),
+    ("TOYOTA", ("HILUX", "COROLLA CROSS", "FORTUNER", "YARIS", "RAV4")),
+    ("SUZUKI", ("VITARA", "SWIFT", "GRAND VITARA", "CELERIO")),
+    ("GREAT WALL", ("WINGLE 5", "WINGLE 7", "HAVAL H6")),
+    ("NISSAN", ("SENTRA", "FRONTIER", "KICKS", "VERSA")),
+    ("MAZDA", ("BT-50", "CX-5", "MAZDA 3", "CX-30")),
+    ("RENAULT", ("LOGAN", "DUSTER", "KWID", "SANDERO")),
+    ("FORD", ("RANGER", "EXPLORER", "ESCAPE")),
+)
+_TIPOS_VEHICULO = ("AUTOMÓVIL", "JEEP", "CAMIONETA", "SUV")
+_COLORES = ("BLANCO", "NEGRO", "PLATEADO", "GRIS", "ROJO", "AZUL", "BLANCO PERLA", "VINO")
+
+_TIPOS_RECLAMO = (("CHOQUE", 45), ("ROBO", 20), ("ROBO PARCIAL", 15), ("DAÑOS MATERIALES", 15), ("PÉRDIDA TOTAL", 5))
+_COBERTURAS = (("Todo riesgo", 70), ("Pérdida total", 15), ("Responsabilidad civil", 15))
+_PARENTESCOS = ("Titular", "Cónyuge", "Hijo", "Hija", "Hermano", "Amigo", "Chofer", "Empleado")
+
+# Centro, desviación (grados) en lat/lng, peso, provincias (códigos de cédula), letra de placa, prefijo telefónico
+_CIUDADES = {
+    "Quito": ((-0.1807, -78.4678), (0.06, 0.025), 65, (17,), "P", "02"),
+    "Guayaquil": ((-2.1710, -79.9224), (0.045, 0.03), 35, (9,), "G", "04"),
+}
+_CALLES = {
+    "Quito": (
+        "Av. Amazonas", "Av. 6 de Diciembre", "Av. República de El Salvador", "Av. Naciones Unidas",
+        "Av. Eloy Alfaro", "Av. de los Shyris", "Av. Mariscal Sucre", "Av. Simón Bolívar",
+        "Av. 10 de Agosto", "Av. América", "Juan León Mera", "Av. Patria", "Av. Francisco de Orellana",
+        "Av. Gaspar de Villarroel", "Pradera", "Mariano Aguilera", "Av. La Prensa", "Av. Occidental",
+    ),
+    "Guayaquil": (
+        "Av. 9 de Octubre", "Av. Francisco de Orellana", "Av. Juan Tanca Marengo", "Av. de las Américas",
+        "Av. Carlos Julio Arosemena", "Av. Pedro Menéndez Gilbert", "Chimborazo", "Av. Quito",
+        "Av. del Bombero", "Av. Barcelona", "Av. Benjamín Rosales", "Av. Las Aguas", "Víctor Emilio Estrada",
+    ),
+}
+_SECTORES = {
+    "Quito": (
+        "La Carolina", "Iñaquito", "La Mariscal", "Cumbayá", "Quitumbe", "El Condado", "Carcelén",
+        "Chillogallo", "Tumbaco", "San Rafael", "El Inca", "La Floresta", "Ponceano",
+    ),
+    "Guayaquil": (
+        "Urdesa", "Kennedy", "Alborada", "Sauces", "Samanes", "Los Ceibos", "Centro", "Garzota",
+        "Vía a la Costa", "Mapasingue", "Guasmo", "Martha de Roldós",
+    ),
+}
+_LUGARES = (
+    "Parqueadero", "Centro Comercial", "Gasolinera", "Exteriores del domicilio", "Metroparqueos",
+    "Conjunto habitacional", "Intersección", "Redondel",
+)
+
+_PALABRAS = (
+    "vehículo asegurado conductor parqueadero cerradura puerta ventana calle avenida intersección "
+    "testigo policía denuncia fiscalía taller daño parachoques faro lateral frontal posterior "
+    "madrugada noche tarde mañana domicilio oficina centro comercial semáforo velocidad impacto "
+    "cámara grabación vigilancia guardia recibo factura póliza cobertura deducible reparación "
+    "manifiesta indica declara observa verifica constata revisa confirma señala refiere"
+).split()
+
+
+def _texto(rng: random.Random, palabras: int) -> str:
+    oraciones = []
+    while palabras > 0:
+        n = min(palabras, rng.randint(8, 20))
+        oraciones.append(" ".join(rng.choices(_PALABRAS, k=n)).capitalize() + ".")
+        palabras -= n
+    return " ".join(oraciones)
+
+
+def _lista_json(rng: random.Random, minimo: int, maximo: int) -> str:
+    return json.dumps([_texto(rng, rng.randint(12, 30)) for _ in range(rng.randint(minimo, maximo))], ensure_ascii=False)
+
+
+def digito_cedula(primeros9: str) -> int:
+    """Dígito verificador de cédula ecuatoriana (módulo 10)"""
+    suma = 0
+    for i, digito in enumerate(primeros9):
+        valor = int(digito) * (2 if i % 2 == 0 else 1)
+        suma += valor - 9 if valor > 9 else valor
+    return (10 - suma % 10) % 10
+
+
+def cedula(rng: random.Random, provincias=range(1, 25)) -> str:
+    """Cédula de persona natural con provincia y dígito verificador válidos"""
+    primeros9 = f"{rng.choice(provincias):02d}{rng.randint(0, 5)}{rng.randint(0, 999999):06d}"
+    return primeros9 + str(digito_cedula(primeros9))
+
+
+def ruc_sociedad(rng: random.Random, provincias=range(1, 25)) -> str:
+    """RUC de sociedad privada (tercer dígito 9, módulo 11)"""
+    while True:
+        primeros9 = f"{rng.choice(provincias):02d}9{rng.randint(0, 999999):06d}"
+        suma = sum(int(d) * c for d, c in zip(primeros9, (4, 3, 2, 7, 6, 5, 4, 3, 2)))
+        verificador = 11 - suma % 11
+        if verificador == 10:
+            continue
+        return primeros9 + str(0 if verificador == 11 else verificador) + "001"
+
+
+def placa(rng: random.Random, letra_provincia: str) -> str:
+    """Placa con el formato vigente: letra de provincia, dos letras, guion y cuatro dígitos"""
+    letras = "ABCDEFGHIJKLMNOPRSTUVWXYZ"
+    return f"{letra_provincia}{rng.choice(letras)}{rng.choice(letras)}-{rng.randint(1, 9999):04d}"
+
+
+def _alfanumerico(rng: random.Random, longitud: int) -> str:
+    return "".join(rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ0123456789") for _ in range(longitud))
+
+
+def _nombre_persona(rng: random.Random) -> str:
+    return f"{rng.choice(_APELLIDOS)} {rng.choice(_APELLIDOS)} {rng.choice(_NOMBRES)} {rng.choice(_NOMBRES)}"
+
+
+def _correo(rng: random.Random, nombre: str) -> str:
+    partes = nombre.lower().translate(str.maketrans("áéíóúñ", "aeioun")).split()
+    return f"{partes[2]}.{partes[0]}{rng.randint(1, 999)}@{rng.choice(_DOMINIOS)}"
+
+
+def _direccion(rng: random.Random, ciudad: str) -> str:
+    calle, transversal = rng.sample(_CALLES[ciudad], 2)
+    if ciudad == "Quito":
+        numero = f"{rng.choice('NSEO')}{rng.randint(1, 80)}-{rng.randint(10, 300)}"
+        return f"{calle} {numero} y {transversal}, {rng.choice(_SECTORES[ciudad])}, Quito"
+    return f"{calle} y {transversal}, {rng.choice(_SECTORES[ciudad])}, Guayaquil"
+
+
+def _ruc_companias() -> Dict[str, str]:
+    rng = random.Random("companias")
+    return {nombre: ruc_sociedad(rng, (17, 9)) for nombre, _ in _COMPANIAS}
+
+
+_RUC_COMPANIAS = _ruc_companias()
+
+
+def generar_filas(semilla: int, indice_lote: int, primer_id: int, cantidad: int,
+                  tasa_duplicados: float = SYNTHETIC_DUPLICATE_RATE,
+                  referencia: datetime = _FECHA_REFERENCIA) -> Dict[str, List[tuple]]:
+    """
+    Filas de un lote por tabla (en el orden de COLUMNAS), para los siniestros con
+    ids primer_id .. primer_id + cantidad - 1. Depende solo de la semilla, el
+    índice del lote, la cantidad y la fecha de referencia, no de los ids
+    asignados ni del reloj.
+    """
+    rng = random.Random(f"{semilla}:{indice_lote}")
+    filas = {tabla: [] for tabla in COLUMNAS}
+    recientes = deque(maxlen=500)
+    ciudades = list(_CIUDADES)
+    pesos_ciudad = [_CIUDADES[c][2] for c in ciudades]
+
+    for siniestro_id in range(primer_id, primer_id + cantidad):
+        ciudad = rng.choices(ciudades, pesos_ciudad)[0]
+        (lat0, lng0), (sd_lat, sd_lng), _, provincias, letra, prefijo_tel = _CIUDADES[ciudad]
+
+        identidad = {
+            "placa": placa(rng, letra),
+            "chasis": _alfanumerico(rng, 17),
+            "serie_motor": _alfanumerico(rng, 10),
+            "cedula_asegurado": cedula(rng, provincias),
+            "cedula_conductor": cedula(rng, provincias),
+            "direccion": f"{rng.choice(_LUGARES)} {_direccion(rng, ciudad)}",
+            "lat": round(rng.gauss(lat0, sd_lat), 6),
+            "lng": round(rng.gauss(lng0, sd_lng), 6),
+        }
+        # Coincidencias con un siniestro reciente para la detección de fraude
+        if recientes and rng.random() < tasa_duplicados:
+            anterior = rng.choice(recientes)
+            campo = rng.choice(("placa", "cedula_conductor", "cedula_asegurado", "direccion", "ubicacion"))
+            if campo == "placa":
+                identidad.update(placa=anterior["placa"], chasis=anterior["chasis"], serie_motor=anterior["serie_motor"])
+            elif campo == "ubicacion":
+                identidad.update(lat=anterior["lat"] + rng.uniform(-0.0005, 0.0005),
+                                 lng=anterior["lng"] + rng.uniform(-0.0005, 0.0005))
+            else:
+                identidad[campo] = anterior[campo]
+        recientes.append(identidad)
+
+        fecha = _FECHA_INICIO + timedelta(seconds=rng.randrange(_RANGO_SEGUNDOS))
+        fecha_reportado = fecha + timedelta(hours=rng.randint(1, 240))
+        fecha_designacion = fecha_reportado + timedelta(days=rng.randint(1, 20))
+        actualizado = min(referencia, fecha_designacion + timedelta(days=rng.randint(0, 60)))
+        compania = rng.choices([c for c, _ in _COMPANIAS], [p for _, p in _COMPANIAS])[0]
+
+        juridica = rng.random() < 0.2
+        nombre_asegurado = _nombre_persona(rng)
+        conductor_es_asegurado = not juridica and rng.random() < 0.6
+        nombre_conductor = nombre_asegurado if conductor_es_asegurado else _nombre_persona(rng)
+        if conductor_es_asegurado:
+            identidad["cedula_conductor"] = identidad["cedula_asegurado"]
+        declara_asegurado = not juridica and rng.random() < 0.7
+
+        filas["siniestros"].append((
+            siniestro_id, compania, _RUC_COMPANIAS[compania],
+            rng.choices([t for t, _ in _TIPOS_RECLAMO], [p for _, p in _TIPOS_RECLAMO])[0],
+            str(rng.randint(1000, 999999)),
+            f"{fecha.year % 100:02d}-{fecha.month:02d}-VH-{7000000 + siniestro_id}",
+            fecha, identidad["direccion"], clave_direccion(identidad["direccion"]),
+            identidad["lat"], identidad["lng"], geohash.encode(identidad["lat"], identidad["lng"]),
+            rng.random() < 0.3, _nombre_persona(rng), fecha_designacion, "Vehicular", fecha_reportado,
+            rng.choices([c for c, _ in _COBERTURAS], [p for _, p in _COBERTURAS])[0],
+            fecha + timedelta(hours=rng.randint(1, 72)),
+            "asegurado" if declara_asegurado else "conductor",
+            identidad["cedula_asegurado"] if declara_asegurado else identidad["cedula_conductor"],
+            nombre_asegurado if declara_asegurado else nombre_conductor,
+            "Propietario del vehículo" if declara_asegurado else rng.choice(_PARENTESCOS),
+            _texto(rng, rng.randint(30, 80)), _texto(rng, rng.randint(20, 60)), _texto(rng, rng.randint(20, 60)),
+            _lista_json(rng, 1, 5), _lista_json(rng, 1, 2), _lista_json(rng, 1, 4), _lista_json(rng, 0, 3),
+            fecha_designacion, actualizado,
+        ))
+
+        if juridica:
+            empresa = f"{rng.choice(_APELLIDOS)} {rng.choice(('& ASOCIADOS', 'HERMANOS', 'CORP'))} S.A."
+            filas["asegurados"].append((
+                siniestro_id, "Jurídica", None, None, None, _direccion(rng, ciudad), None,
+                ruc_sociedad(rng, provincias), empresa, nombre_asegurado,
+                f"{prefijo_tel}{rng.randint(2000000, 6999999)}",
+            ))
+        else:
+            filas["asegurados"].append((
+                siniestro_id, "Natural", identidad["cedula_asegurado"], nombre_asegurado,
+                f"09{rng.randint(0, 99999999):08d}", _direccion(rng, ciudad),
+                _correo(rng, nombre_asegurado), None, None, None,
+                f"{prefijo_tel}{rng.randint(2000000, 6999999)}" if rng.random() < 0.4 else None,
+            ))
+        if rng.random() < 0.5:
+            filas["beneficiarios"].append((
+                siniestro_id, rng.choice(_BENEFICIARIOS), ruc_sociedad(rng, provincias), _direccion(rng, ciudad),
+            ))
+        filas["conductores"].append((
+            siniestro_id, nombre_conductor, identidad["cedula_conductor"], f"09{rng.randint(0, 99999999):08d}",
+            _direccion(rng, ciudad), "Titular" if conductor_es_asegurado else rng.choice(_PARENTESCOS),
+        ))
+        marca, modelos = rng.choice(_VEHICULOS)
+        filas["objetos_asegurados"].append((
+            siniestro_id, identidad["placa"], marca, rng.choice(modelos), rng.choice(_TIPOS_VEHICULO),
+            rng.choice(_COLORES), rng.randint(2008, 2025), identidad["serie_motor"], identidad["chasis"],
+        ))
+
+        for _ in range(rng.randint(0, 2)):
+            filas["antecedentes"].append((siniestro_id, _texto(rng, rng.randint(20, 60))))
+        for numero in range(1, rng.randint(1, 3) + 1):
+            filas["relatos_asegurado"].append((siniestro_id, numero, _texto(rng, rng.randint(60, 200))))
+        for numero in range(1, rng.randint(0, 3) + 1):
+            filas["inspecciones"].append((siniestro_id, numero, _texto(rng, rng.randint(30, 100))))
+        for numero in range(1, rng.randint(0, 2) + 1):
+            filas["testigos"].append((siniestro_id, numero, _texto(rng, rng.randint(40, 120))))
+        if rng.random() < 0.5:
+            filas["visitas_taller"].append((siniestro_id, _texto(rng, rng.randint(30, 80))))
+        if rng.random() < 0.7:
+            filas["dinamicas_accidente"].append((siniestro_id, _texto(rng, rng.randint(30, 80))))
+
+    return filas
+
+
+def _valor_copy(valor):
+    if valor is None:
+        return "\\N"
+    if isinstance(valor, bool):
+        return "t" if valor else "f"
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+def copiar_filas(cursor, tabla: str, columnas, filas: List[tuple]):
+    """COPY ... FROM STDIN en formato CSV (\\N = NULL) con un cursor psycopg2"""
+    if not filas:
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for fila in filas:
+        writer.writerow([_valor_copy(valor) for valor in fila])
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+    )
+
+
+def escribir_lote(engine, semilla: int, indice_lote: int, primer_id: int, cantidad: int,
+                  tasa_duplicados: float = SYNTHETIC_DUPLICATE_RATE,
+                  referencia: datetime = _FECHA_REFERENCIA) -> int:
+    """Genera y copia un lote completo en una sola transacción"""
+    filas = generar_filas(semilla, indice_lote, primer_id, cantidad, tasa_duplicados, referencia)
+    conexion = engine.raw_connection()
+    try:
+        cursor = conexion.cursor()
+        for tabla, columnas in COLUMNAS.items():
+            copiar_filas(cursor, tabla, columnas, filas[tabla])
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    finally:
+        conexion.close()
+    return cantidad
+
+
+_engine_proceso = None
+
+
+def _iniciar_proceso(database_url: str):
+    global _engine_proceso
+    _engine_proceso = sa.create_engine(database_url, poolclass=NullPool)
+
+
+def _ejecutar_tarea(tarea: tuple) -> int:
+    return escribir_lote(_engine_proceso, *tarea)
+
+
+def reservar_ids(engine, cantidad: int) -> int:
+    """
+    Reserva un rango de ids de siniestros avanzando la secuencia, de modo que las
+    altas normales concurrentes no choquen con los ids generados. Retorna el primero.
+
+    nextval y setval no son atómicos juntos: el bloqueo SHARE ROW EXCLUSIVE
+    espera a los INSERT en curso y detiene los nuevos (y otras reservas) hasta el
+    commit, así nadie toma un id de la secuencia entre ambas llamadas.
+    """
+    with engine.begin() as conn:
+        conn.execute(sa.text("LOCK TABLE siniestros IN SHARE ROW EXCLUSIVE MODE"))
+        secuencia = conn.execute(sa.text("SELECT pg_get_serial_sequence('siniestros', 'id')")).scalar()
+        maximo = conn.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM siniestros")).scalar()
+        primer_id = max(conn.execute(sa.text(f"SELECT nextval('{secuencia}')")).scalar(), maximo + 1)
+        conn.execute(sa.text("SELECT setval(:secuencia, :valor)"),
+                     {"secuencia": secuencia, "valor": primer_id + cantidad - 1})
+    return primer_id
+
+
+def generar_siniestros(database_url: str, total: int, semilla: int = 0, procesos: Optional[int] = None,
+                       tamano_lote: int = SYNTHETIC_BATCH_SIZE,
+                       tasa_duplicados: float = SYNTHETIC_DUPLICATE_RATE,
+                       referencia: datetime = _FECHA_REFERENCIA) -> range:
+    """
+    Genera `total` siniestros con sus entidades y retorna el rango de ids creados.
+    Con procesos > 1 los lotes se escriben en paralelo (multiprocessing); con 1 se
+    escriben en el proceso actual (uso desde la API). `referencia` es la fecha de
+    corte de los datos (ninguna fecha de actualización la supera).
+    """
+    procesos = procesos or os.cpu_count() or 1
+    engine = sa.create_engine(database_url, poolclass=NullPool)
+    primer_id = reservar_ids(engine, total)
+    tareas = [
+        (semilla, indice, primer_id + desde, min(tamano_lote, total - desde), tasa_duplicados, referencia)
+        for indice, desde in enumerate(range(0, total, tamano_lote))
+    ]
+
+    logger.info(f"🏭 Generando {total} siniestros sintéticos en {len(tareas)} lotes con {procesos} procesos")
+    inicio = time.perf_counter()
+    escritos = 0
+    siguiente_reporte = 0.1
+    if procesos == 1 or len(tareas) == 1:
+        resultados = (escribir_lote(engine, *tarea) for tarea in tareas)
+        pool = None
+    else:
+        pool = multiprocessing.get_context("spawn").Pool(
+            min(procesos, len(tareas)), initializer=_iniciar_proceso, initargs=(database_url,)
+        )
+        resultados = pool.imap_unordered(_ejecutar_tarea, tareas)
+    try:
+        for cantidad in resultados:
+            escritos += cantidad
+            if escritos / total >= siguiente_reporte:
+                velocidad = escritos / (time.perf_counter() - inicio)
+                logger.info(f"  📦 {escritos}/{total} siniestros ({velocidad:,.0f}/s)")
+                siguiente_reporte += 0.1
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    _post_carga(engine)
+    engine.dispose()
+    logger.info(f"✅ {total} siniestros sintéticos generados en {time.perf_counter() - inicio:.1f}s")
+    return range(primer_id, primer_id + total)
+
+
+def _post_carga(engine):
+    """Estadísticas pre-agregadas y del planificador tras la carga masiva"""
+    from app.services.statistics_service import reconstruir_estadisticas
+
+    with Session(engine) as db:
+        reconstruir_estadisticas(db)
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        for tabla in COLUMNAS:
+            conn.execute(sa.text(f"ANALYZE {tabla}"))
@@ -0,0 +1,105 @@
+"""
+Serialización rápida de respuestas a partir de objetos ORM
+
+El camino estándar (model_validate con from_attributes y luego model_dump_json)
+valida otra vez cada campo de datos que ya vienen tipados de la base. Para las
+respuestas de solo lectura se compila, una vez por schema, un "plan" con los
+campos del modelo Pydantic: el plan lee los atributos del objeto ORM, recorre
+las relaciones anidadas (modelos y listas de modelos) y arma dicts que orjson
+serializa directamente. La salida es el mismo JSON que produce Pydantic
+(mismos campos, mismo orden, fechas ISO 8601 con "Z" en UTC).
+
+Solo para datos confiables (filas leídas de la base): no aplica validaciones
+ni conversiones. Sin orjson instalado, o con FAST_SERIALIZATION=false, se usa
+el camino de Pydantic.
+"""
+import os
+import typing
+from functools import lru_cache
+from typing import Any, Iterable, List, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+FAST_SERIALIZATION = os.getenv("FAST_SERIALIZATION", "true").lower() == "true"
+
+# Tipos de campo del plan
+_VALOR, _MODELO, _LISTA_MODELOS = 0, 1, 2
+
+
+def enabled() -> bool:
+    return FAST_SERIALIZATION and ORJSON_AVAILABLE
+
+
+def _submodelo(anotacion) -> Tuple[int, Any]:
+    """Clasifica la anotación de un campo: valor simple, modelo anidado o lista de modelos"""
+    if isinstance(anotacion, type) and issubclass(anotacion, BaseModel):
+        return _MODELO, anotacion
+    origen = typing.get_origin(anotacion)
+    argumentos = [a for a in typing.get_args(anotacion) if a is not type(None)]
+    if origen is typing.Union and len(argumentos) == 1:
+        return _submodelo(argumentos[0])
+    if origen in (list, List) and argumentos:
+        tipo, modelo = _submodelo(argumentos[0])
+        if tipo == _MODELO:
+            return _LISTA_MODELOS, modelo
+    return _VALOR, None
+
+
+@lru_cache(maxsize=None)
+def _plan(model: Type[BaseModel]) -> tuple:
+    """(nombre, tipo, plan anidado) por campo, en el orden de declaración del schema"""
+    campos = []
+    for nombre, info in model.model_fields.items():
+        tipo, submodelo = _submodelo(info.annotation)
+        campos.append((nombre, tipo, _plan(submodelo) if submodelo else None))
+    return tuple(campos)
+
+
+def _a_dict(obj, plan: tuple) -> dict:
+    datos = {}
+    for nombre, tipo, subplan in plan:
+        valor = getattr(obj, nombre, None)
+        if valor is None or tipo == _VALOR:
+            datos[nombre] = valor
+        elif tipo == _MODELO:
+            datos[nombre] = _a_dict(valor, subplan)
+        else:
+            datos[nombre] = [_a_dict(item, subplan) for item in valor]
+    return datos
+
+
+def to_dict(obj, model: Type[BaseModel]) -> dict:
+    """Dict listo para orjson con los campos de `model` leídos del objeto ORM (sin validar)"""
+    return _a_dict(obj, _plan(model))
+
+
+def dumps(value) -> bytes:
+    """orjson con las mismas convenciones de fechas que Pydantic"""
+    return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+
+
+def dump_model(obj, model: Type[BaseModel]) -> bytes:
+    """JSON de un objeto ORM según el schema de respuesta `model`"""
+    if enabled():
+        return dumps(_a_dict(obj, _plan(model)))
+    return model.model_validate(obj).model_dump_json().encode()
+
+
+@lru_cache(maxsize=None)
+def _adaptador_lista(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def dump_models(objs: Iterable, model: Type[BaseModel]) -> bytes:
+    """JSON de una lista de objetos ORM según el schema de respuesta `model`"""
+    if enabled():
+        plan = _plan(model)
+        return dumps([_a_dict(obj, plan) for obj in objs])
+    return _adaptador_lista(model).dump_json([model.model_validate(obj) for obj in objs])
@@ -0,0 +1,117 @@
+"""
+Codificación geohash para indexar puntos geográficos con un B-tree
+
+Un geohash es una cadena base32 donde cada carácter adicional subdivide la
+celda anterior, de modo que los puntos cercanos comparten prefijo y una
+búsqueda por prefijo se resuelve como un rango sobre el índice.
+"""
+import math
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+PRECISION_MAXIMA = 12
+
+
+def encode(lat: float, lng: float, precision: int = PRECISION_MAXIMA) -> str:
+    """Geohash del punto con la precisión (número de caracteres) indicada"""
+    lat_min, lat_max = -90.0, 90.0
+    lng_min, lng_max = -180.0, 180.0
+    resultado = []
+    bits = 0
+    valor = 0
+    par = True
+
+    while len(resultado) < precision:
+        if par:
+            medio = (lng_min + lng_max) / 2
+            if lng >= medio:
+                valor = (valor << 1) | 1
+                lng_min = medio
+            else:
+                valor <<= 1
+                lng_max = medio
+        else:
+            medio = (lat_min + lat_max) / 2
+            if lat >= medio:
+                valor = (valor << 1) | 1
+                lat_min = medio
+            else:
+                valor <<= 1
+                lat_max = medio
+        par = not par
+        bits += 1
+        if bits == 5:
+            resultado.append(_BASE32[valor])
+            bits = 0
+            valor = 0
+
+    return "".join(resultado)
+
+
+def bounds(geohash: str) -> tuple:
+    """Límites (lat_min, lng_min, lat_max, lng_max) de la celda"""
+    lat_min, lat_max = -90.0, 90.0
+    lng_min, lng_max = -180.0, 180.0
+    par = True
+
+    for caracter in geohash:
+        valor = _DECODE[caracter]
+        for desplazamiento in range(4, -1, -1):
+            bit = (valor >> desplazamiento) & 1
+            if par:
+                medio = (lng_min + lng_max) / 2
+                if bit:
+                    lng_min = medio
+                else:
+                    lng_max = medio
+            else:
+                medio = (lat_min + lat_max) / 2
+                if bit:
+                    lat_min = medio
+                else:
+                    lat_max = medio
+            par = not par
+
+    return lat_min, lng_min, lat_max, lng_max
+
+
+def dimensiones_celda(precision: int) -> tuple:
+    """Alto y ancho en grados de una celda de la precisión indicada"""
+    bits = precision * 5
+    bits_lng = math.ceil(bits / 2)
+    bits_lat = bits // 2
+    return 180.0 / (2 ** bits_lat), 360.0 / (2 ** bits_lng)
+
+
+def precision_para_radio(metros: float, lat: float = 0.0) -> int:
+    """Mayor precisión cuya celda cubre el radio, para que basten la celda y sus 8 vecinas"""
+    metros_por_grado_lat = 111_320.0
+    metros_por_grado_lng = metros_por_grado_lat * max(math.cos(math.radians(lat)), 0.01)
+    for precision in range(PRECISION_MAXIMA, 0, -1):
+        alto, ancho = dimensiones_celda(precision)
+        if alto * metros_por_grado_lat >= metros and ancho * metros_por_grado_lng >= metros:
+            return precision
+    return 1
+
+
+def vecinos(geohash: str) -> list:
+    """La celda y sus 8 vecinas (se omiten las que cruzan los polos)"""
+    lat_min, lng_min, lat_max, lng_max = bounds(geohash)
+    alto = lat_max - lat_min
+    ancho = lng_max - lng_min
+    lat_centro = (lat_min + lat_max) / 2
+    lng_centro = (lng_min + lng_max) / 2
+    precision = len(geohash)
+
+    celdas = []
+    for dlat in (-1, 0, 1):
+        for dlng in (-1, 0, 1):
+            lat = lat_centro + dlat * alto
+            if lat < -90 or lat > 90:
+                continue
+            lng = (lng_centro + dlng * ancho + 180) % 360 - 180
+            celda = encode(lat, lng, precision)
+            if celda not in celdas:
+                celdas.append(celda)
+    return celdas
@@ -0,0 +1,220 @@
+"""
+Métricas en formato Prometheus (/metrics)
+
+Contadores, histogramas y gauges de prometheus_client. Con varios workers de
+uvicorn (o el worker de PDF en la misma máquina) hay que definir
+PROMETHEUS_MULTIPROC_DIR con un directorio vacío ANTES de arrancar los
+procesos: cada proceso escribe sus valores en archivos mmap de ese directorio
+(sin locks entre procesos) y /metrics los agrega al responder. Sin la variable,
+cada proceso expone solo sus propias métricas.
+
+    rm -rf /tmp/metricas && mkdir -p /tmp/metricas
+    PROMETHEUS_MULTIPROC_DIR=/tmp/metricas uvicorn app.main:app --workers 4
+
+Si prometheus_client no está instalado, las métricas son no-ops y /metrics
+responde 501.
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+METRICS_ENABLED = METRICS_AVAILABLE and os.getenv("METRICS_ENABLED", "true").lower() == "true"
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+# Intervalo del muestreo de latencia del event loop
+LOOP_LAG_INTERVAL_SECONDS = float(os.getenv("LOOP_LAG_INTERVAL_SECONDS", "0.5"))
+
+
+class _NoOp:
+    """Sustituto cuando las métricas están desactivadas"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, *args, **kwargs):
+        pass
+
+    def dec(self, *args, **kwargs):
+        pass
+
+    def set(self, *args, **kwargs):
+        pass
+
+    def observe(self, *args, **kwargs):
+        pass
+
+    def time(self):
+        return nullcontext()
+
+
+if METRICS_ENABLED:
+    HTTP_REQUESTS = Counter(
+        "http_requests_total", "Requests HTTP atendidos", ["method", "route", "status"]
+    )
+    HTTP_DURATION = Histogram(
+        "http_request_duration_seconds", "Duración de los requests HTTP", ["method", "route"],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    )
+    HTTP_IN_PROGRESS = Gauge(
+        "http_requests_in_progress", "Requests HTTP en curso", multiprocess_mode="livesum"
+    )
+    DB_POOL_CHECKED_OUT = Gauge(
+        "db_pool_checked_out", "Conexiones del pool en uso", multiprocess_mode="livesum"
+    )
+    DB_POOL_OPEN = Gauge(
+        "db_pool_connections_open", "Conexiones abiertas por el pool", multiprocess_mode="livesum"
+    )
+    PDF_RENDER_SECONDS = Histogram(
+        "pdf_render_seconds", "Duración del render del informe PDF",
+        buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60),
+    )
+    PDF_SIGN_SECONDS = Histogram(
+        "pdf_sign_seconds", "Duración de la firma digital del informe",
+        buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+    )
+    PDF_STORE_LOOKUPS = Counter(
+        "pdf_store_lookups_total", "Búsquedas en el almacén de informes", ["variant", "result"]
+    )
+    CERT_CACHE = Counter(
+        "cert_cache_total", "Accesos a la caché del certificado de firma", ["result"]
+    )
+    S3_REQUESTS = Counter(
+        "s3_requests_total", "Llamadas a S3 (status = ok o código de error)", ["operation", "status"]
+    )
+    S3_DURATION = Histogram(
+        "s3_request_duration_seconds", "Duración de las llamadas a S3", ["operation"],
+        buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    )
+    S3_UPLOAD_BYTES = Counter(
+        "s3_upload_bytes_total", "Bytes enviados a S3", ["operation"]
+    )
+    RESPONSE_CACHE = Counter(
+        "response_cache_total", "Respuestas JSON en caché (hit, miss, not_modified)", ["result"]
+    )
+    LOOP_LAG = Gauge(
+        "event_loop_lag_seconds", "Último retraso medido del event loop", multiprocess_mode="livemax"
+    )
+    LOOP_LAG_HISTOGRAM = Histogram(
+        "event_loop_lag_histogram_seconds", "Retrasos del event loop",
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    )
+else:
+    HTTP_REQUESTS = HTTP_DURATION = HTTP_IN_PROGRESS = _NoOp()
+    DB_POOL_CHECKED_OUT = DB_POOL_OPEN = _NoOp()
+    PDF_RENDER_SECONDS = PDF_SIGN_SECONDS = PDF_STORE_LOOKUPS = CERT_CACHE = _NoOp()
+    S3_REQUESTS = S3_DURATION = S3_UPLOAD_BYTES = _NoOp()
+    RESPONSE_CACHE = _NoOp()
+    LOOP_LAG = LOOP_LAG_HISTOGRAM = _NoOp()
+
+
+def render_latest() -> bytes:
+    """Exposición de texto de Prometheus (agregada entre procesos si hay directorio multiproceso)"""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+def mark_process_dead():
+    """Descarta los gauges 'live' de este proceso al terminar (modo multiproceso)"""
+    if METRICS_ENABLED and MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def instrument_pool(engine):
+    """Conexiones abiertas y en uso del pool, mantenidas con eventos del pool"""
+    if not METRICS_ENABLED:
+        return
+    from sqlalchemy import event
+
+    event.listen(engine, "connect", lambda *args: DB_POOL_OPEN.inc())
+    event.listen(engine, "close", lambda *args: DB_POOL_OPEN.dec())
+    event.listen(engine, "checkout", lambda *args: DB_POOL_CHECKED_OUT.inc())
+    event.listen(engine, "checkin", lambda *args: DB_POOL_CHECKED_OUT.dec())
+    # Conexión sacada del pool (p. ej. la de LISTEN): nunca vuelve con checkin y,
+    # al cerrarse, emite close_detached en lugar de close
+    event.listen(engine, "detach", lambda *args: DB_POOL_CHECKED_OUT.dec())
+    event.listen(engine, "close_detached", lambda *args: DB_POOL_OPEN.dec())
+
+
+def _body_size(body) -> int:
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    if hasattr(body, "seek") and hasattr(body, "tell"):
+        try:
+            posicion = body.tell()
+            fin = body.seek(0, os.SEEK_END)
+            body.seek(posicion)
+            return fin - posicion
+        except (OSError, ValueError):
+            return 0
+    return 0
+
+
+def _s3_before_call(model, params, context, **kwargs):
+    context["metrics_start"] = time.perf_counter()
+    context["metrics_operation"] = model.name
+    if "body" in params:
+        S3_UPLOAD_BYTES.labels(model.name).inc(_body_size(params["body"]))
+
+
+def _s3_after_call(model, http_response, parsed, context, **kwargs):
+    context.pop("metrics_operation", None)
+    inicio = context.pop("metrics_start", None)
+    if inicio is not None:
+        S3_DURATION.labels(model.name).observe(time.perf_counter() - inicio)
+    if http_response.status_code >= 300:
+        status = (parsed or {}).get("Error", {}).get("Code") or str(http_response.status_code)
+    else:
+        status = "ok"
+    S3_REQUESTS.labels(model.name, status).inc()
+
+
+def _s3_after_call_error(exception, context, **kwargs):
+    # Errores de red o de la solicitud (sin respuesta HTTP); este evento no recibe el modelo
+    inicio = context.pop("metrics_start", None)
+    operacion = context.pop("metrics_operation", "desconocida")
+    if inicio is not None:
+        S3_DURATION.labels(operacion).observe(time.perf_counter() - inicio)
+    S3_REQUESTS.labels(operacion, type(exception).__name__).inc()
+
+
+def instrument_s3_client(client):
+    """Latencia, bytes enviados y errores de todas las operaciones del cliente boto3"""
+    if not METRICS_ENABLED:
+        return client
+    eventos = client.meta.events
+    eventos.register("before-call.s3", _s3_before_call)
+    eventos.register("after-call.s3", _s3_after_call)
+    eventos.register("after-call-error.s3", _s3_after_call_error)
+    return client
+
+
+async def monitor_loop_lag(interval: float = LOOP_LAG_INTERVAL_SECONDS):
+    """Mide cuánto se atrasa un sleep del event loop (tiempo bloqueado por código síncrono)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        esperado = loop.time() + interval
+        await asyncio.sleep(interval)
+        retraso = max(0.0, loop.time() - esperado)
+        LOOP_LAG.set(retraso)
+        LOOP_LAG_HISTOGRAM.observe(retraso)
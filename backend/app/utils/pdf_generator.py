@@ -1,15 +1,20 @@
-import io
 import logging
 import os
+import threading
+import time
 from datetime import datetime
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER
+from typing import BinaryIO, Callable, Optional, Tuple
 from sqlalchemy.orm import Session
 from ..models import Siniestro
+from ..services import pdf_store
+from ..services.pdf_store import VARIANT_SIGNED, VARIANT_UNSIGNED
+from . import metrics
+from .report_engine import (
+    ClaimSnapshot,
+    RenderContext,
+    render_error_pdf,
+    render_report,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +28,18 @@ except ImportError as e:
     logger.warning(f"⚠️ Bibliotecas de criptografía no disponibles: {e}")
 
 
+class IncompleteReportError(RuntimeError):
+    """El render omitió secciones o imágenes: no se guarda ni se firma"""
+
+
+# Certificado local (tiene prioridad sobre S3) y vigencia de la caché en memoria
+CERT_LOCAL_PATH = os.getenv("CERT_LOCAL_PATH", "")
+CERT_CACHE_TTL_SECONDS = int(os.getenv("CERT_CACHE_TTL_SECONDS", "3600"))
+
+_cert_cache = {"data": None, "password": None, "loaded_at": 0.0}
+_cert_lock = threading.Lock()
+
+
 def load_certificate_from_s3(cert_key: str = "certificates/maria_susana_espinosa_lozada.p12") -> tuple[bytes, str]:
     """Cargar certificado desde S3 y retornar datos + contraseña"""
     try:
@@ -44,48 +61,51 @@ def load_certificate_from_s3(cert_key: str = "certificates/maria_susana_espinosa
         return None, None
 
 
-def sign_pdf(pdf_data: bytes, certificate_data: bytes = None, password: str = None) -> bytes:
-    """Firmar PDF digitalmente usando certificado P12"""
-    try:
-        logger.info("🔐 Firmando PDF con certificado digital")
-
-        # Usar datos del certificado proporcionados
-        p12_data = certificate_data
-
-        # Extraer clave privada y certificado
-        from cryptography.hazmat.primitives.serialization import pkcs12
+def create_signature(pdf_data: bytes, certificate_data: bytes, password: str = None) -> bytes:
+    """
+    Firma CMS del PDF como actualización incremental: el resultado (firma y
+    xref nueva) se agrega al final del PDF original sin reescribirlo.
+    """
+    # Extraer clave privada y certificado
+    from cryptography.hazmat.primitives.serialization import pkcs12
 
-        private_key, certificate, additional_certificates = (
-            pkcs12.load_key_and_certificates(
-                p12_data, password.encode() if password else None
-            )
+    private_key, certificate, additional_certificates = (
+        pkcs12.load_key_and_certificates(
+            certificate_data, password.encode() if password else None
         )
+    )
+
+    # Preparar datos para firma
+    date = datetime.now().strftime("D:%Y%m%d%H%M%S+00'00'")
+    dct = {
+        "aligned": 0,
+        "sigflags": 3,
+        "sigflagsft": 132,
+        "sigpage": 0,
+        "sigbutton": True,
+        "sigfield": "Signature1",
+        "auto_sigfield": True,
+        "sigandcertify": True,
+        "signaturebox": (470, 840, 570, 640),
+        "signature": "Documento firmado electrónicamente",
+        "contact": "sistema@siniestros.com",
+        "location": "Quito, Ecuador",
+        "signingdate": date,
+        "reason": "Firma digital de informe de siniestro",
+        "password": password or "",
+    }
+
+    return cms.sign(
+        pdf_data, dct, private_key, certificate, additional_certificates or []
+    )
 
-        # Preparar datos para firma
-        date = datetime.now().strftime("D:%Y%m%d%H%M%S+00'00'")
-        dct = {
-            "aligned": 0,
-            "sigflags": 3,
-            "sigflagsft": 132,
-            "sigpage": 0,
-            "sigbutton": True,
-            "sigfield": "Signature1",
-            "auto_sigfield": True,
-            "sigandcertify": True,
-            "signaturebox": (470, 840, 570, 640),
-            "signature": "Documento firmado electrónicamente",
-            "contact": "sistema@siniestros.com",
-            "location": "Quito, Ecuador",
-            "signingdate": date,
-            "reason": "Firma digital de informe de siniestro",
-            "password": password or "",
-        }
-
-        # Crear firma
-        signed_pdf = cms.sign(
-            pdf_data, dct, private_key, certificate, additional_certificates or []
-        )
 
+def sign_pdf(pdf_data: bytes, certificate_data: bytes = None, password: str = None) -> bytes:
+    """Firmar PDF digitalmente usando certificado P12"""
+    try:
+        logger.info("🔐 Firmando PDF con certificado digital")
+        with metrics.PDF_SIGN_SECONDS.time():
+            signed_pdf = pdf_data + create_signature(pdf_data, certificate_data, password)
         logger.info(f"✅ PDF firmado exitosamente: {len(signed_pdf)} bytes")
         return signed_pdf
 
@@ -95,262 +115,202 @@ def sign_pdf(pdf_data: bytes, certificate_data: bytes = None, password: str = No
         return pdf_data
 
 
-def generate_simple_pdf(siniestro: Siniestro) -> bytes:
-    """Generar PDF simple y básico del siniestro"""
-    logger.info(f"🔄 Generando PDF para siniestro ID: {siniestro.id}")
+def load_certificate() -> tuple[bytes, str]:
+    """
+    Certificado de firma con caché en memoria por CERT_CACHE_TTL_SECONDS.
+    Usa CERT_LOCAL_PATH si está configurado; si no, lo descarga de S3.
+    """
+    with _cert_lock:
+        if _cert_cache["data"] and time.monotonic() - _cert_cache["loaded_at"] < CERT_CACHE_TTL_SECONDS:
+            metrics.CERT_CACHE.labels("hit").inc()
+            return _cert_cache["data"], _cert_cache["password"]
+
+        if CERT_LOCAL_PATH:
+            try:
+                with open(CERT_LOCAL_PATH, "rb") as f:
+                    cert_data = f.read()
+                password = os.getenv("CERT_PASSWORD", "")
+                logger.info(f"✅ Certificado cargado desde {CERT_LOCAL_PATH}: {len(cert_data)} bytes")
+            except OSError as e:
+                logger.warning(f"❌ No se pudo leer el certificado local: {e}")
+                cert_data, password = None, None
+        else:
+            cert_data, password = load_certificate_from_s3()
 
+        # Los fallos no se guardan en caché: se reintenta en la siguiente firma
+        if cert_data:
+            _cert_cache.update(data=cert_data, password=password, loaded_at=time.monotonic())
+        metrics.CERT_CACHE.labels("miss" if cert_data else "error").inc()
+        return cert_data, password
+
+
+def _render_context(snapshot: ClaimSnapshot) -> RenderContext:
+    """Contexto de render con las imágenes de evidencia ya descargadas y reducidas"""
+    from ..services.image_prefetch import prefetch_images
+
+    return RenderContext(images=prefetch_images(snapshot.image_urls))
+
+
+def _validate_pdf(pdf_file: BinaryIO):
+    """El PDF generado debe empezar con %PDF-"""
+    pdf_file.seek(0)
+    header = pdf_file.read(5)
+    pdf_file.seek(0)
+    if header != b'%PDF-':
+        logger.error("PDF generado es inválido - no empieza con %PDF-")
+        raise Exception("PDF generado es corrupto - no cumple formato PDF estándar")
+
+
+def open_rendered_pdf(siniestro: Siniestro, snapshot: ClaimSnapshot = None, render: bool = True,
+                      progress: Callable[[int, str], None] = None,
+                      require_complete: bool = False) -> Optional[Tuple[BinaryIO, int]]:
+    """
+    PDF sin firma de la versión actual del siniestro como (archivo abierto,
+    tamaño), desde el almacén o renderizándolo (y guardándolo) si no existe.
+    Con render=False retorna None cuando no hay una renderización guardada.
+    `progress(porcentaje, etapa)` se invoca entre etapas (lo usa el worker de
+    trabajos PDF). El llamador debe cerrar el archivo.
+
+    Un render incompleto (sección con error, imagen no descargada) no se guarda
+    en el almacén: se entrega igual, o con require_complete=True lanza
+    IncompleteReportError para que se reintente.
+    """
+    progress = progress or (lambda porcentaje, etapa: None)
+    snapshot = snapshot or ClaimSnapshot.from_siniestro(siniestro)
+    fingerprint = snapshot.fingerprint()
+
+    stored = pdf_store.open_pdf(siniestro.id, fingerprint, VARIANT_UNSIGNED)
+    metrics.PDF_STORE_LOOKUPS.labels(VARIANT_UNSIGNED, "hit" if stored else "miss").inc()
+    if stored:
+        logger.info(f"♻️ Reutilizando PDF renderizado del siniestro {siniestro.id}")
+        return stored
+    if not render:
+        return None
+
+    progress(20, "Descargando imágenes de evidencia")
+    ctx = _render_context(snapshot)
+    progress(50, "Renderizando informe")
+    # El render va a un archivo temporal (memoria hasta un umbral, luego disco),
+    # sin copias intermedias del documento completo
+    pdf_file = pdf_store.new_spool_file()
     try:
-        # Crear buffer para el PDF
-        buffer = io.BytesIO()
-
-        # Crear documento
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=letter,
-            topMargin=1 * inch,
-            bottomMargin=1 * inch,
-            leftMargin=1 * inch,
-            rightMargin=1 * inch,
+        with metrics.PDF_RENDER_SECONDS.time():
+            render_report(snapshot, pdf_file, ctx)
+        _validate_pdf(pdf_file)
+        if ctx.failures and require_complete:
+            raise IncompleteReportError(f"Informe incompleto: {', '.join(ctx.failures)}")
+    except Exception:
+        pdf_file.close()
+        raise
+    size = pdf_store.file_size(pdf_file)
+    if ctx.failures:
+        logger.warning(
+            f"⚠️ PDF del siniestro {siniestro.id} incompleto ({', '.join(ctx.failures)}); no se guarda en el almacén"
         )
-        styles = getSampleStyleSheet()
-
-        # Estilos personalizados
-        title_style = ParagraphStyle(
-            "Title",
-            parent=styles["Heading1"],
-            fontSize=18,
-            alignment=TA_CENTER,
-            spaceAfter=30,
-            fontName="Helvetica-Bold",
+        return pdf_file, size
+    logger.info(f"✅ PDF generado exitosamente: {size} bytes")
+    pdf_store.put_pdf(siniestro.id, fingerprint, VARIANT_UNSIGNED, pdf_file)
+    return pdf_file, size
+
+
+def open_signed_pdf(siniestro: Siniestro, snapshot: ClaimSnapshot = None, render: bool = True,
+                    progress: Callable[[int, str], None] = None) -> Optional[Tuple[BinaryIO, int]]:
+    """
+    Etapa de firma: agrega la firma incremental al PDF ya renderizado (o lo
+    renderiza primero si render=True). Retorna None si no hay renderización
+    guardada (render=False), no hay certificado o la firma falla. Lanza
+    IncompleteReportError si el render quedó incompleto: nunca se firma un
+    informe al que le faltan secciones o imágenes.
+    """
+    snapshot = snapshot or ClaimSnapshot.from_siniestro(siniestro)
+    fingerprint = snapshot.fingerprint()
+
+    stored = pdf_store.open_pdf(siniestro.id, fingerprint, VARIANT_SIGNED)
+    metrics.PDF_STORE_LOOKUPS.labels(VARIANT_SIGNED, "hit" if stored else "miss").inc()
+    if stored:
+        return stored
+
+    cert_data, password = load_certificate()
+    if not (cert_data and password):
+        logger.warning(
+            "Certificado digital no encontrado. "
+            "PDF generado sin firma digital."
         )
+        return None
 
-        normal_style = ParagraphStyle(
-            "Normal", parent=styles["Normal"], fontSize=10, fontName="Helvetica"
-        )
+    unsigned = open_rendered_pdf(siniestro, snapshot, render=render, progress=progress, require_complete=True)
+    if unsigned is None:
+        return None
+    unsigned_file, _ = unsigned
 
-        story = []
-
-        # Título principal
-        title = Paragraph("INFORME DE INVESTIGACIÓN DE SINIESTRO", title_style)
-        story.append(title)
-
-        # Tabla con datos básicos
-        data = [
-            ["Compañía de Seguros:", siniestro.compania_seguros or "No especificada"],
-            ["Número de Reclamo:", siniestro.reclamo_num or "No especificado"],
-            [
-                "Fecha del Siniestro:",
-                (
-                    siniestro.fecha_siniestro.strftime("%d/%m/%Y")
-                    if siniestro.fecha_siniestro
-                    else "No especificada"
-                ),
-            ],
-            ["Dirección:", siniestro.direccion_siniestro or "No especificada"],
-            ["Tipo de Siniestro:", siniestro.tipo_siniestro or "No especificado"],
-        ]
-
-        table = Table(data, colWidths=[2.5 * inch, 4 * inch])
-        table.setStyle(
-            TableStyle(
-                [
-                    ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-                    ("FONTSIZE", (0, 0), (-1, -1), 10),
-                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                    ("ALIGN", (0, 0), (0, -1), "LEFT"),
-                    ("ALIGN", (1, 0), (1, -1), "LEFT"),
-                    ("BACKGROUND", (0, 0), (0, -1), colors.lightgrey),
-                ]
-            )
-        )
-        story.append(table)
-        story.append(Spacer(1, 20))
+    if progress:
+        progress(85, "Firmando informe")
+    signed_file = pdf_store.new_spool_file()
+    try:
+        # La firma necesita el documento completo; es la única copia en memoria
+        pdf_data = unsigned_file.read()
+        signed_file.write(pdf_data)
+        with metrics.PDF_SIGN_SECONDS.time():
+            signed_file.write(create_signature(pdf_data, cert_data, password))
+        del pdf_data
+    except Exception as e:
+        logger.error(f"Error durante firma digital: {e}")
+        signed_file.close()
+        return None
+    finally:
+        unsigned_file.close()
 
-        # Fecha de generación
-        fecha_gen = Paragraph(
-            f"Fecha de Generación: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}",
-            normal_style,
-        )
-        story.append(fecha_gen)
-        story.append(Spacer(1, 10))
+    size = pdf_store.file_size(signed_file)
+    logger.info(f"PDF bytes after signing: {size}")
+    pdf_store.put_pdf(siniestro.id, fingerprint, VARIANT_SIGNED, signed_file)
+    return signed_file, size
 
-        # Generar PDF
-        doc.build(story)
 
-        # Asegurar que el buffer esté completo antes de obtener datos
-        buffer.flush()
+def open_report_pdf(siniestro: Siniestro) -> Tuple[BinaryIO, int, bool]:
+    """Informe firmado si hay certificado; si no, sin firma. Retorna (archivo, tamaño, firmado)"""
+    snapshot = ClaimSnapshot.from_siniestro(siniestro)
+    try:
+        signed = open_signed_pdf(siniestro, snapshot)
+    except IncompleteReportError as e:
+        logger.warning(f"⚠️ No se firma el informe del siniestro {siniestro.id}: {e}")
+        signed = None
+    if signed:
+        return signed[0], signed[1], True
+    pdf_file, size = open_rendered_pdf(siniestro, snapshot)
+    return pdf_file, size, False
 
-        # Obtener datos del buffer
-        buffer.seek(0)
-        pdf_data = buffer.getvalue()
 
-        logger.info(f"✅ PDF generado exitosamente: {len(pdf_data)} bytes")
-        logger.info(f"PDF bytes before signing: {len(pdf_data)}")
+def _read_and_close(pdf_file: BinaryIO) -> bytes:
+    try:
+        return pdf_file.read()
+    finally:
+        pdf_file.close()
 
-        # Validar que el PDF sea válido (debe empezar con %PDF-)
-        if not pdf_data.startswith(b'%PDF-'):
-            logger.error("PDF generado es inválido - no empieza con %PDF-")
-            raise Exception("PDF generado es corrupto - no cumple formato PDF estándar")
 
-        # Intentar firmar PDF usando certificado desde S3
-        cert_data, password = load_certificate_from_s3()
-        if cert_data and password:
-            logger.info("🔐 Firmando PDF con certificado digital desde S3...")
-            try:
-                signed_pdf = sign_pdf(pdf_data, cert_data, password)
-                # Validar que el PDF firmado siga siendo válido
-                if signed_pdf.startswith(b'%PDF-'):
-                    pdf_data = signed_pdf
-                    logger.info(f"PDF bytes after signing: {len(pdf_data)}")
-                else:
-                    logger.warning("PDF firmado es inválido - usando PDF sin firma")
-            except Exception as e:
-                logger.error(f"Error durante firma digital: {e}")
-                logger.warning("Continuando con PDF sin firma digital")
-        else:
-            logger.warning(
-                "Certificado digital no encontrado en S3. "
-                "PDF generado sin firma digital."
-            )
-            logger.info("⚠️  Certificado no encontrado en S3, PDF sin firma")
+def generate_simple_pdf(siniestro: Siniestro) -> bytes:
+    """Generar PDF del informe del siniestro, firmado si hay certificado disponible"""
+    logger.info(f"🔄 Generando PDF para siniestro ID: {siniestro.id}")
 
-        return pdf_data
+    try:
+        pdf_file, _, _ = open_report_pdf(siniestro)
+        return _read_and_close(pdf_file)
 
     except Exception as e:
         logger.error(f"❌ Error generando PDF: {e}")
-        # PDF de error mínimo
-        error_buffer = io.BytesIO()
-        try:
-            doc = SimpleDocTemplate(error_buffer, pagesize=letter)
-            story = [Paragraph("ERROR: No se pudo generar el PDF", styles["Normal"])]
-            doc.build(story)
-            error_buffer.seek(0)
-            return error_buffer.read()
-        finally:
-            error_buffer.close()
-    finally:
-        # Cerrar buffer correctamente
-        try:
-            buffer.close()
-        except:
-            pass
+        return render_error_pdf("ERROR: No se pudo generar el PDF")
 
 
 def generate_unsigned_pdf(siniestro: Siniestro) -> bytes:
-    """Generar PDF sin firma digital para pruebas"""
+    """Generar PDF sin firma digital (la misma renderización que luego se firma)"""
     logger.info(f"🔄 Generando PDF SIN FIRMA para siniestro ID: {siniestro.id}")
 
     try:
-        # Crear buffer para el PDF
-        buffer = io.BytesIO()
-
-        # Crear documento
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=letter,
-            topMargin=1 * inch,
-            bottomMargin=1 * inch,
-            leftMargin=1 * inch,
-            rightMargin=1 * inch,
-        )
-        styles = getSampleStyleSheet()
-
-        # Estilos personalizados
-        title_style = ParagraphStyle(
-            "Title",
-            parent=styles["Heading1"],
-            fontSize=18,
-            alignment=TA_CENTER,
-            spaceAfter=30,
-            fontName="Helvetica-Bold",
-        )
-
-        normal_style = ParagraphStyle(
-            "Normal", parent=styles["Normal"], fontSize=10, fontName="Helvetica"
-        )
-
-        story = []
-
-        # Título principal
-        title = Paragraph("INFORME DE INVESTIGACIÓN DE SINIESTRO (SIN FIRMA)", title_style)
-        story.append(title)
-
-        # Tabla con datos básicos
-        data = [
-            ["Compañía de Seguros:", siniestro.compania_seguros or "No especificada"],
-            ["Número de Reclamo:", siniestro.reclamo_num or "No especificado"],
-            [
-                "Fecha del Siniestro:",
-                (
-                    siniestro.fecha_siniestro.strftime("%d/%m/%Y")
-                    if siniestro.fecha_siniestro
-                    else "No especificada"
-                ),
-            ],
-            ["Dirección:", siniestro.direccion_siniestro or "No especificada"],
-            ["Tipo de Siniestro:", siniestro.tipo_siniestro or "No especificado"],
-        ]
-
-        table = Table(data, colWidths=[2.5 * inch, 4 * inch])
-        table.setStyle(
-            TableStyle(
-                [
-                    ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-                    ("FONTSIZE", (0, 0), (-1, -1), 10),
-                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                    ("ALIGN", (0, 0), (0, -1), "LEFT"),
-                    ("ALIGN", (1, 0), (1, -1), "LEFT"),
-                    ("BACKGROUND", (0, 0), (0, -1), colors.lightgrey),
-                ]
-            )
-        )
-        story.append(table)
-        story.append(Spacer(1, 20))
-
-        # Nota sobre falta de firma
-        nota_style = ParagraphStyle(
-            "Nota", parent=styles["Normal"], fontSize=8, textColor=colors.red
-        )
-        nota = Paragraph("NOTA: Este PDF fue generado sin firma digital para pruebas.", nota_style)
-        story.append(nota)
-        story.append(Spacer(1, 10))
-
-        # Fecha de generación
-        fecha_gen = Paragraph(
-            f"Fecha de Generación: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}",
-            normal_style,
-        )
-        story.append(fecha_gen)
-        story.append(Spacer(1, 10))
-
-        # Generar PDF
-        doc.build(story)
-
-        # Asegurar que el buffer esté completo antes de obtener datos
-        buffer.flush()
-
-        # Obtener datos del buffer
-        buffer.seek(0)
-        pdf_data = buffer.getvalue()
-
-        logger.info(f"✅ PDF sin firma generado exitosamente: {len(pdf_data)} bytes")
-
-        # Validar que el PDF sea válido
-        if not pdf_data.startswith(b'%PDF-'):
-            logger.error("PDF generado es inválido - no empieza con %PDF-")
-            raise Exception("PDF generado es corrupto - no cumple formato PDF estándar")
-
-        return pdf_data
+        pdf_file, _ = open_rendered_pdf(siniestro)
+        return _read_and_close(pdf_file)
 
     except Exception as e:
         logger.error(f"❌ Error generando PDF sin firma: {e}")
-        # PDF de error mínimo
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        story = [Paragraph("ERROR: No se pudo generar el PDF sin firma", styles["Normal"])]
-        doc.build(story)
-        buffer.seek(0)
-        return buffer.getvalue()
+        return render_error_pdf("ERROR: No se pudo generar el PDF sin firma")
 
 
 class SiniestroPDFGenerator:
@@ -0,0 +1,247 @@
+"""
+Diagnóstico de bloqueos del event loop y perfiles de CPU
+
+Watchdog (opcional, LOOP_WATCHDOG_MS > 0): una tarea del loop marca un latido
+cada pocos milisegundos y un hilo aparte lo vigila. Si el latido se atrasa más
+de LOOP_WATCHDOG_MS, el hilo captura la pila del hilo del loop (el callback que
+lo está bloqueando: acceso síncrono a BD, S3, ReportLab...) y la registra en el
+log, una vez por bloqueo.
+
+Perfiles de CPU acotados en tiempo, escritos en PROFILE_DIR:
+- "muestreo": un hilo toma la pila de TODOS los hilos (loop y threadpool) cada
+  PROFILE_SAMPLE_INTERVAL_MS y guarda pilas plegadas (.folded), que se abren
+  con speedscope o flamegraph.pl. Bajo costo, apto para producción.
+- "cprofile": cProfile sobre el hilo del event loop (.prof, para pstats o
+  snakeviz). Solo ve el trabajo que corre en el loop, no el del threadpool.
+
+Se disparan con POST /debug/profile o, si PROFILE_SIGNAL=true, enviando SIGUSR2
+al worker (perfil por muestreo de PROFILE_SIGNAL_SECONDS):
+
+    kill -USR2 <pid del worker>
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Umbral de bloqueo del event loop en ms (0 = watchdog desactivado)
+LOOP_WATCHDOG_MS = float(os.getenv("LOOP_WATCHDOG_MS", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/perfiles")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "120"))
+PROFILE_SIGNAL = os.getenv("PROFILE_SIGNAL", "false").lower() == "true"
+PROFILE_SIGNAL_SECONDS = float(os.getenv("PROFILE_SIGNAL_SECONDS", "30"))
+
+_MAX_STACK_DEPTH = 40
+
+# Hilos detenidos en estas funciones están esperando, no consumiendo CPU
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("runners.py", "run"),  # loop de uvloop esperando eventos (en C)
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+class ProfileInProgress(Exception):
+    """Ya hay un perfil en curso en este proceso"""
+
+
+def _format_stack(frame) -> str:
+    return "".join(traceback.format_stack(frame, limit=_MAX_STACK_DEPTH))
+
+
+class LoopWatchdog:
+    """Registra la pila del hilo del loop cuando un callback lo bloquea más del umbral"""
+
+    def __init__(self, threshold_ms: float):
+        self.threshold = threshold_ms / 1000
+        # Latido frecuente para detectar el bloqueo cerca del umbral
+        self.beat_interval = max(self.threshold / 4, 0.005)
+        self.last_beat = time.monotonic()
+        self.loop_thread_id = None
+        self.stalls = 0
+        self._task = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            self.last_beat = time.monotonic()
+            await asyncio.sleep(self.beat_interval)
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stop.wait(self.beat_interval):
+            beat = self.last_beat
+            blocked = time.monotonic() - beat
+            if blocked < self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            self.stalls += 1
+            logger.warning(
+                f"🧊 Event loop bloqueado {blocked * 1000:.0f} ms (umbral {self.threshold * 1000:.0f} ms). "
+                f"Pila del hilo del loop:\n{_format_stack(frame)}"
+            )
+
+    def start(self):
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"🧊 Watchdog del event loop activo (umbral {self.threshold * 1000:.0f} ms)")
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+
+
+_profile_lock = threading.Lock()
+
+
+def _profile_path(mode: str, extension: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return os.path.join(PROFILE_DIR, f"perfil-{mode}-{os.getpid()}-{stamp}.{extension}")
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_FRAMES
+
+
+def _fold(frame) -> str:
+    partes = []
+    while frame is not None:
+        code = frame.f_code
+        partes.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(partes))
+
+
+def sample_profile(seconds: float, interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS) -> dict:
+    """
+    Perfil por muestreo de todos los hilos del proceso durante `seconds`.
+    Bloquea al hilo que lo llama; retorna la ruta del archivo y las pilas más frecuentes.
+    Las pilas de hilos en espera se cuentan aparte y no se escriben.
+    """
+    seconds = min(seconds, PROFILE_MAX_SECONDS)
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfileInProgress()
+    try:
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks = Counter()
+        samples = idle = 0
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if _is_idle(frame):
+                    idle += 1
+                    continue
+                stacks[f"{names.get(thread_id, thread_id)};{_fold(frame)}"] += 1
+            samples += 1
+            time.sleep(interval_ms / 1000)
+    finally:
+        _profile_lock.release()
+
+    path = _profile_path("muestreo", "folded")
+    with open(path, "w") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    logger.info(f"📈 Perfil por muestreo guardado en {path} ({samples} muestras)")
+    return {
+        "archivo": path,
+        "segundos": seconds,
+        "muestras": samples,
+        "muestras_en_espera": idle,
+        "pilas_mas_frecuentes": [
+            {"muestras": count, "pila": stack.split(";")[-6:]} for stack, count in stacks.most_common(10)
+        ],
+    }
+
+
+async def cprofile_loop(seconds: float, top: int = 30) -> dict:
+    """
+    cProfile del hilo del event loop durante `seconds` (se ejecuta como corrutina
+    en el propio loop, así que mide todo lo que el loop ejecuta mientras tanto).
+    """
+    seconds = min(seconds, PROFILE_MAX_SECONDS)
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfileInProgress()
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+    finally:
+        _profile_lock.release()
+
+    path = _profile_path("cprofile", "prof")
+    profiler.dump_stats(path)
+    resumen = io.StringIO()
+    pstats.Stats(profiler, stream=resumen).sort_stats("cumulative").print_stats(top)
+    logger.info(f"📈 Perfil cProfile guardado en {path}")
+    return {"archivo": path, "segundos": seconds, "resumen": resumen.getvalue()}
+
+
+def _profile_on_signal(signum, frame):
+    # El manejador solo lanza el hilo: el muestreo no debe correr dentro de la señal
+    def run():
+        try:
+            sample_profile(PROFILE_SIGNAL_SECONDS)
+        except ProfileInProgress:
+            logger.warning("⚠️ Perfil por señal ignorado: ya hay un perfil en curso")
+
+    threading.Thread(target=run, name="perfil-senal", daemon=True).start()
+
+
+def install_signal_handler() -> bool:
+    """SIGUSR2 -> perfil por muestreo (solo desde el hilo principal, no disponible en Windows)"""
+    if not hasattr(signal, "SIGUSR2"):
+        return False
+    try:
+        signal.signal(signal.SIGUSR2, _profile_on_signal)
+    except ValueError:
+        return False
+    logger.info(f"📈 Perfil por señal activo: kill -USR2 {os.getpid()} ({PROFILE_SIGNAL_SECONDS:g}s)")
+    return True
+
+
+_watchdog: Optional[LoopWatchdog] = None
+
+
+def start_watchdog() -> Optional[LoopWatchdog]:
+    global _watchdog
+    if LOOP_WATCHDOG_MS > 0 and _watchdog is None:
+        _watchdog = LoopWatchdog(LOOP_WATCHDOG_MS)
+        _watchdog.start()
+    return _watchdog
+
+
+def stop_watchdog():
+    global _watchdog
+    if _watchdog:
+        _watchdog.stop()
+        _watchdog = None
@@ -0,0 +1,193 @@
+"""
+Instrumentación de consultas SQL por request
+
+Los eventos del engine de SQLAlchemy cuentan las sentencias, el tiempo total
+en la base y la sentencia más lenta del request en curso. El request se
+identifica con un ContextVar que fija el middleware (ver app/main.py); como
+Starlette copia el contexto al pasar a un threadpool, también se cuentan las
+consultas de los endpoints síncronos y de run_in_threadpool.
+
+Por cada ruta (plantilla, p. ej. /api/v1/siniestros/{siniestro_id}) se agregan
+histogramas de consultas por request, tiempo en la base y duración total, que
+se consultan en /debug/queries. Las sentencias que superan SLOW_QUERY_MS se
+registran en el log.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "true").lower() == "true"
+# Sentencias más lentas que esto se registran en el log (0 = desactivado)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+DURATION_MS_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_MAX_SQL_LENGTH = 500
+
+
+@dataclass
+class QueryStats:
+    """Consultas de un request"""
+    count: int = 0
+    total_ms: float = 0.0
+    slowest_ms: float = 0.0
+    slowest_sql: Optional[str] = None
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_sql = statement
+
+    def server_timing(self, total_ms: float = None) -> str:
+        """Valor del header Server-Timing"""
+        partes = [
+            f'db;dur={self.total_ms:.1f};desc="{self.count} queries"',
+            f"db-slowest;dur={self.slowest_ms:.1f}",
+        ]
+        if total_ms is not None:
+            partes.append(f"app;dur={total_ms:.1f}")
+        return ", ".join(partes)
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_request():
+    """Inicia el conteo para el request actual; retorna (token del contexto, estadísticas)"""
+    stats = QueryStats()
+    return _current.set(stats), stats
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get("query_start")
+    if not inicios:
+        return
+    elapsed_ms = (time.perf_counter() - inicios.pop()) * 1000
+
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+    if SLOW_QUERY_MS and elapsed_ms >= SLOW_QUERY_MS:
+        logger.warning(f"🐢 Consulta lenta ({elapsed_ms:.0f} ms): {_shorten(statement)}")
+
+
+def _handle_error(exception_context):
+    # Una sentencia fallida no llega a after_cursor_execute: descartar su inicio
+    inicios = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if inicios:
+        inicios.pop()
+
+
+def _shorten(statement: str) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= _MAX_SQL_LENGTH else statement[:_MAX_SQL_LENGTH] + "…"
+
+
+def instrument_engine(engine):
+    """Registra los listeners de medición en el engine (una sola vez)"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "max")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def as_dict(self, n: int) -> dict:
+        etiquetas = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            "promedio": round(self.total / n, 2) if n else 0,
+            "max": round(self.max, 2),
+            "histograma": dict(zip(etiquetas, self.counts)),
+        }
+
+
+class _RouteStats:
+    __slots__ = ("requests", "queries", "db_ms", "duration_ms", "slowest_sql", "slowest_ms")
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = _Histogram(QUERY_COUNT_BUCKETS)
+        self.db_ms = _Histogram(DURATION_MS_BUCKETS)
+        self.duration_ms = _Histogram(DURATION_MS_BUCKETS)
+        self.slowest_sql = None
+        self.slowest_ms = 0.0
+
+
+_routes: Dict[str, _RouteStats] = {}
+_routes_lock = threading.Lock()
+
+
+def record_request(route: str, stats: QueryStats, duration_ms: float):
+    """Agrega las consultas de un request terminado a los histogramas de su ruta"""
+    with _routes_lock:
+        ruta = _routes.get(route)
+        if ruta is None:
+            ruta = _routes[route] = _RouteStats()
+        ruta.requests += 1
+        ruta.queries.observe(stats.count)
+        ruta.db_ms.observe(stats.total_ms)
+        ruta.duration_ms.observe(duration_ms)
+        if stats.slowest_ms > ruta.slowest_ms:
+            ruta.slowest_ms = stats.slowest_ms
+            ruta.slowest_sql = _shorten(stats.slowest_sql or "")
+
+
+def route_summary() -> dict:
+    """Histogramas por ruta de este proceso, ordenados por tiempo total en la base"""
+    with _routes_lock:
+        resumen = {
+            route: {
+                "requests": r.requests,
+                "consultas_por_request": r.queries.as_dict(r.requests),
+                "db_ms": r.db_ms.as_dict(r.requests),
+                "duracion_ms": r.duration_ms.as_dict(r.requests),
+                "db_ms_total": round(r.db_ms.total, 1),
+                "consulta_mas_lenta": {"ms": round(r.slowest_ms, 1), "sql": r.slowest_sql},
+            }
+            for route, r in _routes.items()
+        }
+    return dict(sorted(resumen.items(), key=lambda item: item[1]["db_ms_total"], reverse=True))
+
+
+def reset_routes():
+    with _routes_lock:
+        _routes.clear()
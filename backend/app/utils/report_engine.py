@@ -0,0 +1,543 @@
+"""
+Motor de informes de investigación de siniestros
+
+El informe se arma a partir de una instantánea (ClaimSnapshot) con los datos
+planos del siniestro y sus relaciones, de modo que el render no depende de una
+sesión de base de datos abierta. Cada sección es una función registrada con
+@section que recibe la instantánea y el contexto de render y retorna sus
+flowables; las secciones sin datos retornan una lista vacía.
+
+Estilos de párrafo, estilos de tabla y fuentes se construyen una sola vez al
+importar el módulo y se reutilizan en cada render.
+"""
+import hashlib
+import io
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = letter
+MARGIN = 1 * inch
+CONTENT_WIDTH = PAGE_SIZE[0] - 2 * MARGIN
+
+# Cambiar al modificar el diseño del informe: invalida los PDF ya renderizados en caché
+LAYOUT_VERSION = "1"
+
+# ---------------------------------------------------------------------------
+# Estilos (una sola vez por proceso)
+# ---------------------------------------------------------------------------
+FONT_REGULAR = "Helvetica"
+FONT_BOLD = "Helvetica-Bold"
+
+_base_styles = getSampleStyleSheet()
+
+STYLES = {
+    "title": ParagraphStyle(
+        "ReportTitle", parent=_base_styles["Heading1"], fontSize=18, alignment=TA_CENTER,
+        spaceAfter=30, fontName=FONT_BOLD,
+    ),
+    "heading": ParagraphStyle(
+        "ReportHeading", parent=_base_styles["Heading2"], fontSize=13, fontName=FONT_BOLD,
+        spaceBefore=12, spaceAfter=8, textColor=colors.HexColor("#1f3864"),
+    ),
+    "subheading": ParagraphStyle(
+        "ReportSubheading", parent=_base_styles["Heading3"], fontSize=11, fontName=FONT_BOLD,
+        spaceBefore=6, spaceAfter=4,
+    ),
+    "normal": ParagraphStyle("ReportNormal", parent=_base_styles["Normal"], fontSize=10, fontName=FONT_REGULAR),
+    "body": ParagraphStyle(
+        "ReportBody", parent=_base_styles["Normal"], fontSize=10, fontName=FONT_REGULAR,
+        alignment=TA_JUSTIFY, leading=14, spaceAfter=6,
+    ),
+    "cell": ParagraphStyle("ReportCell", parent=_base_styles["Normal"], fontSize=9, fontName=FONT_REGULAR, leading=11),
+    "cell_label": ParagraphStyle(
+        "ReportCellLabel", parent=_base_styles["Normal"], fontSize=9, fontName=FONT_BOLD, leading=11,
+    ),
+    "footer": ParagraphStyle("ReportFooter", parent=_base_styles["Normal"], fontSize=8, textColor=colors.grey),
+}
+
+TABLE_STYLE_FIELDS = TableStyle(
+    [
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("BACKGROUND", (0, 0), (0, -1), colors.lightgrey),
+        ("LEFTPADDING", (0, 0), (-1, -1), 4),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+    ]
+)
+
+FIELD_COL_WIDTHS = [2.2 * inch, CONTENT_WIDTH - 2.2 * inch]
+IMAGE_MAX_WIDTH = CONTENT_WIDTH
+IMAGE_MAX_HEIGHT = 4 * inch
+
+NOT_SPECIFIED = "No especificado"
+
+
+# ---------------------------------------------------------------------------
+# Instantánea del siniestro
+# ---------------------------------------------------------------------------
+def parse_list(value) -> List[str]:
+    """Listas numeradas guardadas como JSON (o texto con una entrada por línea)"""
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value if str(item).strip()]
+    try:
+        parsed = json.loads(value)
+        if isinstance(parsed, list):
+            return [str(item) for item in parsed if str(item).strip()]
+    except (TypeError, ValueError):
+        pass
+    return [line.strip() for line in str(value).splitlines() if line.strip()]
+
+
+def _columns(obj, names) -> Optional[dict]:
+    if obj is None:
+        return None
+    return {name: getattr(obj, name, None) for name in names}
+
+
+@dataclass
+class ClaimSnapshot:
+    """Datos planos del siniestro y sus relaciones, independientes de la sesión ORM"""
+
+    id: int
+    fields: Dict[str, object]
+    asegurado: Optional[dict] = None
+    beneficiario: Optional[dict] = None
+    conductor: Optional[dict] = None
+    objeto_asegurado: Optional[dict] = None
+    antecedentes: List[str] = field(default_factory=list)
+    relatos: List[dict] = field(default_factory=list)
+    inspecciones: List[dict] = field(default_factory=list)
+    testigos: List[dict] = field(default_factory=list)
+    visita_taller: Optional[str] = None
+    dinamica_accidente: Optional[str] = None
+    observaciones: List[str] = field(default_factory=list)
+    recomendaciones: List[str] = field(default_factory=list)
+    conclusiones: List[str] = field(default_factory=list)
+    anexos: List[str] = field(default_factory=list)
+
+    SIMPLE_FIELDS = (
+        "compania_seguros", "ruc_compania", "tipo_reclamo", "poliza", "reclamo_num", "fecha_siniestro",
+        "fecha_reportado", "fecha_designacion", "direccion_siniestro", "ubicacion_geo_lat", "ubicacion_geo_lng",
+        "danos_terceros", "ejecutivo_cargo", "tipo_siniestro", "cobertura", "fecha_declaracion",
+        "persona_declara_tipo", "persona_declara_cedula", "persona_declara_nombre",
+        "persona_declara_relacion",
+        "evidencias_complementarias", "evidencias_complementarias_imagen_url", "otras_diligencias",
+        "otras_diligencias_imagen_url", "visita_taller_descripcion", "visita_taller_imagen_url",
+        "updated_at",
+    )
+
+    def get(self, name, default=None):
+        return self.fields.get(name, default)
+
+    @property
+    def image_urls(self) -> List[str]:
+        """Todas las imágenes referenciadas por el informe, en orden de aparición"""
+        urls = [item.get("imagen_url") for item in self.relatos + self.inspecciones + self.testigos]
+        urls += [
+            self.get("evidencias_complementarias_imagen_url"),
+            self.get("otras_diligencias_imagen_url"),
+            self.get("visita_taller_imagen_url"),
+        ]
+        return [url for url in dict.fromkeys(urls) if url]
+
+    def fingerprint(self) -> str:
+        """Hash del contenido del informe: cambia con cualquier dato que se imprime"""
+        contenido = json.dumps(asdict(self), sort_keys=True, default=str)
+        return hashlib.sha1(f"{LAYOUT_VERSION}|{contenido}".encode()).hexdigest()
+
+    @classmethod
+    def from_siniestro(cls, siniestro) -> "ClaimSnapshot":
+        def items(rows, numero_attr, texto_attr):
+            return [
+                {
+                    "numero": getattr(row, numero_attr),
+                    "texto": getattr(row, texto_attr),
+                    "imagen_url": row.imagen_url,
+                }
+                for row in sorted(rows or [], key=lambda r: (getattr(r, numero_attr) or 0, r.id or 0))
+            ]
+
+        return cls(
+            id=siniestro.id,
+            fields={name: getattr(siniestro, name, None) for name in cls.SIMPLE_FIELDS},
+            asegurado=_columns(siniestro.asegurado, (
+                "tipo", "cedula", "nombre", "celular", "correo", "direccion", "parentesco",
+                "ruc", "empresa", "representante_legal", "telefono",
+            )),
+            beneficiario=_columns(siniestro.beneficiario, ("razon_social", "cedula_ruc", "domicilio")),
+            conductor=_columns(siniestro.conductor, ("nombre", "cedula", "celular", "direccion", "parentesco")),
+            objeto_asegurado=_columns(siniestro.objeto_asegurado, (
+                "placa", "marca", "modelo", "tipo", "color", "ano", "serie_motor", "chasis",
+            )),
+            antecedentes=[a.descripcion for a in siniestro.antecedentes or [] if a.descripcion],
+            relatos=items(siniestro.relatos_asegurado, "numero_relato", "texto"),
+            inspecciones=items(siniestro.inspecciones, "numero_inspeccion", "descripcion"),
+            testigos=items(siniestro.testigos, "numero_relato", "texto"),
+            visita_taller=siniestro.visita_taller.descripcion if siniestro.visita_taller else None,
+            dinamica_accidente=siniestro.dinamica_accidente.descripcion if siniestro.dinamica_accidente else None,
+            observaciones=parse_list(siniestro.observaciones),
+            recomendaciones=parse_list(siniestro.recomendacion_pago_cobertura),
+            conclusiones=parse_list(siniestro.conclusiones),
+            anexos=parse_list(siniestro.anexo),
+        )
+
+
+@dataclass
+class RenderContext:
+    # URL de imagen -> ruta local de la imagen ya preparada para impresión
+    images: Dict[str, str] = field(default_factory=dict)
+    generated_at: datetime = field(default_factory=datetime.now)
+    # Secciones e imágenes que no se pudieron incluir: el informe quedó incompleto
+    failures: List[str] = field(default_factory=list)
+
+
+# ---------------------------------------------------------------------------
+# Registro de secciones
+# ---------------------------------------------------------------------------
+SectionRenderer = Callable[[ClaimSnapshot, RenderContext], list]
+SECTIONS: List[tuple] = []
+
+
+def section(name: str):
+    """Registra una sección; el informe las renderiza en orden de registro"""
+    def decorator(func: SectionRenderer) -> SectionRenderer:
+        SECTIONS.append((name, func))
+        return func
+    return decorator
+
+
+def text(value) -> str:
+    """Texto libre del usuario como markup seguro para Paragraph"""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%d/%m/%Y")
+    if isinstance(value, bool):
+        return "Sí" if value else "No"
+    return escape(str(value)).replace("\n", "<br/>")
+
+
+def format_date(value) -> str:
+    if not value:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%d/%m/%Y")
+    try:
+        return datetime.fromisoformat(str(value)).strftime("%d/%m/%Y")
+    except ValueError:
+        return str(value)
+
+
+def fields_table(rows, include_empty: bool = False) -> list:
+    """Tabla de dos columnas etiqueta/valor; omite valores vacíos salvo include_empty"""
+    data = []
+    for label, value in rows:
+        if value in (None, "") and not include_empty:
+            continue
+        data.append([
+            Paragraph(text(label), STYLES["cell_label"]),
+            Paragraph(text(value) if value not in (None, "") else NOT_SPECIFIED, STYLES["cell"]),
+        ])
+    if not data:
+        return []
+    table = Table(data, colWidths=FIELD_COL_WIDTHS)
+    table.setStyle(TABLE_STYLE_FIELDS)
+    return [table, Spacer(1, 10)]
+
+
+def image_flowable(ctx: RenderContext, url: Optional[str]) -> list:
+    """Imagen preparada por la etapa de prefetch (si está disponible)"""
+    if not url:
+        return []
+    path = ctx.images.get(url)
+    if not path:
+        ctx.failures.append(f"imagen {url[:80]}")
+        return []
+    try:
+        image = Image(path)
+        scale = min(IMAGE_MAX_WIDTH / image.imageWidth, IMAGE_MAX_HEIGHT / image.imageHeight, 1.0)
+        image.drawWidth = image.imageWidth * scale
+        image.drawHeight = image.imageHeight * scale
+        return [image, Spacer(1, 8)]
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo incluir la imagen {url}: {e}")
+        ctx.failures.append(f"imagen {url[:80]}")
+        return []
+
+
+def numbered_list(title: str, items: List[str]) -> list:
+    if not items:
+        return []
+    story = [Paragraph(title, STYLES["heading"])]
+    for index, item in enumerate(items, start=1):
+        story.append(Paragraph(f"{index}. {text(item)}", STYLES["body"]))
+    return story
+
+
+# ---------------------------------------------------------------------------
+# Secciones del informe
+# ---------------------------------------------------------------------------
+@section("encabezado")
+def render_header(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    title = "INFORME DE INVESTIGACIÓN DE SINIESTRO"
+    rows = [
+        ("Compañía de Seguros:", snapshot.get("compania_seguros")),
+        ("Número de Reclamo:", snapshot.get("reclamo_num")),
+        ("Fecha del Siniestro:", format_date(snapshot.get("fecha_siniestro"))),
+        ("Dirección:", snapshot.get("direccion_siniestro")),
+        ("Tipo de Siniestro:", snapshot.get("tipo_siniestro")),
+    ]
+    return [Paragraph(title, STYLES["title"])] + fields_table(rows, include_empty=True)
+
+
+@section("datos_generales")
+def render_general(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    rows = [
+        ("RUC Compañía:", snapshot.get("ruc_compania")),
+        ("Tipo de Reclamo:", snapshot.get("tipo_reclamo")),
+        ("Póliza:", snapshot.get("poliza")),
+        ("Cobertura:", snapshot.get("cobertura")),
+        ("Fecha de Reporte:", format_date(snapshot.get("fecha_reportado"))),
+        ("Fecha de Designación:", format_date(snapshot.get("fecha_designacion"))),
+        ("Ejecutivo a Cargo:", snapshot.get("ejecutivo_cargo")),
+        ("Daños a Terceros:", snapshot.get("danos_terceros")),
+    ]
+    table = fields_table(rows)
+    return [Paragraph("Datos Generales", STYLES["heading"])] + table if table else []
+
+
+@section("declaracion")
+def render_declaration(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    rows = [
+        ("Fecha de Declaración:", format_date(snapshot.get("fecha_declaracion"))),
+        ("Declarante:", snapshot.get("persona_declara_nombre")),
+        ("Cédula/RUC:", snapshot.get("persona_declara_cedula")),
+        ("Tipo:", snapshot.get("persona_declara_tipo")),
+        ("Relación con el Asegurado:", snapshot.get("persona_declara_relacion")),
+    ]
+    table = fields_table(rows)
+    return [Paragraph("Declaración del Siniestro", STYLES["heading"])] + table if table else []
+
+
+@section("asegurado")
+def render_insured(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    a = snapshot.asegurado
+    if not a:
+        return []
+    rows = [
+        ("Tipo:", a["tipo"]), ("Nombre:", a["nombre"]), ("Cédula:", a["cedula"]), ("RUC:", a["ruc"]),
+        ("Empresa:", a["empresa"]), ("Representante Legal:", a["representante_legal"]),
+        ("Celular:", a["celular"]), ("Teléfono:", a["telefono"]), ("Correo:", a["correo"]),
+        ("Dirección:", a["direccion"]), ("Parentesco:", a["parentesco"]),
+    ]
+    table = fields_table(rows)
+    return [Paragraph("Asegurado", STYLES["heading"])] + table if table else []
+
+
+@section("beneficiario")
+def render_beneficiary(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    b = snapshot.beneficiario
+    if not b:
+        return []
+    rows = [("Razón Social:", b["razon_social"]), ("Cédula/RUC:", b["cedula_ruc"]), ("Domicilio:", b["domicilio"])]
+    table = fields_table(rows)
+    return [Paragraph("Beneficiario", STYLES["heading"])] + table if table else []
+
+
+@section("conductor")
+def render_driver(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    c = snapshot.conductor
+    if not c:
+        return []
+    rows = [
+        ("Nombre:", c["nombre"]), ("Cédula:", c["cedula"]), ("Celular:", c["celular"]),
+        ("Dirección:", c["direccion"]), ("Parentesco:", c["parentesco"]),
+    ]
+    table = fields_table(rows)
+    return [Paragraph("Conductor", STYLES["heading"])] + table if table else []
+
+
+@section("objeto_asegurado")
+def render_vehicle(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    o = snapshot.objeto_asegurado
+    if not o:
+        return []
+    rows = [
+        ("Placa:", o["placa"]), ("Marca:", o["marca"]), ("Modelo:", o["modelo"]), ("Tipo:", o["tipo"]),
+        ("Color:", o["color"]), ("Año:", o["ano"]), ("Serie de Motor:", o["serie_motor"]), ("Chasis:", o["chasis"]),
+    ]
+    table = fields_table(rows)
+    return [Paragraph("Objeto Asegurado", STYLES["heading"])] + table if table else []
+
+
+@section("mapa")
+def render_map(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    """Mapa estático con el punto del siniestro (vacío si no hay coordenadas o falla)"""
+    from .static_map import render_incident_map, MAP_WIDTH, MAP_HEIGHT
+
+    map_image = render_incident_map(snapshot.get("ubicacion_geo_lat"), snapshot.get("ubicacion_geo_lng"))
+    if not map_image:
+        return []
+    return [
+        Paragraph("Ubicación del Siniestro", STYLES["heading"]),
+        Image(map_image, width=CONTENT_WIDTH, height=CONTENT_WIDTH * MAP_HEIGHT / MAP_WIDTH),
+        Spacer(1, 20),
+    ]
+
+
+@section("antecedentes")
+def render_background(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    if not snapshot.antecedentes:
+        return []
+    story = [Paragraph("Antecedentes", STYLES["heading"])]
+    story += [Paragraph(text(descripcion), STYLES["body"]) for descripcion in snapshot.antecedentes]
+    return story
+
+
+def _numbered_entries(title: str, label: str, entries: List[dict], ctx: RenderContext) -> list:
+    if not entries:
+        return []
+    story = [Paragraph(title, STYLES["heading"])]
+    for entry in entries:
+        story.append(Paragraph(f"{label} {entry['numero']}", STYLES["subheading"]))
+        story.append(Paragraph(text(entry["texto"]), STYLES["body"]))
+        story.extend(image_flowable(ctx, entry.get("imagen_url")))
+    return story
+
+
+@section("relatos")
+def render_statements(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    return _numbered_entries("Entrevista al Asegurado", "Relato", snapshot.relatos, ctx)
+
+
+@section("inspecciones")
+def render_inspections(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    return _numbered_entries("Inspección del Lugar del Siniestro", "Inspección", snapshot.inspecciones, ctx)
+
+
+@section("testigos")
+def render_witnesses(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    return _numbered_entries("Testigos", "Testigo", snapshot.testigos, ctx)
+
+
+@section("investigacion_recabada")
+def render_collected_investigation(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    story = []
+    for title, text_field, image_field in (
+        ("Evidencias Complementarias", "evidencias_complementarias", "evidencias_complementarias_imagen_url"),
+        ("Otras Diligencias", "otras_diligencias", "otras_diligencias_imagen_url"),
+        ("Visita al Taller", "visita_taller_descripcion", "visita_taller_imagen_url"),
+    ):
+        body = snapshot.get(text_field)
+        image = image_flowable(ctx, snapshot.get(image_field))
+        if body or image:
+            story.append(Paragraph(title, STYLES["heading"]))
+            if body:
+                story.append(Paragraph(text(body), STYLES["body"]))
+            story.extend(image)
+    if snapshot.visita_taller and not snapshot.get("visita_taller_descripcion"):
+        story.append(Paragraph("Visita al Taller", STYLES["heading"]))
+        story.append(Paragraph(text(snapshot.visita_taller), STYLES["body"]))
+    if snapshot.dinamica_accidente:
+        story.append(Paragraph("Dinámica del Accidente", STYLES["heading"]))
+        story.append(Paragraph(text(snapshot.dinamica_accidente), STYLES["body"]))
+    return story
+
+
+@section("observaciones")
+def render_observations(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    return numbered_list("Observaciones", snapshot.observaciones)
+
+
+@section("recomendaciones")
+def render_recommendations(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    return numbered_list("Recomendación de Pago de Cobertura", snapshot.recomendaciones)
+
+
+@section("conclusiones")
+def render_conclusions(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    return numbered_list("Conclusiones", snapshot.conclusiones)
+
+
+@section("anexos")
+def render_annexes(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    return numbered_list("Anexos", snapshot.anexos)
+
+
+@section("pie")
+def render_closing(snapshot: ClaimSnapshot, ctx: RenderContext) -> list:
+    # Sin marcas de variante: la misma renderización se entrega sin firma o se firma después
+    story = [Spacer(1, 20)]
+    story.append(Paragraph(
+        f"Fecha de Generación: {ctx.generated_at.strftime('%d/%m/%Y %H:%M:%S')}", STYLES["normal"]
+    ))
+    return story
+
+
+# ---------------------------------------------------------------------------
+# Render
+# ---------------------------------------------------------------------------
+def _draw_page_number(canvas, doc):
+    canvas.saveState()
+    canvas.setFont(FONT_REGULAR, 8)
+    canvas.setFillColor(colors.grey)
+    canvas.drawRightString(PAGE_SIZE[0] - MARGIN, 0.6 * inch, f"Página {doc.page}")
+    canvas.restoreState()
+
+
+def build_story(snapshot: ClaimSnapshot, ctx: RenderContext, sections: Optional[List[str]] = None) -> list:
+    story = []
+    for name, renderer in SECTIONS:
+        if sections is not None and name not in sections:
+            continue
+        try:
+            story.extend(renderer(snapshot, ctx))
+        except Exception as e:
+            # Una sección defectuosa no debe impedir el resto del informe
+            logger.error(f"❌ Error en la sección '{name}' del siniestro {snapshot.id}: {e}")
+            ctx.failures.append(f"sección {name}")
+    return story
+
+
+def render_report(snapshot: ClaimSnapshot, output, ctx: Optional[RenderContext] = None,
+                  sections: Optional[List[str]] = None) -> int:
+    """
+    Renderiza el informe en `output` (cualquier objeto archivo binario).
+
+    Returns:
+        int: Número de páginas generadas
+    """
+    ctx = ctx or RenderContext()
+    doc = SimpleDocTemplate(
+        output,
+        pagesize=PAGE_SIZE,
+        topMargin=MARGIN,
+        bottomMargin=MARGIN,
+        leftMargin=MARGIN,
+        rightMargin=MARGIN,
+        title=f"Informe de siniestro {snapshot.get('reclamo_num') or snapshot.id}",
+    )
+    doc.build(build_story(snapshot, ctx, sections), onFirstPage=_draw_page_number, onLaterPages=_draw_page_number)
+    return doc.page
+
+
+def render_error_pdf(message: str = "ERROR: No se pudo generar el PDF") -> bytes:
+    """PDF mínimo de error"""
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=PAGE_SIZE).build([Paragraph(escape(message), STYLES["normal"])])
+    return buffer.getvalue()
@@ -0,0 +1,119 @@
+"""
+ETags, GET condicionales y caché de respuestas JSON serializadas
+
+El detalle de un siniestro se identifica por (id, version); la versión sube
+con cualquier escritura del siniestro o de sus entidades relacionadas (ver
+bump_claim_versions en app/models/siniestro.py). El ETag se obtiene con una
+consulta de una sola columna y, si coincide con If-None-Match, se responde 304
+sin cargar el ORM ni pasar por Pydantic. Si no coincide, el
+JSON ya serializado se busca en una LRU en memoria con la misma clave; como la
+versión forma parte de la clave, una escritura nunca sirve datos viejos (las
+entradas obsoletas simplemente dejan de usarse y salen por LRU).
+
+El listado usa como ETag un hash de los pares (id, version) de la página.
+
+RESPONSE_CACHE_SIZE=0 desactiva la LRU (los ETag y los 304 se mantienen).
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Hashable, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from . import metrics
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Los clientes guardan la respuesta pero revalidan siempre con If-None-Match
+CACHE_CONTROL = "private, no-cache"
+
+
+def version_token(value) -> str:
+    """Representación compacta y estable de una versión (timestamp o contador)"""
+    if isinstance(value, datetime):
+        return format(int(value.timestamp() * 1_000_000), "x")
+    return str(value)
+
+
+def claim_etag(siniestro_id: int, version) -> str:
+    return f'W/"s{siniestro_id}-{version_token(version)}"'
+
+
+def list_etag(rows: Iterable[Tuple[int, object]], *params) -> str:
+    """ETag de una página: hash de los pares (id, versión) y de los parámetros de la consulta"""
+    digest = hashlib.sha1(repr(params).encode())
+    for siniestro_id, version in rows:
+        digest.update(f"{siniestro_id}:{version_token(version)};".encode())
+    return f'W/"l{digest.hexdigest()[:20]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match con comparación débil (RFC 9110 §13.1.2)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    metrics.RESPONSE_CACHE.labels("not_modified").inc()
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def json_response(body: bytes, etag: str) -> Response:
+    return Response(
+        body, media_type="application/json", headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
+
+
+class JsonLRU:
+    """LRU de cuerpos JSON serializados, acotada por cantidad de entradas y por bytes"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        if not self.max_entries:
+            return None
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+        metrics.RESPONSE_CACHE.labels("hit" if body is not None else "miss").inc()
+        return body
+
+    def put(self, key: Hashable, body: bytes):
+        if not self.max_entries or len(body) > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._entries.pop(key, None)
+            if anterior is not None:
+                self.size_bytes -= len(anterior)
+            self._entries[key] = body
+            self.size_bytes += len(body)
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                _, expulsado = self._entries.popitem(last=False)
+                self.size_bytes -= len(expulsado)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entradas": len(self._entries), "bytes": self.size_bytes, "max_entradas": self.max_entries}
+
+
+cache = JsonLRU(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_MAX_BYTES)
@@ -0,0 +1,288 @@
+"""
+Mapa estático de la ubicación del siniestro para los informes PDF
+
+Compone el mapa a partir de teselas (tiles) web-mercator, con dos cachés en
+disco con desalojo LRU:
+  - teselas descargadas, compartidas entre todos los informes
+  - imágenes ya renderizadas, por coordenadas redondeadas, zoom y tamaño
+
+Con MAP_TILE_SOURCE=online las teselas se descargan de MAP_TILE_URL, que debe
+configurarse explícitamente con un servidor cuya política de uso lo permita
+(los servidores públicos de OpenStreetMap no admiten tráfico de producción).
+Con MAP_TILE_SOURCE=offline no se usa la red: las teselas se leen de
+MAP_OFFLINE_TILES_DIR ({z}/{x}/{y}.png) o se generan localmente (fondo neutro
+con cuadrícula), lo que permite renderizar en pruebas y entornos aislados.
+Con MAP_TILE_SOURCE=none (por defecto) los informes se generan sin mapa.
+"""
+import hashlib
+import io
+import logging
+import math
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from PIL import Image, ImageDraw
+
+logger = logging.getLogger(__name__)
+
+# Configuración desde variables de entorno
+MAP_TILE_SOURCE = os.getenv('MAP_TILE_SOURCE', 'none')  # online | offline | none
+MAP_TILE_URL = os.getenv('MAP_TILE_URL', '')  # p. ej. https://tiles.ejemplo.com/{z}/{x}/{y}.png
+MAP_OFFLINE_TILES_DIR = os.getenv('MAP_OFFLINE_TILES_DIR', '')
+MAP_CACHE_DIR = os.getenv('MAP_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'siniestros_mapas'))
+MAP_TILE_CACHE_MAX_MB = int(os.getenv('MAP_TILE_CACHE_MAX_MB', '200'))
+MAP_RENDER_CACHE_MAX_MB = int(os.getenv('MAP_RENDER_CACHE_MAX_MB', '50'))
+MAP_ZOOM = int(os.getenv('MAP_ZOOM', '16'))
+MAP_WIDTH = int(os.getenv('MAP_WIDTH', '900'))
+MAP_HEIGHT = int(os.getenv('MAP_HEIGHT', '450'))
+MAP_REQUEST_TIMEOUT = float(os.getenv('MAP_REQUEST_TIMEOUT', '5'))
+# Decimales de redondeo para la clave de la caché de imágenes (5 ≈ 1 m)
+MAP_COORD_DECIMALS = int(os.getenv('MAP_COORD_DECIMALS', '5'))
+
+TILE_SIZE = 256
+_USER_AGENT = "SiniestrosInformes/1.0 (static map renderer)"
+# Cada servidor de teselas tiene su propio subdirectorio en la caché
+_TILE_NAMESPACE = 'offline' if MAP_TILE_SOURCE == 'offline' else hashlib.sha1(MAP_TILE_URL.encode()).hexdigest()[:12]
+# Escrituras entre relecturas del índice desde el disco (ver DiskLRUCache)
+_CACHE_RESCAN_EVERY = int(os.getenv('CACHE_RESCAN_EVERY', '100'))
+
+
+class DiskLRUCache:
+    """
+    Caché de archivos en disco limitada por tamaño total, desalojando el menos usado
+
+    El directorio se comparte entre procesos (workers de uvicorn, pdf_worker):
+    get() adopta los archivos que escribió otro proceso, y cada proceso relee el
+    índice desde el disco cada _CACHE_RESCAN_EVERY escrituras para contar
+    también los ajenos. Entre relecturas el uso en disco puede superar
+    max_bytes en lo que escriban los demás procesos.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = None  # OrderedDict ruta -> tamaño, del menos al más reciente
+        self._total = 0
+        self._writes_since_load = 0
+
+    def _load(self):
+        """Reconstruye el índice LRU desde el disco (orden por fecha de acceso)"""
+        os.makedirs(self.directory, exist_ok=True)
+        archivos = []
+        for raiz, _, nombres in os.walk(self.directory):
+            for nombre in nombres:
+                ruta = os.path.join(raiz, nombre)
+                try:
+                    stat = os.stat(ruta)
+                except OSError:
+                    continue
+                archivos.append((stat.st_mtime, ruta, stat.st_size))
+        archivos.sort()
+        self._entries = OrderedDict((ruta, tamano) for _, ruta, tamano in archivos)
+        self._total = sum(self._entries.values())
+        self._writes_since_load = 0
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[str]:
+        """Ruta del archivo si está en caché (y lo marca como usado recientemente)"""
+        ruta = self.path_for(key)
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            try:
+                tamano = os.path.getsize(ruta)
+            except OSError:
+                # Desalojado (por este u otro proceso) o nunca escrito
+                self._total -= self._entries.pop(ruta, 0)
+                return None
+            if ruta in self._entries:
+                self._entries.move_to_end(ruta)
+            else:
+                # Escrito por otro proceso después de cargar el índice
+                self._entries[ruta] = tamano
+                self._total += tamano
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        return ruta
+
+    def put(self, key: str, data: bytes) -> str:
+        return self.put_stream(key, io.BytesIO(data))
+
+    def put_stream(self, key: str, source) -> str:
+        """Guarda el contenido de un archivo abierto copiándolo por bloques (sin cargarlo entero)"""
+        ruta = self.path_for(key)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        # Escritura atómica para que otro worker nunca lea un archivo a medias
+        fd, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(source, f)
+                tamano = f.tell()
+            os.replace(temporal, ruta)
+        except BaseException:
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            if self._entries is None or self._writes_since_load >= _CACHE_RESCAN_EVERY:
+                self._load()
+            self._writes_since_load += 1
+            self._total -= self._entries.pop(ruta, 0)
+            self._entries[ruta] = tamano
+            self._total += tamano
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                viejo, tamano = self._entries.popitem(last=False)
+                self._total -= tamano
+                try:
+                    os.remove(viejo)
+                except OSError:
+                    pass
+        return ruta
+
+
+tile_cache = DiskLRUCache(os.path.join(MAP_CACHE_DIR, 'tiles'), MAP_TILE_CACHE_MAX_MB * 1024 * 1024)
+render_cache = DiskLRUCache(os.path.join(MAP_CACHE_DIR, 'renders'), MAP_RENDER_CACHE_MAX_MB * 1024 * 1024)
+
+
+def _generate_offline_tile(z: int, x: int, y: int) -> bytes:
+    """Tesela neutra generada localmente (sin red)"""
+    tile = Image.new('RGB', (TILE_SIZE, TILE_SIZE), (236, 236, 228))
+    draw = ImageDraw.Draw(tile)
+    for i in range(0, TILE_SIZE, 64):
+        draw.line([(i, 0), (i, TILE_SIZE)], fill=(214, 214, 206))
+        draw.line([(0, i), (TILE_SIZE, i)], fill=(214, 214, 206))
+    buffer = io.BytesIO()
+    tile.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _fetch_tile(z: int, x: int, y: int) -> bytes:
+    if MAP_TILE_SOURCE == 'offline':
+        if MAP_OFFLINE_TILES_DIR:
+            ruta = os.path.join(MAP_OFFLINE_TILES_DIR, str(z), str(x), f"{y}.png")
+            if os.path.exists(ruta):
+                with open(ruta, 'rb') as f:
+                    return f.read()
+        return _generate_offline_tile(z, x, y)
+
+    import requests
+
+    url = MAP_TILE_URL.format(z=z, x=x, y=y)
+    response = requests.get(url, timeout=MAP_REQUEST_TIMEOUT, headers={"User-Agent": _USER_AGENT})
+    response.raise_for_status()
+    return response.content
+
+
+def get_tile(z: int, x: int, y: int) -> Image.Image:
+    """Tesela desde la caché en disco, descargándola solo si falta"""
+    n = 2 ** z
+    x = x % n  # La longitud da la vuelta al mundo
+    key = os.path.join(_TILE_NAMESPACE, str(z), str(x), f"{y}.png")
+    ruta = tile_cache.get(key)
+    if ruta is None:
+        ruta = tile_cache.put(key, _fetch_tile(z, x, y))
+    tile = Image.open(ruta)
+    tile.load()
+    return tile.convert('RGB')
+
+
+def _to_pixels(lat: float, lng: float, zoom: int) -> tuple:
+    """Coordenadas en píxeles globales web-mercator"""
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    escala = TILE_SIZE * (2 ** zoom)
+    x = (lng + 180.0) / 360.0 * escala
+    lat_rad = math.radians(lat)
+    y = (1.0 - math.log(math.tan(lat_rad) + 1.0 / math.cos(lat_rad)) / math.pi) / 2.0 * escala
+    return x, y
+
+
+def _render(lat: float, lng: float, zoom: int, width: int, height: int) -> bytes:
+    cx, cy = _to_pixels(lat, lng, zoom)
+    izquierda = cx - width / 2
+    arriba = cy - height / 2
+
+    x0 = math.floor(izquierda / TILE_SIZE)
+    x1 = math.floor((izquierda + width) / TILE_SIZE)
+    y0 = max(math.floor(arriba / TILE_SIZE), 0)
+    y1 = min(math.floor((arriba + height) / TILE_SIZE), 2 ** zoom - 1)
+    coordenadas = [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+    with ThreadPoolExecutor(max_workers=min(len(coordenadas), 8)) as pool:
+        teselas = list(pool.map(lambda c: get_tile(zoom, c[0], c[1]), coordenadas))
+
+    imagen = Image.new('RGB', (width, height), (236, 236, 228))
+    for (x, y), tile in zip(coordenadas, teselas):
+        imagen.paste(tile, (round(x * TILE_SIZE - izquierda), round(y * TILE_SIZE - arriba)))
+
+    # Marcador del punto del siniestro
+    draw = ImageDraw.Draw(imagen)
+    mx, my = width / 2, height / 2
+    draw.ellipse([mx - 11, my - 11, mx + 11, my + 11], fill=(255, 255, 255))
+    draw.ellipse([mx - 8, my - 8, mx + 8, my + 8], fill=(200, 30, 30))
+
+    if MAP_TILE_SOURCE != 'offline':
+        texto = "© OpenStreetMap contributors"
+        draw.rectangle([width - 170, height - 14, width, height], fill=(255, 255, 255))
+        draw.text((width - 166, height - 13), texto, fill=(60, 60, 60))
+
+    buffer = io.BytesIO()
+    imagen.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def render_incident_map(lat: float, lng: float, zoom: int = None, width: int = None,
+                        height: int = None) -> Optional[io.BytesIO]:
+    """
+    PNG con el mapa centrado en el punto del siniestro
+
+    Returns:
+        BytesIO: Imagen en memoria (no la ruta en la caché: otro render podría
+        desalojar el archivo antes de que ReportLab lo lea), o None si no se
+        pudo obtener el mapa (el informe continúa sin mapa)
+    """
+    if lat is None or lng is None or MAP_TILE_SOURCE == 'none':
+        return None
+    if MAP_TILE_SOURCE == 'online' and not MAP_TILE_URL:
+        logger.warning("⚠️ MAP_TILE_SOURCE=online sin MAP_TILE_URL configurada: informe sin mapa")
+        return None
+
+    zoom = zoom or MAP_ZOOM
+    width = width or MAP_WIDTH
+    height = height or MAP_HEIGHT
+    lat = round(float(lat), MAP_COORD_DECIMALS)
+    lng = round(float(lng), MAP_COORD_DECIMALS)
+
+    clave = f"{_TILE_NAMESPACE}|{lat}|{lng}|{zoom}|{width}x{height}"
+    key = hashlib.sha1(clave.encode()).hexdigest() + ".png"
+
+    ruta = render_cache.get(key)
+    if ruta:
+        try:
+            with open(ruta, 'rb') as f:
+                return io.BytesIO(f.read())
+        except OSError:
+            pass  # Desalojado entre get() y open(): se vuelve a renderizar
+
+    try:
+        imagen = _render(lat, lng, zoom, width, height)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo renderizar el mapa ({lat}, {lng}): {e}")
+        return None
+    try:
+        render_cache.put(key, imagen)
+    except OSError as e:
+        logger.warning(f"⚠️ No se pudo guardar el mapa en la caché: {e}")
+    return io.BytesIO(imagen)
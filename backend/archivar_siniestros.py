@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Job de archivo de siniestros antiguos (ver app/services/archive_service.py).
+Mueve a las tablas de archivo los siniestros cerrados sin cambios y los
+eliminados hace más de --meses meses, en lotes de --tamano-lote por transacción.
+
+Ejecutar desde el directorio backend: python archivar_siniestros.py [--meses 24] [--simular]
+En Railway se programa como servicio cron (p. ej. "0 4 * * 0").
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+# Agregar el directorio actual al path para importar módulos
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.database import SessionLocal
+from app.services.archive_service import (
+    ARCHIVO_MESES, ARCHIVO_TAMANO_LOTE, archivar_siniestros, contar_archivables, fecha_corte,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archivo de siniestros cerrados y eliminados antiguos")
+    parser.add_argument("--meses", type=int, default=ARCHIVO_MESES)
+    parser.add_argument("--tamano-lote", type=int, default=ARCHIVO_TAMANO_LOTE)
+    parser.add_argument("--max-lotes", type=int, default=None)
+    parser.add_argument("--simular", action="store_true", help="Solo contar los siniestros archivables")
+    args = parser.parse_args()
+
+    if args.simular:
+        db = SessionLocal()
+        try:
+            corte = fecha_corte(db, args.meses)
+            logger.info(f"🗄️ {contar_archivables(db, corte)} siniestros archivables (antes del {corte:%Y-%m-%d})")
+        finally:
+            db.close()
+        sys.exit(0)
+
+    logger.info("🗄️ INICIANDO ARCHIVO DE SINIESTROS ANTIGUOS")
+    inicio = time.perf_counter()
+    try:
+        total = archivar_siniestros(SessionLocal, args.meses, args.tamano_lote, args.max_lotes)
+    except Exception as e:
+        logger.error(f"❌ Error en el archivo de siniestros: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        sys.exit(1)
+
+    logger.info(f"🎉 {total} siniestros archivados en {time.perf_counter() - inicio:.1f} s")
@@ -0,0 +1,242 @@
+"""
+Benchmark de generación de informes PDF
+
+Mide por separado generate_unsigned_pdf (render), generate_simple_pdf
+(render + firma) y sign_pdf (solo firma) sobre siniestros sintéticos de
+distinto tamaño, con imágenes servidas por un servidor HTTP local y un
+certificado autofirmado generado al vuelo. No necesita base de datos, S3 ni
+red: el almacén de informes, las cachés y el mapa (teselas offline) usan un
+directorio temporal.
+
+Reporta p50/p95, páginas por segundo y pico de memoria (tracemalloc, en una
+pasada aparte para no distorsionar los tiempos), guarda los resultados en
+JSON y los compara con la ejecución anterior.
+
+Uso (desde backend/):
+    python benchmarks/bench_pdf.py
+    python benchmarks/bench_pdf.py --casos 0x0,50x20,200x50 --repeticiones 10
+    python benchmarks/bench_pdf.py --fallar-si-regresion --umbral 15
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_CERT_PASSWORD = "benchmark"
+
+
+def _crear_certificado(ruta: str):
+    """Certificado P12 autofirmado para medir la firma sin el certificado real"""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.hazmat.primitives.serialization import pkcs12
+    from cryptography.x509.oid import NameOID
+
+    clave = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    nombre = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "Benchmark Siniestros")])
+    ahora = datetime.datetime.now(datetime.timezone.utc)
+    certificado = (
+        x509.CertificateBuilder()
+        .subject_name(nombre)
+        .issuer_name(nombre)
+        .public_key(clave.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(ahora - datetime.timedelta(days=1))
+        .not_valid_after(ahora + datetime.timedelta(days=365))
+        .sign(clave, hashes.SHA256())
+    )
+    with open(ruta, "wb") as f:
+        f.write(pkcs12.serialize_key_and_certificates(
+            b"benchmark", clave, certificado, None,
+            serialization.BestAvailableEncryption(_CERT_PASSWORD.encode()),
+        ))
+
+
+def _configurar_entorno(directorio: str):
+    """Variables leídas al importar los módulos de la app: deben fijarse antes"""
+    cert = os.path.join(directorio, "benchmark.p12")
+    _crear_certificado(cert)
+    os.environ.update({
+        "CERT_LOCAL_PATH": cert,
+        "CERT_PASSWORD": _CERT_PASSWORD,
+        "PDF_STORE_BACKEND": "local",
+        "PDF_STORE_DIR": os.path.join(directorio, "informes"),
+        "PDF_IMAGE_CACHE_DIR": os.path.join(directorio, "imagenes"),
+        "MAP_CACHE_DIR": os.path.join(directorio, "mapas"),
+    })
+    os.environ.setdefault("MAP_TILE_SOURCE", "offline")
+    return cert
+
+
+def contar_paginas(pdf_data: bytes) -> int:
+    """/Count del árbol de páginas (la firma incremental repite el objeto de la primera página)"""
+    return max((int(n) for n in re.findall(rb"/Count\s+(\d+)", pdf_data)), default=0)
+
+
+def percentil(valores, p: float) -> float:
+    """Percentil por rango más cercano"""
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def _medir_memoria(funcion) -> float:
+    tracemalloc.start()
+    try:
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico / (1024 * 1024)
+
+
+def ejecutar_caso(caso: str, repeticiones: int, palabras: int, imagenes_en_cache: bool,
+                  image_server, cert_data: bytes, id_base: int) -> list:
+    from app.utils.pdf_generator import generate_simple_pdf, generate_unsigned_pdf, sign_pdf
+    from synthetic_claims import build_claim
+
+    entradas, imagenes = (int(x) for x in caso.split("x"))
+    contador = iter(range(id_base, id_base + 100000))
+
+    def nuevo_siniestro():
+        # Id distinto por ejecución: el almacén de informes no reutiliza renders anteriores
+        claim_id = next(contador)
+        carpeta = "comun" if imagenes_en_cache else str(claim_id)
+        return build_claim(
+            claim_id, relatos=entradas, inspecciones=entradas, testigos=max(1, entradas // 10),
+            imagenes=imagenes, palabras_por_texto=palabras, image_base_url=f"{image_server.base_url}/{carpeta}",
+        )
+
+    funciones = {
+        "generate_unsigned_pdf": lambda: generate_unsigned_pdf(nuevo_siniestro()),
+        "generate_simple_pdf": lambda: generate_simple_pdf(nuevo_siniestro()),
+    }
+    pdf_base = generate_unsigned_pdf(nuevo_siniestro())
+    funciones["sign_pdf"] = lambda: sign_pdf(pdf_base, cert_data, _CERT_PASSWORD)
+
+    resultados = []
+    for nombre, funcion in funciones.items():
+        tiempos = []
+        pdf_data = b""
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            pdf_data = funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        paginas = contar_paginas(pdf_data)
+        p50 = percentil(tiempos, 50)
+        resultados.append({
+            "caso": caso,
+            "funcion": nombre,
+            "repeticiones": repeticiones,
+            "p50_ms": round(p50 * 1000, 2),
+            "p95_ms": round(percentil(tiempos, 95) * 1000, 2),
+            "paginas": paginas,
+            "paginas_por_segundo": round(paginas / p50, 2) if p50 else None,
+            "bytes": len(pdf_data),
+            "pico_memoria_mb": round(_medir_memoria(funcion), 2),
+        })
+    return resultados
+
+
+def _commit_actual() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return ""
+
+
+def comparar(actual: dict, anterior: dict, umbral: float) -> list:
+    """Casos cuyo p50 empeoró más de `umbral` % respecto a la ejecución anterior"""
+    previos = {(r["caso"], r["funcion"]): r for r in anterior["resultados"]}
+    regresiones = []
+    print(f"\nComparación con {anterior['fecha']} ({anterior.get('commit') or 'sin commit'}):")
+    for r in actual["resultados"]:
+        previo = previos.get((r["caso"], r["funcion"]))
+        if not previo or not previo["p50_ms"]:
+            continue
+        delta = (r["p50_ms"] - previo["p50_ms"]) / previo["p50_ms"] * 100
+        marca = "⚠️ " if delta > umbral else "   "
+        print(f"{marca}{r['caso']:>8} {r['funcion']:<22} p50 {previo['p50_ms']:>9.1f} → {r['p50_ms']:>9.1f} ms "
+              f"({delta:+.1f}%)")
+        if delta > umbral:
+            regresiones.append(r)
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de generación de informes PDF")
+    parser.add_argument("--casos", default="0x0,10x5,50x20,200x50",
+                        help="Casos 'entradas x imágenes': relatos e inspecciones por siniestro y número de imágenes")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--palabras", type=int, default=150, help="Palabras por texto largo")
+    parser.add_argument("--imagenes-en-cache", action="store_true",
+                        help="Reutilizar las imágenes ya preparadas (por defecto se descargan y reducen en cada render)")
+    parser.add_argument("--salida", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "results"))
+    parser.add_argument("--umbral", type=float, default=10.0, help="Regresión de p50 tolerada (%%)")
+    parser.add_argument("--fallar-si-regresion", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_pdf_") as directorio:
+        cert = _configurar_entorno(directorio)
+        with open(cert, "rb") as f:
+            cert_data = f.read()
+
+        import logging
+        logging.disable(logging.WARNING)  # Los logs INFO/WARNING por informe distorsionan los tiempos
+
+        from synthetic_claims import ImageServer
+
+        resultados = []
+        with ImageServer() as image_server:
+            # Calentamiento: fuentes, mapa y primer uso del certificado fuera de la medición
+            ejecutar_caso("0x1", 1, 20, False, image_server, cert_data, id_base=1)
+
+            print(f"{'caso':>8} {'función':<22} {'p50 ms':>9} {'p95 ms':>9} {'págs':>5} {'págs/s':>8} {'pico MB':>8}")
+            for indice, caso in enumerate(args.casos.split(","), start=1):
+                for r in ejecutar_caso(caso, args.repeticiones, args.palabras, args.imagenes_en_cache,
+                                       image_server, cert_data, id_base=indice * 1_000_000):
+                    print(f"{r['caso']:>8} {r['funcion']:<22} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+                          f"{r['paginas']:>5} {r['paginas_por_segundo'] or 0:>8.1f} {r['pico_memoria_mb']:>8.1f}")
+                    resultados.append(r)
+
+    actual = {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("salida", "fallar_si_regresion")},
+        "resultados": resultados,
+    }
+
+    os.makedirs(args.salida, exist_ok=True)
+    anteriores = sorted(glob.glob(os.path.join(args.salida, "bench_pdf_*.json")))
+    ruta = os.path.join(args.salida, f"bench_pdf_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(actual, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados guardados en {ruta}")
+
+    regresiones = []
+    if anteriores:
+        with open(anteriores[-1], encoding="utf-8") as f:
+            regresiones = comparar(actual, json.load(f), args.umbral)
+
+    if regresiones and args.fallar_si_regresion:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
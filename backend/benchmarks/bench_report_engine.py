@@ -0,0 +1,117 @@
+"""
+Benchmark del motor de informes PDF
+
+Renderiza instantáneas sintéticas de distinto tamaño (sin base de datos ni
+red) y reporta el tiempo por informe y por página.
+
+Uso (desde backend/):
+    MAP_TILE_SOURCE=offline python benchmarks/bench_report_engine.py --repeticiones 5
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.report_engine import ClaimSnapshot, RenderContext, render_report  # noqa: E402
+
+PARRAFO = (
+    "El asegurado manifiesta que el vehículo se encontraba estacionado frente a su domicilio "
+    "cuando fue sustraído durante la madrugada; los vecinos indican haber escuchado ruidos "
+    "y observado a dos personas manipulando la cerradura de la puerta del conductor. "
+)
+
+
+def snapshot_sintetico(entradas: int, parrafos: int = 3) -> ClaimSnapshot:
+    """Siniestro con `entradas` relatos, inspecciones, testigos y elementos en cada lista"""
+    fecha = datetime(2024, 3, 15, 2, 30)
+    texto = PARRAFO * parrafos
+
+    def numerados():
+        return [{"numero": i + 1, "texto": texto, "imagen_url": None} for i in range(entradas)]
+
+    return ClaimSnapshot(
+        id=1,
+        fields={
+            "compania_seguros": "Seguros Equinoccial S.A.",
+            "ruc_compania": "1790010937001",
+            "tipo_reclamo": "ROBO",
+            "poliza": "POL-2024-000123",
+            "reclamo_num": "REC-BENCH-0001",
+            "fecha_siniestro": fecha,
+            "fecha_reportado": fecha + timedelta(days=1),
+            "fecha_designacion": fecha + timedelta(days=3),
+            "direccion_siniestro": "Av. Amazonas N34-120 y Av. Atahualpa, Quito",
+            "ubicacion_geo_lat": -0.1807,
+            "ubicacion_geo_lng": -78.4678,
+            "danos_terceros": False,
+            "ejecutivo_cargo": "María Espinosa",
+            "tipo_siniestro": "Vehicular",
+            "cobertura": "Todo riesgo",
+            "persona_declara_nombre": "Juan Pérez",
+            "persona_declara_cedula": "1710034065",
+            "evidencias_complementarias": texto,
+            "otras_diligencias": texto,
+        },
+        asegurado={
+            "tipo": "Natural", "cedula": "1710034065", "nombre": "Juan Pérez", "celular": "0991234567",
+            "correo": "juan@example.com", "direccion": "Quito", "parentesco": None, "ruc": None,
+            "empresa": None, "representante_legal": None, "telefono": None,
+        },
+        conductor={"nombre": "Juan Pérez", "cedula": "1710034065", "celular": "0991234567",
+                   "direccion": "Quito", "parentesco": "Titular"},
+        objeto_asegurado={"placa": "PBA-1234", "marca": "Chevrolet", "modelo": "Sail", "tipo": "Sedán",
+                          "color": "Blanco", "ano": 2020, "serie_motor": "MTR123456", "chasis": "CHS987654"},
+        antecedentes=[texto] * max(1, entradas // 4),
+        relatos=numerados(),
+        inspecciones=numerados(),
+        testigos=numerados(),
+        dinamica_accidente=texto,
+        observaciones=[PARRAFO] * entradas,
+        recomendaciones=[PARRAFO] * max(1, entradas // 2),
+        conclusiones=[PARRAFO] * entradas,
+        anexos=[f"Anexo {i + 1}" for i in range(entradas)],
+    )
+
+
+def medir(snapshot: ClaimSnapshot, repeticiones: int) -> dict:
+    tiempos = []
+    paginas = 0
+    tamano = 0
+    for _ in range(repeticiones):
+        buffer = io.BytesIO()
+        inicio = time.perf_counter()
+        paginas = render_report(snapshot, buffer, RenderContext())
+        tiempos.append(time.perf_counter() - inicio)
+        tamano = buffer.tell()
+    mediana = statistics.median(tiempos)
+    return {
+        "paginas": paginas,
+        "bytes": tamano,
+        "mediana_ms": mediana * 1000,
+        "ms_por_pagina": mediana * 1000 / max(paginas, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor de informes PDF")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--tamanos", default="1,10,50,200", help="Entradas por sección, separadas por comas")
+    args = parser.parse_args()
+
+    # Primer render fuera de la medición (carga de fuentes, mapa en caché)
+    render_report(snapshot_sintetico(1), io.BytesIO())
+
+    print(f"{'entradas':>9} {'páginas':>8} {'KB':>8} {'ms/informe':>11} {'ms/página':>10}")
+    for entradas in (int(t) for t in args.tamanos.split(",")):
+        r = medir(snapshot_sintetico(entradas), args.repeticiones)
+        print(f"{entradas:>9} {r['paginas']:>8} {r['bytes'] / 1024:>8.1f} "
+              f"{r['mediana_ms']:>11.1f} {r['ms_por_pagina']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark de serialización de respuestas de siniestros
+
+Compara, sobre siniestros sintéticos (objetos ORM transitorios, sin base de
+datos), tres formas de producir el JSON de una respuesta:
+
+- fastapi:  lo que hace FastAPI con un response_model (validación
+            from_attributes, dump a Python en modo JSON y json.dumps)
+- pydantic: model_validate + model_dump_json (serializador en Rust)
+- rapida:   app.utils.fast_json (plan por schema, sin validar, orjson)
+
+Casos: el listado (`--lista` siniestros, SiniestroResponse) y el detalle
+completo (SiniestroFullResponse) con `--tamanos` relatos/inspecciones por
+siniestro. Verifica que las tres salidas representen el mismo JSON.
+
+Uso (desde backend/):
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --lista 500 --tamanos 10,50,200 --repeticiones 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from app import schemas  # noqa: E402
+from app.utils import fast_json  # noqa: E402
+from synthetic_claims import build_claim  # noqa: E402
+
+
+def siniestro_persistido(claim_id: int, entradas: int):
+    """Siniestro sintético con los campos que la base completa al guardar (IDs, fechas, versión)"""
+    siniestro = build_claim(claim_id, relatos=entradas, inspecciones=entradas, testigos=max(1, entradas // 3))
+    creado = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(hours=claim_id, microseconds=claim_id * 1001)
+    siniestro.created_at = creado
+    siniestro.updated_at = creado + timedelta(days=1)
+    siniestro.version = 1
+    siniestro.fecha_siniestro = siniestro.fecha_siniestro.replace(tzinfo=timezone.utc)
+    siguiente_id = claim_id * 10_000
+    for hijo in (siniestro.asegurado, siniestro.conductor, siniestro.objeto_asegurado, siniestro.beneficiario,
+                 *siniestro.antecedentes, *siniestro.relatos_asegurado, *siniestro.inspecciones, *siniestro.testigos):
+        siguiente_id += 1
+        hijo.id = siguiente_id
+        hijo.siniestro_id = claim_id
+    return siniestro
+
+
+def caminos(modelo, es_lista: bool) -> dict:
+    """Funciones objeto(s) ORM -> bytes JSON para cada camino"""
+    tipo = List[modelo] if es_lista else modelo
+    adaptador = TypeAdapter(tipo)
+
+    def fastapi(valor):
+        validado = adaptador.validate_python(valor, from_attributes=True)
+        contenido = adaptador.dump_python(validado, mode="json")
+        return json.dumps(contenido, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+    if es_lista:
+        def pydantic(valor):
+            return adaptador.dump_json([modelo.model_validate(s) for s in valor])
+
+        def rapida(valor):
+            return fast_json.dump_models(valor, modelo)
+    else:
+        def pydantic(valor):
+            return modelo.model_validate(valor).model_dump_json().encode()
+
+        def rapida(valor):
+            return fast_json.dump_model(valor, modelo)
+
+    return {"fastapi": fastapi, "pydantic": pydantic, "rapida": rapida}
+
+
+def medir(funcion, valor, repeticiones: int) -> dict:
+    funcion(valor)  # Calentamiento (planes, adaptadores)
+    tiempos = []
+    tamano = 0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        tamano = len(funcion(valor))
+        tiempos.append(time.perf_counter() - inicio)
+    mediana = statistics.median(tiempos)
+    return {"mediana_ms": mediana * 1000, "por_segundo": 1 / mediana, "bytes": tamano}
+
+
+def comparar(nombre: str, valor, modelo, es_lista: bool, repeticiones: int):
+    funciones = caminos(modelo, es_lista)
+    salidas = {camino: json.loads(f(valor)) for camino, f in funciones.items()}
+    if not all(s == salidas["fastapi"] for s in salidas.values()):
+        raise SystemExit(f"❌ {nombre}: las salidas de los caminos no coinciden")
+
+    resultados = {camino: medir(f, valor, repeticiones) for camino, f in funciones.items()}
+    base = resultados["fastapi"]["mediana_ms"]
+    for camino, r in resultados.items():
+        print(f"{nombre:>16} {camino:>9} {r['bytes'] / 1024:>9.1f} {r['mediana_ms']:>9.2f} "
+              f"{r['por_segundo']:>10.0f} {base / r['mediana_ms']:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de respuestas de siniestros")
+    parser.add_argument("--repeticiones", type=int, default=30)
+    parser.add_argument("--lista", type=int, default=100, help="Siniestros en la página del listado")
+    parser.add_argument("--tamanos", default="10,50,200", help="Relatos e inspecciones por detalle, separados por comas")
+    args = parser.parse_args()
+
+    if not fast_json.enabled():
+        print("⚠️ orjson no disponible o FAST_SERIALIZATION=false: 'rapida' usa el camino de Pydantic")
+
+    print(f"{'caso':>16} {'camino':>9} {'KB':>9} {'ms':>9} {'resp/s':>10} {'vs fastapi':>9}")
+    pagina = [siniestro_persistido(i + 1, 10) for i in range(args.lista)]
+    comparar(f"lista x{args.lista}", pagina, schemas.SiniestroResponse, True, args.repeticiones)
+    for entradas in (int(t) for t in args.tamanos.split(",")):
+        comparar(f"detalle {entradas}", siniestro_persistido(1, entradas), schemas.SiniestroFullResponse,
+                 False, args.repeticiones)
+
+
+if __name__ == "__main__":
+    main()
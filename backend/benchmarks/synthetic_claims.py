@@ -0,0 +1,150 @@
+"""
+Siniestros sintéticos para benchmarks de informes PDF
+
+Construye objetos ORM transitorios (sin sesión ni base de datos) con todas
+sus relaciones, de tamaño configurable y reproducibles a partir de una
+semilla. Las imágenes apuntan a un servidor HTTP local que sirve fotos
+sintéticas a resolución de cámara.
+"""
+import io
+import random
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app import models
+
+_PALABRAS = (
+    "vehículo asegurado conductor parqueadero cerradura puerta ventana calle avenida intersección "
+    "testigo policía denuncia fiscalía taller daño parachoques faro lateral frontal posterior "
+    "madrugada noche tarde mañana domicilio oficina centro comercial semáforo velocidad impacto "
+    "cámara grabación vigilancia guardia recibo factura póliza cobertura deducible reparación "
+    "manifiesta indica declara observa verifica constata revisa confirma señala refiere"
+).split()
+
+_COMPANIAS = ("ZURICH SEGUROS ECUADOR S.A.", "SEGUROS EQUINOCCIAL S.A.", "SEGUROS SUCRE S.A.", "AIG METROPOLITANA")
+
+
+def texto(rng: random.Random, palabras: int) -> str:
+    """Párrafos pseudo-aleatorios en español"""
+    oraciones = []
+    restantes = palabras
+    while restantes > 0:
+        n = min(restantes, rng.randint(8, 20))
+        oracion = " ".join(rng.choice(_PALABRAS) for _ in range(n))
+        oraciones.append(oracion.capitalize() + ".")
+        restantes -= n
+    return " ".join(oraciones)
+
+
+def build_claim(claim_id: int, relatos: int = 10, inspecciones: int = 10, testigos: int = 3,
+                imagenes: int = 5, palabras_por_texto: int = 120, image_base_url: str = None,
+                seed: int = 0) -> models.Siniestro:
+    """
+    Siniestro transitorio con `relatos`, `inspecciones` y `testigos` entradas.
+    Con image_base_url, `imagenes` de ellas (primero las diligencias) llevan
+    imagen_url; URLs distintas por siniestro evitan la caché de imágenes.
+    """
+    rng = random.Random(seed * 100003 + claim_id)
+    fecha = datetime(2025, 1, 1) + timedelta(days=rng.randint(0, 300), minutes=rng.randint(0, 1440))
+
+    urls = iter([f"{image_base_url}/{i}.jpg" for i in range(imagenes)] if image_base_url else [])
+
+    def lista(n):
+        return [texto(rng, 25) for _ in range(n)]
+
+    siniestro = models.Siniestro(
+        id=claim_id,
+        compania_seguros=rng.choice(_COMPANIAS),
+        ruc_compania="1791240014001",
+        tipo_reclamo=rng.choice(("ROBO", "CHOQUE", "DAÑOS")),
+        poliza=str(rng.randint(1000, 99999)),
+        reclamo_num=f"BENCH-{seed}-{claim_id}",
+        fecha_siniestro=fecha,
+        fecha_reportado=fecha + timedelta(days=rng.randint(0, 5)),
+        fecha_designacion=fecha + timedelta(days=rng.randint(3, 15)),
+        direccion_siniestro=texto(rng, 10),
+        ubicacion_geo_lat=-0.18 + rng.uniform(-0.05, 0.05),
+        ubicacion_geo_lng=-78.48 + rng.uniform(-0.05, 0.05),
+        danos_terceros=rng.random() < 0.3,
+        tipo_siniestro="Vehicular",
+        cobertura="Todo riesgo",
+        misiva_investigacion=texto(rng, palabras_por_texto),
+        evidencias_complementarias=texto(rng, palabras_por_texto),
+        evidencias_complementarias_imagen_url=next(urls, None),
+        otras_diligencias=texto(rng, palabras_por_texto),
+        otras_diligencias_imagen_url=next(urls, None),
+        visita_taller_descripcion=texto(rng, palabras_por_texto),
+        visita_taller_imagen_url=next(urls, None),
+        observaciones=lista(5),
+        recomendacion_pago_cobertura=lista(2),
+        conclusiones=lista(4),
+        anexo=lista(3),
+    )
+    siniestro.asegurado = models.Asegurado(
+        tipo="Natural", cedula="1710034065", nombre="ASEGURADO DE PRUEBA", celular="0991234567",
+        direccion=texto(rng, 6), correo="asegurado@example.com",
+    )
+    siniestro.conductor = models.Conductor(nombre="CONDUCTOR DE PRUEBA", cedula="1710034065", celular="0991234567")
+    siniestro.objeto_asegurado = models.ObjetoAsegurado(
+        placa="PBA-1234", marca="CHEVROLET", modelo="SAIL", color="BLANCO", ano=2020,
+    )
+    siniestro.beneficiario = models.Beneficiario(razon_social="BANCO DE PRUEBA", cedula_ruc="1790010937001")
+    siniestro.antecedentes = [models.Antecedente(descripcion=texto(rng, palabras_por_texto)) for _ in range(2)]
+    # Las imágenes que no usaron las diligencias se asignan en orden a relatos, inspecciones y testigos
+    siniestro.relatos_asegurado = [
+        models.RelatoAsegurado(id=i, numero_relato=i + 1, texto=texto(rng, palabras_por_texto), imagen_url=next(urls, None))
+        for i in range(relatos)
+    ]
+    siniestro.inspecciones = [
+        models.Inspeccion(id=i, numero_inspeccion=i + 1, descripcion=texto(rng, palabras_por_texto),
+                          imagen_url=next(urls, None))
+        for i in range(inspecciones)
+    ]
+    siniestro.testigos = [
+        models.Testigo(id=i, numero_relato=i + 1, texto=texto(rng, palabras_por_texto), imagen_url=next(urls, None))
+        for i in range(testigos)
+    ]
+    return siniestro
+
+
+def _foto_sintetica(ancho: int = 3000, alto: int = 2000) -> bytes:
+    """JPEG con ruido (no se comprime trivialmente, como una foto real)"""
+    import os
+    from PIL import Image
+
+    imagen = Image.frombytes("RGB", (ancho // 4, alto // 4), os.urandom((ancho // 4) * (alto // 4) * 3))
+    imagen = imagen.resize((ancho, alto))
+    buffer = io.BytesIO()
+    imagen.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+class ImageServer:
+    """Servidor HTTP local que responde la misma foto para cualquier ruta"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        foto = _foto_sintetica()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(foto)))
+                self.end_headers()
+                self.wfile.write(foto)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self.base_url = f"http://{host}:{self._server.server_address[1]}"
+        self.image_bytes = len(foto)
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Job nocturno de detección de siniestros duplicados y señales de fraude.
+Recorre todo el historial y reemplaza el contenido de la tabla senales_fraude.
+
+Ejecutar desde el directorio backend: python detectar_duplicados.py [--ventana-dias 180]
+En Railway se programa como servicio cron (p. ej. "0 3 * * *").
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+# Agregar el directorio actual al path para importar módulos
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.database import SessionLocal
+from app.services.fraud_detector import ejecutar_analisis_completo, VENTANA_DIAS, TAMANO_LOTE
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detección nocturna de siniestros duplicados")
+    parser.add_argument("--ventana-dias", type=int, default=VENTANA_DIAS)
+    parser.add_argument("--tamano-lote", type=int, default=TAMANO_LOTE)
+    args = parser.parse_args()
+
+    logger.info("🔎 INICIANDO DETECCIÓN DE DUPLICADOS Y SEÑALES DE FRAUDE")
+    inicio = time.perf_counter()
+    try:
+        total = ejecutar_analisis_completo(SessionLocal, args.ventana_dias, args.tamano_lote)
+    except Exception as e:
+        logger.error(f"❌ Error en la detección de duplicados: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        sys.exit(1)
+
+    logger.info(f"🎉 {total} señales registradas en {time.perf_counter() - inicio:.1f} s")
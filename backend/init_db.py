@@ -46,6 +46,13 @@ def reset_database():
         Base.metadata.create_all(bind=engine)
         print("✅ All tables created successfully", flush=True)
 
+        # Spatial index (PostGIS when available, geohash B-tree otherwise)
+        from app.services.geo_service import asegurar_indice_espacial
+        if asegurar_indice_espacial(engine):
+            print("✅ PostGIS spatial index created", flush=True)
+        else:
+            print("ℹ️ PostGIS not available, using geohash index", flush=True)
+
         # Create test data automatically
         print("🧪 Creating test data...", flush=True)
         try:
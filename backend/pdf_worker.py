@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Worker de generación de informes PDF
+
+Procesa la cola trabajos_pdf (ver app/services/pdf_jobs.py). Se pueden
+ejecutar varios procesos en paralelo: cada trabajo lo toma uno solo.
+
+Si el worker corre en otra máquina que la API, configurar
+PDF_STORE_BACKEND=s3 para que ambos compartan el almacén de informes.
+
+Uso:
+    python pdf_worker.py            # procesa indefinidamente
+    python pdf_worker.py --una-vez  # procesa lo pendiente y termina
+"""
+import argparse
+import logging
+import signal
+import threading
+
+from app.database import SessionLocal
+from app.services.pdf_jobs import ejecutar_worker
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de generación de informes PDF")
+    parser.add_argument("--una-vez", action="store_true", help="Procesar los trabajos disponibles y terminar")
+    args = parser.parse_args()
+
+    detener = threading.Event()
+
+    def _senal(signum, frame):
+        logger.info(f"📴 Señal {signum} recibida, terminando tras el trabajo actual...")
+        detener.set()
+
+    signal.signal(signal.SIGTERM, _senal)
+    signal.signal(signal.SIGINT, _senal)
+
+    ejecutar_worker(SessionLocal, detener, una_vez=args.una_vez)
+
+
+if __name__ == "__main__":
+    main()
@@ -39,11 +39,12 @@ const InvestigacionRecabada: React.FC<Props> = ({ siniestroId }) => {
       const response = await axios.get(`/api/v1/siniestros/${siniestroId}`);
       setSiniestroData(response.data);
 
-      // Parse JSON strings back to arrays
-      const parseJsonArray = (jsonString: string | null): string[] => {
-        if (!jsonString) return [];
+      // Las listas llegan como arreglos (JSONB); se aceptan también textos JSON del formato anterior
+      const parseJsonArray = (value: string[] | string | null): string[] => {
+        if (!value) return [];
+        if (Array.isArray(value)) return value;
         try {
-          const parsed = JSON.parse(jsonString);
+          const parsed = JSON.parse(value);
           return Array.isArray(parsed) ? parsed : [];
         } catch {
           return [];
@@ -116,7 +117,7 @@ const InvestigacionRecabada: React.FC<Props> = ({ siniestroId }) => {
     setMessage("");
 
     try {
-      // Prepare data for submission - serialize arrays to JSON strings
+      // Prepare data for submission - las listas se envían como arreglos
       const submitData = {
         evidencias_complementarias: formData.evidencias_complementarias_descripcion || "",
         evidencias_complementarias_imagen_url: formData.evidencias_complementarias_imagen_url || "",
@@ -124,10 +125,10 @@ const InvestigacionRecabada: React.FC<Props> = ({ siniestroId }) => {
         otras_diligencias_imagen_url: formData.otras_diligencias_imagen_url || "",
         visita_taller_descripcion: formData.visita_taller_descripcion || "",
         visita_taller_imagen_url: formData.visita_taller_imagen_url || "",
-        observaciones: JSON.stringify(formData.observaciones || []),
-        recomendacion_pago_cobertura: JSON.stringify(formData.recomendacion_pago_cobertura || []),
-        conclusiones: JSON.stringify(formData.conclusiones || []),
-        anexo: JSON.stringify(formData.anexo || []),
+        observaciones: formData.observaciones || [],
+        recomendacion_pago_cobertura: formData.recomendacion_pago_cobertura || [],
+        conclusiones: formData.conclusiones || [],
+        anexo: formData.anexo || [],
       };
 
       // Actualizar el siniestro con los datos de investigación recabada